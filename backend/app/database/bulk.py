@@ -0,0 +1,40 @@
+import uuid
+from typing import Any, Iterable
+
+from sqlalchemy import insert
+from sqlmodel import Session as DatabaseSession, SQLModel
+
+# Maximum number of rows sent in a single multi-row INSERT
+BULK_CHUNK_SIZE = 1000
+
+
+def bulk_insert(
+    db: DatabaseSession,
+    model: type[SQLModel],
+    rows: Iterable[dict[str, Any]],
+) -> list[uuid.UUID]:
+    """
+    Insert rows into the table of a model with core multi-row inserts, bypassing the ORM
+    unit of work. Ids are generated client-side for rows without one, so related rows
+    can be inserted right after without reading anything back.
+    The rows are not committed.
+
+    Arguments:
+        db (DatabaseSession): Database session used to run the inserts.
+        model (type[SQLModel]): The table model to insert rows for.
+        rows (Iterable[dict[str, Any]]): The column values of each row.
+
+    Returns:
+        list[uuid.UUID]: The ids of the inserted rows, in order. Empty for tables without an id column.
+    """
+    table = model.__table__
+    has_id = "id" in table.columns
+
+    rows = [
+        {**row, "id": uuid.uuid4()} if has_id and row.get("id") is None else row
+        for row in rows
+    ]
+    for i in range(0, len(rows), BULK_CHUNK_SIZE):
+        db.exec(insert(table), params=rows[i : i + BULK_CHUNK_SIZE])
+
+    return [row["id"] for row in rows] if has_id else []
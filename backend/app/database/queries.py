@@ -0,0 +1,70 @@
+import uuid
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session as DatabaseSession, select
+
+from app.database.setup import Answer, Question, Quiz, Topic
+
+# Loader options for QuizPublicExtended: questions with their answers and summaries.
+_quiz_extended_options = (
+    selectinload(Quiz.questions).selectinload(Question.answers),
+    selectinload(Quiz.questions).selectinload(Question.summaries),
+)
+
+# Loader options for the full analysis of every question in a quiz.
+# Each relationship is loaded with a single set-based SELECT ... IN query,
+# so the number of queries does not depend on the number of questions or answers.
+_quiz_analyses_options = (
+    selectinload(Quiz.questions).selectinload(Question.summaries),
+    selectinload(Quiz.questions)
+    .selectinload(Question.answers)
+    .selectinload(Answer.sentiment),
+    selectinload(Quiz.questions)
+    .selectinload(Question.topics)
+    .selectinload(Topic.summary),
+    selectinload(Quiz.questions)
+    .selectinload(Question.topics)
+    .selectinload(Topic.answers)
+    .selectinload(Answer.sentiment),
+)
+
+
+def get_quiz_extended(db: DatabaseSession, quiz_id: uuid.UUID) -> Quiz | None:
+    """
+    Fetch a quiz with its questions, answers and summaries eagerly loaded.
+
+    Arguments:
+        db (DatabaseSession): Database session used to run the queries.
+        quiz_id (uuid.UUID): The id of the quiz to fetch.
+
+    Returns:
+        Quiz | None: The quiz, or None if it does not exist.
+    """
+    statement = (
+        select(Quiz)
+        .where(Quiz.id == quiz_id)
+        .options(*_quiz_extended_options)
+        .execution_options(populate_existing=True)
+    )
+    return db.exec(statement).first()
+
+
+def get_quiz_with_analyses(db: DatabaseSession, quiz_id: uuid.UUID) -> Quiz | None:
+    """
+    Fetch a quiz with every analysis related to its questions eagerly loaded:
+    summaries, answers with sentiments, and topics with their summary and answers.
+
+    Arguments:
+        db (DatabaseSession): Database session used to run the queries.
+        quiz_id (uuid.UUID): The id of the quiz to fetch.
+
+    Returns:
+        Quiz | None: The quiz, or None if it does not exist.
+    """
+    statement = (
+        select(Quiz)
+        .where(Quiz.id == quiz_id)
+        .options(*_quiz_analyses_options)
+        .execution_options(populate_existing=True)
+    )
+    return db.exec(statement).first()
@@ -1,6 +1,8 @@
 import logging
 import os
 import sys
+from datetime import datetime, timezone
+from enum import Enum
 from typing import Annotated, Optional
 import uuid
 from dotenv import load_dotenv
@@ -40,6 +42,7 @@ class QuizBase(SQLModel):
 class Quiz(QuizBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: str = Field(min_length=28, max_length=28)  # Firebase
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     questions: list["Question"] = Relationship(
         back_populates="quiz",
         cascade_delete=True,
@@ -236,6 +239,67 @@ class TopicExtended(TopicBase):
     answers: list[AnswerPublicExtended]
 
 
+# endregion
+# region Import job model
+
+
+class ImportJobStage(str, Enum):
+    """Stages of a background question import, in the order they are reached"""
+
+    Queued = "queued"
+    Formatted = "formatted"
+    Stored = "stored"
+    Prepared = "prepared"
+    Analysed = "analysed"
+    Failed = "failed"
+
+
+class ImportJobBase(SQLModel):
+    quiz_id: uuid.UUID = Field(foreign_key="quiz.id", ondelete="CASCADE")
+    stage: ImportJobStage = Field(default=ImportJobStage.Queued)
+    question_count: int = Field(default=0)
+    prepared_count: int = Field(default=0)
+    analysed_count: int = Field(default=0)
+    error: str | None = Field(default=None, sa_type=Text)
+
+
+class ImportJob(ImportJobBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ImportJobPublic(ImportJobBase):
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+
+
+# endregion
+# region LLM usage model
+
+
+class LLMUsageBase(SQLModel):
+    # Not foreign keys, so that the usage of deleted quizzes is kept
+    session_id: str | None = Field(default=None)
+    quiz_id: uuid.UUID | None = Field(default=None, index=True)
+    stage: str
+    model: str
+    requests: int = Field(default=0)
+    failures: int = Field(default=0)
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    # JSON list of the number of successful requests in each latency bucket
+    latency_histogram: str = Field(default="[]", sa_type=Text)
+
+
+class LLMUsage(LLMUsageBase, table=True):
+    """Usage of LLM requests with the same owner, stage and model, flushed periodically"""
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 # endregion
 
 
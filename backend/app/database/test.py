@@ -0,0 +1,209 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+# The setup module requires a database url to be configured on import
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'quizzma_test.db')}",
+)
+
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.database import bulk
+from app.database.bulk import bulk_insert
+from app.database.queries import get_quiz_extended, get_quiz_with_analyses
+from app.database.setup import (
+    Answer,
+    AnswerPublicExtended,
+    Question,
+    Quiz,
+    QuizPublicExtended,
+    SentimentAnalysis,
+    Summary,
+    SummaryPublic,
+    Topic,
+    TopicExtended,
+)
+
+# Upper bound on queries for loading a quiz with all analyses, regardless of size
+MAX_QUERIES_PER_REQUEST = 10
+
+
+class TestQuizQueries(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.query_count = 0
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def count_queries(*args, **kwargs) -> None:
+            self.query_count += 1
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def seed_quiz(self, n_questions: int, n_answers: int) -> uuid.UUID:
+        """Store a quiz where every question has answers, sentiments, topics and summaries"""
+        with Session(self.engine) as db:
+            quiz = Quiz(name="Quiz", user_id="u" * 28)
+            db.add(quiz)
+            for i in range(n_questions):
+                question = Question(quiz_id=quiz.id, text=f"Question {i}")
+                answers = [
+                    Answer(question_id=question.id, text=f"Answer {j}")
+                    for j in range(n_answers)
+                ]
+                topics = [
+                    Topic(
+                        algorithm="LDA",
+                        question_id=question.id,
+                        label=f"Topic {k}",
+                        topic="a, b",
+                        answers=answers[k::2],
+                    )
+                    for k in range(2)
+                ]
+                db.add(question)
+                db.add_all(answers)
+                db.add_all(topics)
+                db.add_all(
+                    SentimentAnalysis(
+                        answer_id=answer.id,
+                        algorithm="VADER",
+                        verdict="Neutral",
+                        compound=0.0,
+                        positive=0.0,
+                        neutral=1.0,
+                        negative=0.0,
+                    )
+                    for answer in answers
+                )
+                db.add(Summary(question_id=question.id, summary_text="", algorithm="x"))
+                db.add_all(
+                    Summary(
+                        question_id=question.id,
+                        topic_id=topic.id,
+                        summary_text="",
+                        algorithm="x",
+                    )
+                    for topic in topics
+                )
+            db.commit()
+            return quiz.id
+
+    def count_analyses_queries(self, quiz_id: uuid.UUID) -> int:
+        """Count the queries needed to load and serialise every analysis of a quiz"""
+        with Session(self.engine) as db:
+            self.query_count = 0
+            quiz = get_quiz_with_analyses(db=db, quiz_id=quiz_id)
+            for question in quiz.questions:
+                [
+                    SummaryPublic.model_validate(summary)
+                    for summary in question.summaries
+                ]
+                [
+                    AnswerPublicExtended.model_validate(answer)
+                    for answer in question.answers
+                ]
+                [TopicExtended.model_validate(topic) for topic in question.topics]
+            return self.query_count
+
+    def count_extended_queries(self, quiz_id: uuid.UUID) -> int:
+        """Count the queries needed to load and serialise an extended quiz"""
+        with Session(self.engine) as db:
+            self.query_count = 0
+            quiz = get_quiz_extended(db=db, quiz_id=quiz_id)
+            QuizPublicExtended.model_validate(quiz)
+            return self.query_count
+
+    def test_analyses_query_count_is_constant(self):
+        small_quiz_id = self.seed_quiz(n_questions=1, n_answers=2)
+        large_quiz_id = self.seed_quiz(n_questions=10, n_answers=50)
+
+        small_count = self.count_analyses_queries(small_quiz_id)
+        large_count = self.count_analyses_queries(large_quiz_id)
+
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, MAX_QUERIES_PER_REQUEST)
+
+    def test_extended_query_count_is_constant(self):
+        small_quiz_id = self.seed_quiz(n_questions=1, n_answers=2)
+        large_quiz_id = self.seed_quiz(n_questions=10, n_answers=50)
+
+        small_count = self.count_extended_queries(small_quiz_id)
+        large_count = self.count_extended_queries(large_quiz_id)
+
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, MAX_QUERIES_PER_REQUEST)
+
+    def test_missing_quiz(self):
+        with Session(self.engine) as db:
+            self.assertIsNone(get_quiz_with_analyses(db=db, quiz_id=uuid.uuid4()))
+
+
+class TestBulkInsert(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as db:
+            quiz = Quiz(name="Quiz", user_id="u" * 28)
+            db.add(quiz)
+            db.commit()
+            self.quiz_id = quiz.id
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def test_ids_are_generated_in_order(self):
+        explicit_id = uuid.uuid4()
+        rows = [
+            {"quiz_id": self.quiz_id, "text": "First"},
+            {"quiz_id": self.quiz_id, "text": "Second", "id": explicit_id},
+            {"quiz_id": self.quiz_id, "text": "Third"},
+        ]
+        with Session(self.engine) as db:
+            ids = bulk_insert(db=db, model=Question, rows=rows)
+            db.commit()
+            stored = {question.id: question for question in db.exec(select(Question))}
+
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(ids[1], explicit_id)
+        self.assertEqual([stored[id].text for id in ids], ["First", "Second", "Third"])
+        # Column defaults apply to columns missing from the rows
+        self.assertTrue(all(not question.predefined for question in stored.values()))
+
+    def test_rows_are_inserted_in_chunks(self):
+        with Session(self.engine) as db, mock.patch.object(bulk, "BULK_CHUNK_SIZE", 2):
+            question_id = bulk_insert(
+                db=db, model=Question, rows=[{"quiz_id": self.quiz_id, "text": "Q"}]
+            )[0]
+            answer_ids = bulk_insert(
+                db=db,
+                model=Answer,
+                rows=({"question_id": question_id, "text": str(i)} for i in range(5)),
+            )
+            db.commit()
+            self.assertEqual(len(db.exec(select(Answer)).all()), 5)
+        self.assertEqual(len(answer_ids), 5)
+
+    def test_empty_input(self):
+        with Session(self.engine) as db:
+            self.assertEqual(bulk_insert(db=db, model=Question, rows=[]), [])
+            self.assertEqual(db.exec(select(Question)).all(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
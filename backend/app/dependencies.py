@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.internal.response_cache import ResponseCache, response_cache
 from app.internal.session_manager import SessionManager
 from firebase_admin import auth
 import cachetools
@@ -70,3 +71,8 @@ _session_manager = SessionManager()
 async def get_session_manager() -> SessionManager:
     """Retrieves a singleton instance of the SessionManger"""
     return _session_manager
+
+
+async def get_response_cache() -> ResponseCache:
+    """Retrieves a singleton instance of the ResponseCache"""
+    return response_cache
@@ -2,26 +2,55 @@ import asyncio
 import json
 import logging
 import os
-from typing import Iterable
+from typing import AsyncIterator, Iterable
+import uuid
 
 from dotenv import load_dotenv
 from pydantic import ValidationError
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session as DatabaseSession, select
 
-from app.database.setup import Answer, Question, Quiz, SentimentAnalysis, Summary, Topic
+from app.database.bulk import bulk_insert
+from app.database.setup import (
+    Answer,
+    AnswerTopicAssociation,
+    Question,
+    Quiz,
+    SentimentAnalysis,
+    SessionLocal,
+    Summary,
+    Topic,
+)
+from app.internal.response_cache import response_cache
 from processing.sentiment import roberta
 from processing.topics import bertopic, lda
-from processing.definitions import AnalysisRequest, Answer as AnalysisAnswer
+from processing.definitions import (
+    AnalysisRequest,
+    Answer as AnalysisAnswer,
+    SummaryResult,
+)
+from processing.llm import usage
 from processing.sentiment.vader import analyse_sentiments
-from processing.summary import openai_llm, openai_reasoning
+from processing.summary import (
+    extractive,
+    hedged,
+    map_reduce,
+    openai_reasoning,
+    rolling,
+    topic_batch,
+)
+from processing.formatting import local_parsers
 from processing.formatting.question_import import (
     QuestionFormat,
     ResponseFormat as QuestionImportResponseFormat,
+    run_column_mapping,
     run_formatting,
 )
 
 load_dotenv()
 use_bert = os.getenv("USE_BERT", "false").strip() == "true"
+# Seconds before an overall summarisation is abandoned for an extractive summary
+summary_timeout = float(os.getenv("SUMMARY_TIMEOUT_SECONDS", "30"))
 
 logger = logging.getLogger("app")
 
@@ -29,7 +58,9 @@ logger = logging.getLogger("app")
 async def perform_import_formatting(raw_content: str) -> list[QuestionFormat]:
     """
     Format the contents of a file import containing questions and related answers into JSON.
-    If the file content already has the correct format, simply parse it.
+    If the file content already has the correct format, simply parse it. Common CSV and TXT
+    layouts are parsed locally, and other tables have their column mapping inferred by an LLM
+    from a small sample. Only content without a recognisable structure is fully formatted by an LLM.
 
     Arguments:
         raw_content (str): The raw file content to format.
@@ -37,6 +68,7 @@ async def perform_import_formatting(raw_content: str) -> list[QuestionFormat]:
     Returns:
         list[QuestionFormat]: The formatted file content as a list of questions and answers.
     """
+    usage.stage.set("question_import")
     try:
         parsed_content = json.loads(raw_content)
         return QuestionImportResponseFormat.model_validate(
@@ -45,40 +77,61 @@ async def perform_import_formatting(raw_content: str) -> list[QuestionFormat]:
             }
         ).content
     except (json.JSONDecodeError, ValidationError):
-        logger.debug("Running LLM formatting of file content")
-        return await run_formatting(raw_content)
+        pass
+
+    local_content = local_parsers.parse_local(raw_content)
+    if local_content:
+        logger.debug(f"Parsed {len(local_content)} questions locally from file content")
+        return local_content
+
+    rows = local_parsers.read_rows(raw_content)
+    if rows is not None:
+        logger.debug("Running LLM column mapping of a sample of the file content")
+        mapping = await run_column_mapping(local_parsers.sample_rows(rows))
+        mapped_content = local_parsers.apply_column_mapping(rows, mapping)
+        if mapped_content:
+            return mapped_content
+
+    logger.debug("Running LLM formatting of file content")
+    return await run_formatting(raw_content)
 
 
 async def perform_sentiment_analysis(
     db: DatabaseSession,
+    question: Question,
     prepared_answers: list[AnalysisAnswer],
-) -> list[SentimentAnalysis]:
+) -> list[uuid.UUID]:
     """
     Perform sentiment analysis on a set of answers.
 
     Arguments:
         db (DatabaseSession): Database session for persisting the generated topics.
+        question (Question): The question to which the answers belong.
         prepared_answers (list[AnalysisAnswer]): List of potentially preprocessed answers for which to calculate sentiments.
 
     Returns:
-        list[SentimentAnalysis]: A list of sentiment analysis results, one per answer.
+        list[uuid.UUID]: The ids of the stored sentiment analyses, one per answer.
     """
     if use_bert:
         raw_results = await roberta.process(answers=prepared_answers)
     else:
         raw_results = await analyse_sentiments(answers=prepared_answers)
 
-    db_sentiments = [
-        SentimentAnalysis.model_validate(
-            raw_result.model_dump(exclude={"answer"}),
-            update={"answer_id": raw_result.answer.id},
-        )
-        for raw_result in raw_results
-    ]
-    db.add_all(db_sentiments)
+    sentiment_ids = bulk_insert(
+        db=db,
+        model=SentimentAnalysis,
+        rows=(
+            {
+                **raw_result.model_dump(exclude={"answer"}),
+                "answer_id": raw_result.answer.id,
+            }
+            for raw_result in raw_results
+        ),
+    )
     db.commit()
+    response_cache.bump(question_id=question.id, quiz_id=question.quiz_id)
 
-    return db_sentiments
+    return sentiment_ids
 
 
 async def perform_topic_modelling(
@@ -97,6 +150,7 @@ async def perform_topic_modelling(
     Returns:
         list[Topic]: A list of topics with their related answers.
     """
+    usage.stage.set("topic_modelling")
     if use_bert:
         raw_topics = await bertopic.process(
             answers=prepared_answers,
@@ -108,23 +162,40 @@ async def perform_topic_modelling(
             question_id=question.id,
         )
 
-    db_answers = db.exec(select(Answer).where(Answer.question_id == question.id)).all()
-    answer_map = {answer.id: answer for answer in db_answers}
+    # Answers that are not stored for the question are skipped, as they cannot be linked
+    answer_ids = set(
+        db.exec(select(Answer.id).where(Answer.question_id == question.id)).all()
+    )
 
-    db_topics: list[Topic] = []
-    for raw_topic in raw_topics:
-        topic_answers = [
-            answer_map[answer.id]
+    topic_ids = bulk_insert(
+        db=db,
+        model=Topic,
+        rows=(raw_topic.model_dump(exclude={"answers"}) for raw_topic in raw_topics),
+    )
+    bulk_insert(
+        db=db,
+        model=AnswerTopicAssociation,
+        rows=(
+            {"answer_id": answer.id, "topic_id": topic_id}
+            for topic_id, raw_topic in zip(topic_ids, raw_topics)
             for answer in raw_topic.answers
-            if answer.id in answer_map
-        ]
-        db_topic = Topic.model_validate(raw_topic.model_dump(exclude={"answers"}))
-        db_topic.answers = topic_answers
-        db.add(db_topic)
-        db_topics.append(db_topic)
+            if answer.id in answer_ids
+        ),
+    )
     db.commit()
-
-    return db_topics
+    response_cache.bump(question_id=question.id, quiz_id=question.quiz_id)
+
+    # Load the stored topics with the relationships used by topic summarisation
+    statement = (
+        select(Topic)
+        .where(Topic.id.in_(topic_ids))
+        .options(
+            selectinload(Topic.question),
+            selectinload(Topic.answers),
+            selectinload(Topic.summary),
+        )
+    )
+    return list(db.exec(statement).all())
 
 
 async def perform_summarisation(
@@ -133,9 +204,12 @@ async def perform_summarisation(
     question: Question,
     prepared_answers: list[AnalysisAnswer],
     audience_count: int | None = None,
+    draft: rolling.Draft | None = None,
 ) -> Summary:
     """
     Perform summarisation on a set of answers belonging to a question.
+    A draft summary of the first answers is refined with the remaining answers instead,
+    if there is one.
 
     Arguments:
         db (DatabaseSession): Database session for persisting the generated summary.
@@ -143,20 +217,146 @@ async def perform_summarisation(
         question (Question): The question for which to perform summarisation.
         prepared_answers (list[AnalysisAnswer]): List of potentially preprocessed answers related to the question.
         audience_count (int | None): Optional number of participants in a session.
+        draft (rolling.Draft | None): Optional rolling summary of the first answers.
 
     Returns:
         Summary: The LLM summary.
+
+    Raises:
+        TimeoutError: If the summary is not produced within `summary_timeout` seconds.
     """
-    summary_result = await openai_reasoning.process(
-        AnalysisRequest(
-            question=question.text,
-            answers=[answer.text for answer in prepared_answers],
-            quiz_name=quiz.name,
-            quiz_description=quiz.description,
-            audience_count=audience_count,
-        )
+    usage.stage.set("summary")
+    request = _summarisation_request(quiz, question, prepared_answers, audience_count)
+    async with asyncio.timeout(summary_timeout):
+        summary_result = await _refine_draft(request, draft)
+        if summary_result is None and map_reduce.is_large(request):
+            summary_result = await map_reduce.process(request)
+        elif summary_result is None:
+            summary_result = await hedged.process(request)
+    return _store_summary(db, quiz, question, summary_result)
+
+
+async def perform_streaming_summarisation(
+    quiz: Quiz,
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+    audience_count: int | None = None,
+    draft: rolling.Draft | None = None,
+) -> AsyncIterator[SummaryResult | Summary]:
+    """
+    Perform summarisation on a set of answers belonging to a question, streaming the
+    summary while it is produced. No database connection is held while streaming.
+    A draft summary of the first answers is sent at once and then refined with the
+    remaining answers, if there is one.
+
+    Arguments:
+        quiz (Quiz): The quiz the question to which the question belongs.
+        question (Question): The question for which to perform summarisation.
+        prepared_answers (list[AnalysisAnswer]): List of potentially preprocessed answers related to the question.
+        audience_count (int | None): Optional number of participants in a session.
+        draft (rolling.Draft | None): Optional rolling summary of the first answers.
+
+    Yields:
+        SummaryResult | Summary: The partial summaries, followed by the persisted LLM summary.
+
+    Raises:
+        TimeoutError: If the summary is not produced within `summary_timeout` seconds.
+    """
+    usage.stage.set("summary")
+    # The deadline is only enforced while waiting for the LLM, never while the partial summaries are sent
+    deadline = asyncio.get_running_loop().time() + summary_timeout
+    request = _summarisation_request(quiz, question, prepared_answers, audience_count)
+    if draft is not None:
+        yield draft.summary
+    async with asyncio.timeout_at(deadline):
+        summary_result = await _refine_draft(request, draft)
+        if summary_result is None and map_reduce.is_large(request):
+            # Summaries of many answers are combined from partial summaries, so only the result is sent
+            summary_result = await map_reduce.process(request)
+    if summary_result is not None:
+        yield summary_result
+    else:
+        stream = openai_reasoning.stream(request)
+        try:
+            while True:
+                async with asyncio.timeout_at(deadline):
+                    partial_result = await anext(stream, None)
+                if partial_result is None:
+                    break
+                summary_result = partial_result
+                yield summary_result
+        finally:
+            await stream.aclose()
+
+    if summary_result is not None:
+        with SessionLocal(expire_on_commit=False) as db:
+            yield _store_summary(db, quiz, question, summary_result)
+
+
+def perform_extractive_summarisation(
+    quiz: Quiz,
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+) -> Summary:
+    """
+    Summarise a set of answers belonging to a question without an LLM, as a fallback for
+    when the LLM summarisation fails. The summary is not persisted, so that later requests
+    retry the LLM summarisation.
+
+    Arguments:
+        quiz (Quiz): The quiz the question to which the question belongs.
+        question (Question): The question for which to perform summarisation.
+        prepared_answers (list[AnalysisAnswer]): List of potentially preprocessed answers related to the question.
+
+    Returns:
+        Summary: The extractive summary.
+    """
+    request = _summarisation_request(quiz, question, prepared_answers, None)
+    summary_result = extractive.process(request)
+    return Summary(
+        question_id=question.id,
+        summary_text=summary_result.summary_text,
+        algorithm=summary_result.algorithm,
+        emoji=summary_result.emoji,
+    )
+
+
+def _summarisation_request(
+    quiz: Quiz,
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+    audience_count: int | None,
+) -> AnalysisRequest:
+    return AnalysisRequest(
+        question=question.text,
+        answers=[answer.text for answer in prepared_answers],
+        quiz_name=quiz.name,
+        quiz_description=quiz.description,
+        audience_count=audience_count,
     )
 
+
+async def _refine_draft(
+    request: AnalysisRequest, draft: rolling.Draft | None
+) -> SummaryResult | None:
+    """
+    Refine a rolling summary and the answers it does not cover into the final summary,
+    or None if there is no draft or refining fails. The host is waiting for it, so it runs
+    at the live priority of the request instead of the background priority of drafts.
+    """
+    if draft is None:
+        return None
+    try:
+        return await rolling.refine(request, draft)
+    except Exception as e:
+        logger.debug("Refining the draft summary failed", exc_info=e)
+        return None
+
+
+def _store_summary(
+    db: DatabaseSession, quiz: Quiz, question: Question, summary_result: SummaryResult
+) -> Summary:
+    """Persist the summary of a question, invalidating cached analyses of the question"""
     db_summary = Summary(
         question_id=question.id,
         summary_text=summary_result.summary_text,
@@ -165,6 +365,7 @@ async def perform_summarisation(
     )
     db.add(db_summary)
     db.commit()
+    response_cache.bump(question_id=question.id, quiz_id=quiz.id)
 
     return db_summary
 
@@ -189,28 +390,46 @@ async def perform_topic_summarisation(
     Returns:
         list[Summary]: The created LLM summaries.
     """
+    usage.stage.set("topic_summary")
     topics = [topic for topic in topics if topic.summary is None]
+    question_ids = {topic.question_id for topic in topics}
     answer_map = {answer.id: answer for answer in prepared_answers}
 
-    tasks = [
-        openai_llm.process(
-            AnalysisRequest(
-                question=topic.question.text,
-                topic_label=topic.label,
-                answers=[
-                    answer_map[answer.id].text
-                    for answer in topic.answers
-                    if answer.id in answer_map
-                ],
-                quiz_name=quiz.name,
-                quiz_description=quiz.description,
-                audience_count=audience_count,
-            )
-        )
-        for topic in topics
+    # The topics of each question are summarised together
+    topics_by_question: dict[uuid.UUID, list[Topic]] = {}
+    for topic in topics:
+        topics_by_question.setdefault(topic.question_id, []).append(topic)
+    topics = [
+        topic
+        for question_topics in topics_by_question.values()
+        for topic in question_topics
     ]
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    question_results = await asyncio.gather(
+        *[
+            topic_batch.process(
+                [
+                    AnalysisRequest(
+                        question=topic.question.text,
+                        topic_label=topic.label,
+                        answers=[
+                            answer_map[answer.id].text
+                            for answer in topic.answers
+                            if answer.id in answer_map
+                        ],
+                        quiz_name=quiz.name,
+                        quiz_description=quiz.description,
+                        audience_count=audience_count,
+                    )
+                    for topic in question_topics
+                ]
+            )
+            for question_topics in topics_by_question.values()
+        ]
+    )
+    results = [
+        result for question_result in question_results for result in question_result
+    ]
 
     db_summaries: list[Summary] = []
     for topic, result in zip(topics, results):
@@ -231,5 +450,7 @@ async def perform_topic_summarisation(
                 exc_info=result,
             )
     db.commit()
+    for question_id in question_ids:
+        response_cache.bump(question_id=question_id, quiz_id=quiz.id)
 
     return db_summaries
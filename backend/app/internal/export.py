@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+import uuid
+from enum import Enum
+from typing import Any, Iterator
+
+from sqlalchemy import and_, or_
+from sqlmodel import select
+
+from app.database.setup import (
+    Answer,
+    AnswerTopicAssociation,
+    Question,
+    SentimentAnalysis,
+    SessionLocal,
+    Summary,
+    Topic,
+)
+
+# Number of answers read from the database per batch, each in its own database session
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "question_id",
+    "question",
+    "summary",
+    "answer_id",
+    "answer",
+    "sentiment_verdict",
+    "sentiment_compound",
+    "topic_labels",
+    "topic_summaries",
+]
+
+
+class ExportFormat(str, Enum):
+    """File formats supported by quiz exports"""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _read_row_batch(
+    quiz_id: uuid.UUID,
+    overall_summaries: dict[uuid.UUID, str],
+    after: tuple[uuid.UUID, uuid.UUID] | None,
+) -> list[dict[str, Any]]:
+    """Read the batch of answers following the (question id, answer id) key `after`"""
+    with SessionLocal() as db:
+        answer_statement = (
+            select(
+                Question.id,
+                Question.text,
+                Answer.id,
+                Answer.text,
+                SentimentAnalysis.verdict,
+                SentimentAnalysis.compound,
+            )
+            .join(Answer, Answer.question_id == Question.id)
+            .outerjoin(SentimentAnalysis, SentimentAnalysis.answer_id == Answer.id)
+            .where(Question.quiz_id == quiz_id)
+            .order_by(Question.id, Answer.id)
+            .limit(EXPORT_BATCH_SIZE)
+        )
+        if after is not None:
+            answer_statement = answer_statement.where(
+                or_(
+                    Question.id > after[0],
+                    and_(Question.id == after[0], Answer.id > after[1]),
+                )
+            )
+        partition = db.exec(answer_statement).all()
+        answer_ids = [answer_id for _, _, answer_id, *_ in partition]
+
+        topic_labels: dict[uuid.UUID, list[str]] = {}
+        topic_summaries: dict[uuid.UUID, list[str]] = {}
+        topic_statement = (
+            select(AnswerTopicAssociation.answer_id, Topic.label, Summary.summary_text)
+            .join(Topic, Topic.id == AnswerTopicAssociation.topic_id)
+            .outerjoin(Summary, Summary.topic_id == Topic.id)
+            .where(AnswerTopicAssociation.answer_id.in_(answer_ids))
+        )
+        for answer_id, label, summary_text in db.exec(topic_statement):
+            topic_labels.setdefault(answer_id, []).append(label)
+            if summary_text is not None:
+                topic_summaries.setdefault(answer_id, []).append(summary_text)
+
+    return [
+        {
+            "question_id": str(question_id),
+            "question": question_text,
+            "summary": overall_summaries.get(question_id),
+            "answer_id": str(answer_id),
+            "answer": answer_text,
+            "sentiment_verdict": verdict,
+            "sentiment_compound": compound,
+            "topic_labels": topic_labels.get(answer_id, []),
+            "topic_summaries": topic_summaries.get(answer_id, []),
+        }
+        for question_id, question_text, answer_id, answer_text, verdict, compound in partition
+    ]
+
+
+def _iter_row_batches(quiz_id: uuid.UUID) -> Iterator[list[dict[str, Any]]]:
+    """
+    Read every answer of a quiz with its sentiment, topics and summaries in batches.
+
+    Every batch is read with keyset pagination in its own short-lived database session,
+    so a slow client never holds a pooled connection while the response is streamed,
+    and memory use is bounded by the batch size.
+
+    Arguments:
+        quiz_id (uuid.UUID): The quiz to export.
+
+    Yields:
+        list[dict[str, Any]]: A batch of rows, one per answer.
+    """
+    with SessionLocal() as db:
+        # The first overall summary of each question, like the analyses shown to the host
+        overall_summaries: dict[uuid.UUID, str] = {}
+        for question_id, summary_text in db.exec(
+            select(Summary.question_id, Summary.summary_text)
+            .join(Question)
+            .where((Question.quiz_id == quiz_id) & (Summary.topic_id == None))
+        ):
+            overall_summaries.setdefault(question_id, summary_text)
+
+    after: tuple[uuid.UUID, uuid.UUID] | None = None
+    while True:
+        rows = _read_row_batch(quiz_id, overall_summaries, after)
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        after = (uuid.UUID(rows[-1]["question_id"]), uuid.UUID(rows[-1]["answer_id"]))
+
+
+def _stream_ndjson(quiz_id: uuid.UUID) -> Iterator[str]:
+    """Stream the quiz export with one JSON object per line"""
+    for rows in _iter_row_batches(quiz_id):
+        yield "".join(f"{json.dumps(row, ensure_ascii=False)}\n" for row in rows)
+
+
+def _stream_csv(quiz_id: uuid.UUID) -> Iterator[str]:
+    """Stream the quiz export as CSV, joining topic labels and summaries with semicolons"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for rows in _iter_row_batches(quiz_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            {
+                **row,
+                "topic_labels": "; ".join(row["topic_labels"]),
+                "topic_summaries": "; ".join(row["topic_summaries"]),
+            }
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def stream_export(quiz_id: uuid.UUID, export_format: ExportFormat) -> Iterator[str]:
+    """
+    Stream all answers of a quiz with their sentiment, topic labels and summaries.
+
+    Arguments:
+        quiz_id (uuid.UUID): The quiz to export.
+        export_format (ExportFormat): The format of the exported rows.
+
+    Returns:
+        Iterator[str]: Chunks of the export, one per database batch.
+    """
+    if export_format == ExportFormat.CSV:
+        return _stream_csv(quiz_id)
+    return _stream_ndjson(quiz_id)
@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import select, update
+
+from app.database.bulk import bulk_insert
+from app.database.setup import (
+    Answer,
+    ImportJob,
+    ImportJobStage,
+    Question,
+    SessionLocal,
+)
+from app.internal.analysis import (
+    perform_import_formatting,
+    perform_sentiment_analysis,
+    perform_summarisation,
+    perform_topic_modelling,
+    perform_topic_summarisation,
+)
+from app.internal.response_cache import response_cache
+from processing.definitions import Answer as AnalysisAnswer
+from processing.formatting.question_import import QuestionFormat
+from processing.llm import scheduler, usage
+from processing.preprocessing import preprocessing
+
+logger = logging.getLogger("app")
+
+# Maximum number of questions analysed at the same time by a job
+IMPORT_CONCURRENCY = 4
+
+# Error shown to the host when a job fails, the details are only logged
+IMPORT_FAILED_ERROR = "The import could not be completed"
+
+# Keep references to running jobs so they are not garbage collected before finishing
+_running_jobs: set[asyncio.Task] = set()
+
+
+def start_import_job(job_id: uuid.UUID, question_imports: list[str]) -> None:
+    """
+    Run a stored import job in the background of the event loop.
+
+    Arguments:
+        job_id (uuid.UUID): The import job to run.
+        question_imports (list[str]): The raw file contents to import.
+    """
+    task = asyncio.create_task(run_import_job(job_id, question_imports))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+
+
+def fail_interrupted_import_jobs() -> None:
+    """Mark import jobs left unfinished by a previous process as failed"""
+    with SessionLocal() as db:
+        db.exec(
+            update(ImportJob)
+            .where(
+                ImportJob.stage.not_in([ImportJobStage.Analysed, ImportJobStage.Failed])
+            )
+            .values(
+                stage=ImportJobStage.Failed,
+                error="Import was interrupted",
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        db.commit()
+
+
+def _write_job(job_id: uuid.UUID, values: dict[str, Any]) -> None:
+    """Persist the progress of an import job in a separate database session"""
+    with SessionLocal() as db:
+        db.exec(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(updated_at=datetime.now(timezone.utc), **values)
+        )
+        db.commit()
+
+
+async def _update_job(job_id: uuid.UUID, **values: Any) -> None:
+    """Persist the progress of an import job without blocking the event loop"""
+    await asyncio.to_thread(_write_job, job_id, values)
+
+
+def _load_quiz_id(job_id: uuid.UUID) -> uuid.UUID:
+    """Look up the quiz an import job imports into"""
+    with SessionLocal() as db:
+        return db.exec(select(ImportJob.quiz_id).where(ImportJob.id == job_id)).one()
+
+
+def _store_questions(
+    quiz_id: uuid.UUID,
+    formatting_results: list[QuestionFormat],
+) -> dict[uuid.UUID, list[AnalysisAnswer]]:
+    """
+    Store imported questions and answers with multi-row inserts.
+
+    Returns:
+        dict[uuid.UUID, list[AnalysisAnswer]]: The stored answers of each new question.
+    """
+    with SessionLocal() as db:
+        question_ids = bulk_insert(
+            db=db,
+            model=Question,
+            rows=[
+                {"quiz_id": quiz_id, "text": formatting_result.question}
+                for formatting_result in formatting_results
+            ],
+        )
+        answer_rows = [
+            {"question_id": question_id, "text": answer}
+            for question_id, formatting_result in zip(question_ids, formatting_results)
+            for answer in formatting_result.answers
+        ]
+        answer_ids = bulk_insert(db=db, model=Answer, rows=answer_rows)
+        db.commit()
+    response_cache.bump(quiz_id=quiz_id)
+
+    question_raw_answers: dict[uuid.UUID, list[AnalysisAnswer]] = {
+        question_id: [] for question_id in question_ids
+    }
+    for answer_id, answer_row in zip(answer_ids, answer_rows):
+        question_raw_answers[answer_row["question_id"]].append(
+            AnalysisAnswer(id=answer_id, text=answer_row["text"])
+        )
+    return question_raw_answers
+
+
+async def _prepare_answers(
+    job_id: uuid.UUID,
+    raw_answers: list[AnalysisAnswer],
+) -> list[AnalysisAnswer]:
+    """
+    Prepare the answers of a question by correcting and translating them.
+    Requests from all questions share the bounded concurrency of the preprocessing module.
+    """
+    usage.stage.set("preprocessing")
+    documents: list[str] = []
+    try:
+        documents = await preprocessing.correct_and_translate(
+            documents=[answer.text for answer in raw_answers],
+        )
+    except Exception as e:
+        logger.debug("Preparation failed for imported answers", exc_info=e)
+
+    await _update_job(job_id, prepared_count=ImportJob.prepared_count + 1)
+    if len(documents) != len(raw_answers):
+        # Use original answers if preprocessing failed or produced the wrong number of documents
+        return raw_answers
+    return [
+        AnalysisAnswer(id=answer.id, text=document)
+        for answer, document in zip(raw_answers, documents)
+    ]
+
+
+def _load_question(question_id: uuid.UUID) -> Question:
+    """
+    Load a question with its quiz in a short-lived database session.
+    The detached question is passed to the analyses, so that no database connection
+    is held while waiting for the models to respond.
+    """
+    with SessionLocal() as db:
+        return db.exec(
+            select(Question)
+            .where(Question.id == question_id)
+            .options(selectinload(Question.quiz))
+        ).one()
+
+
+async def _summarise_question(
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+) -> None:
+    """Summarise the answers of a question in its own database session"""
+    with SessionLocal() as db:
+        await perform_summarisation(
+            db=db,
+            quiz=question.quiz,
+            question=question,
+            prepared_answers=prepared_answers,
+        )
+
+
+async def _analyse_sentiments(
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+) -> None:
+    """Analyse the sentiment of the answers of a question in its own database session"""
+    with SessionLocal() as db:
+        await perform_sentiment_analysis(
+            db=db,
+            question=question,
+            prepared_answers=prepared_answers,
+        )
+
+
+async def _model_topics(
+    question: Question,
+    prepared_answers: list[AnalysisAnswer],
+) -> None:
+    """Model and summarise the topics of the answers of a question in separate database sessions"""
+    with SessionLocal() as db:
+        topics = await perform_topic_modelling(
+            db=db,
+            question=question,
+            prepared_answers=prepared_answers,
+        )
+    with SessionLocal() as db:
+        await perform_topic_summarisation(
+            db=db,
+            quiz=question.quiz,
+            topics=topics,
+            prepared_answers=prepared_answers,
+        )
+
+
+async def _analyse_question(
+    job_id: uuid.UUID,
+    semaphore: asyncio.Semaphore,
+    question_id: uuid.UUID,
+    preparation: Awaitable[list[AnalysisAnswer]],
+) -> None:
+    """
+    Perform summarisation, sentiment analysis and topic modelling of a question
+    as soon as its answers are prepared.
+    """
+    prepared_answers = await preparation
+    question = await asyncio.to_thread(_load_question, question_id)
+    async with semaphore:
+        results = await asyncio.gather(
+            _summarise_question(question, prepared_answers),
+            _analyse_sentiments(question, prepared_answers),
+            _model_topics(question, prepared_answers),
+            return_exceptions=True,
+        )
+
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.debug(
+                "Analysis step failed for an imported question",
+                extra={"question_id": question_id},
+                exc_info=result,
+            )
+    await _update_job(job_id, analysed_count=ImportJob.analysed_count + 1)
+
+
+async def run_import_job(job_id: uuid.UUID, question_imports: list[str]) -> None:
+    """
+    Import a set of questions and answers from file contents, persisting the progress
+    of every stage to the import job. Every stage uses its own database sessions.
+
+    Arguments:
+        job_id (uuid.UUID): The import job to run.
+        question_imports (list[str]): The raw file contents to import.
+    """
+    start_time = time.monotonic()
+    # Imports yield to the LLM requests of live sessions. The job runs in its own task,
+    # so the priority only applies to the job and the tasks it creates.
+    scheduler.priority.set(scheduler.Priority.Background)
+    try:
+        quiz_id = await asyncio.to_thread(_load_quiz_id, job_id)
+        usage.attribute(quiz=quiz_id)
+
+        # Parse and format the raw file contents
+        formatting_results = await asyncio.gather(
+            *[
+                perform_import_formatting(raw_content)
+                for raw_content in question_imports
+            ]
+        )
+        # Flatten list of lists
+        formatting_results = [
+            content for contents in formatting_results for content in contents
+        ]
+        await _update_job(
+            job_id,
+            stage=ImportJobStage.Formatted,
+            question_count=len(formatting_results),
+        )
+        logger.info(
+            f"Imported file contents formated after {time.monotonic() - start_time}s"
+        )
+
+        question_raw_answers = await asyncio.to_thread(
+            _store_questions, quiz_id, formatting_results
+        )
+        await _update_job(job_id, stage=ImportJobStage.Stored)
+        logger.info(f"Imported questions stored after {time.monotonic() - start_time}s")
+
+        # Prepare all questions at once, and analyse each question when it is prepared
+        preparations = [
+            asyncio.create_task(_prepare_answers(job_id, raw_answers))
+            for raw_answers in question_raw_answers.values()
+        ]
+        semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+        analyses = asyncio.gather(
+            *[
+                _analyse_question(job_id, semaphore, question_id, preparation)
+                for question_id, preparation in zip(question_raw_answers, preparations)
+            ]
+        )
+
+        try:
+            await asyncio.gather(*preparations)
+            await _update_job(job_id, stage=ImportJobStage.Prepared)
+            logger.info(f"Prepared answers after {time.monotonic() - start_time}s")
+
+            await analyses
+        except BaseException:
+            # Do not leave analyses of the other questions running after a failure
+            analyses.cancel()
+            for preparation in preparations:
+                preparation.cancel()
+            await asyncio.gather(analyses, *preparations, return_exceptions=True)
+            raise
+        await _update_job(job_id, stage=ImportJobStage.Analysed)
+        logger.info(
+            f"Imported questions analysed after {time.monotonic() - start_time}s"
+        )
+    except Exception as e:
+        logger.error("Import job failed", extra={"job_id": job_id}, exc_info=e)
+        await _update_job(
+            job_id, stage=ImportJobStage.Failed, error=IMPORT_FAILED_ERROR
+        )
@@ -0,0 +1,183 @@
+import base64
+import binascii
+import json
+from typing import Annotated, Any
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import InstrumentedAttribute, load_only
+from sqlalchemy.sql.base import ExecutableOption
+from sqlmodel import Session as DatabaseSession, SQLModel
+from sqlmodel.sql.expression import SelectOfScalar
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Response header containing the cursor for the next page, if there is one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """
+    Query parameters for keyset pagination and field projection.
+    Without a limit or cursor, every item is returned in a single response.
+    """
+
+    limit: int | None
+    cursor: str | None
+    fields: list[str] | None
+
+    def __init__(
+        self,
+        limit: Annotated[
+            int | None,
+            Query(
+                ge=1,
+                le=MAX_PAGE_SIZE,
+                description=f"Defaults to {DEFAULT_PAGE_SIZE} when a cursor is given",
+            ),
+        ] = None,
+        cursor: Annotated[
+            str | None,
+            Query(description=f"Cursor from the {NEXT_CURSOR_HEADER} header"),
+        ] = None,
+        fields: Annotated[
+            str | None,
+            Query(description="Comma-separated list of fields to include"),
+        ] = None,
+    ) -> None:
+        self.limit = (
+            DEFAULT_PAGE_SIZE if limit is None and cursor is not None else limit
+        )
+        self.cursor = cursor
+        self.fields = (
+            [field.strip() for field in fields.split(",") if field.strip()]
+            if fields
+            else None
+        )
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encode the sort key of the last item on a page as an opaque cursor"""
+    return (
+        base64.urlsafe_b64encode(json.dumps(jsonable_encoder(values)).encode())
+        .decode()
+        .rstrip("=")
+    )
+
+
+def decode_cursor(
+    cursor: str, model: type[SQLModel], columns: list[InstrumentedAttribute]
+) -> list[Any]:
+    """Decode a cursor created by `encode_cursor` into values of the sort columns"""
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("Cursor does not match the sort columns")
+        return [
+            TypeAdapter(model.model_fields[column.key].annotation).validate_python(
+                value
+            )
+            for column, value in zip(columns, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    db: DatabaseSession,
+    statement: SelectOfScalar,
+    model: type[SQLModel],
+    public_model: type[BaseModel],
+    page: PageParams,
+    relationships: dict[str, ExecutableOption] | None = None,
+    order_by: InstrumentedAttribute | None = None,
+) -> JSONResponse:
+    """
+    Fetch a single page of items with keyset pagination on the primary key, or on a
+    column with the primary key breaking ties, optionally projecting the items to a
+    subset of fields. Without a limit, every item is returned.
+
+    Only the requested columns are loaded, and relationships are only eagerly loaded
+    when they are part of the projection. The cursor for the next page is returned
+    in the `X-Next-Cursor` response header.
+
+    Arguments:
+        db (DatabaseSession): Database session used to run the query.
+        statement (SelectOfScalar): A select statement for `model` with any filters applied.
+        model (type[SQLModel]): The table model being paginated. Must have an `id` column.
+        public_model (type[BaseModel]): The public model that the items are serialised as.
+        page (PageParams): The pagination and projection parameters.
+        relationships (dict[str, ExecutableOption] | None): Loader options for the
+            relationships included in `public_model`, keyed by field name.
+        order_by (InstrumentedAttribute | None): Column of `model` to order by before the id.
+
+    Returns:
+        JSONResponse: The serialised page of items.
+    """
+    relationships = relationships or {}
+    fields = page.fields or list(public_model.model_fields)
+
+    unknown_fields = [
+        field for field in fields if field not in public_model.model_fields
+    ]
+    if unknown_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown_fields)}",
+        )
+
+    sort_columns = [model.id] if order_by is None else [order_by, model.id]
+    columns = model.__table__.columns.keys()
+    statement = statement.options(
+        load_only(
+            *[getattr(model, field) for field in fields if field in columns],
+            *sort_columns,
+        ),
+        *[relationships[field] for field in fields if field in relationships],
+    )
+    if page.cursor is not None:
+        values = decode_cursor(page.cursor, model, sort_columns)
+        if order_by is None:
+            statement = statement.where(model.id > values[0])
+        else:
+            statement = statement.where(
+                or_(
+                    order_by > values[0],
+                    and_(order_by == values[0], model.id > values[1]),
+                )
+            )
+    statement = statement.order_by(*sort_columns)
+    if page.limit is not None:
+        statement = statement.limit(page.limit + 1)
+
+    items = db.exec(statement).all()
+    has_next_page = page.limit is not None and len(items) > page.limit
+    items = items[: page.limit]
+
+    content: list[dict[str, Any]]
+    if page.fields is None:
+        content = [
+            public_model.model_validate(item).model_dump(mode="json") for item in items
+        ]
+    else:
+        content = [
+            {field: jsonable_encoder(getattr(item, field)) for field in fields}
+            for item in items
+        ]
+
+    headers = (
+        {
+            NEXT_CURSOR_HEADER: encode_cursor(
+                [getattr(items[-1], column.key) for column in sort_columns]
+            )
+        }
+        if has_next_page
+        else {}
+    )
+    return JSONResponse(content=content, headers=headers)
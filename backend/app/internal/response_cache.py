@@ -0,0 +1,140 @@
+import secrets
+import uuid
+
+import cachetools
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+class CachedResponse(BaseModel):
+    """A serialised response body and the content version it was computed from"""
+
+    version: int
+    payload: bytes
+    owner_id: str | None = None
+
+
+class _Versions(cachetools.LRUCache):
+    """Content versions of the most recently written keys, remembering the newest evicted version"""
+
+    floor: int = 0
+
+    def popitem(self) -> tuple[uuid.UUID, int]:
+        key, version = super().popitem()
+        self.floor = max(self.floor, version)
+        return key, version
+
+
+class ResponseCache:
+    """
+    Read-through cache for analysis responses keyed by a question or quiz id.
+
+    Every key has a content version that is bumped whenever answers, sentiments,
+    topics or summaries are written for it. Cached responses are only served while
+    their version is current, and the version is exposed as an ETag so that clients
+    polling with If-None-Match get a 304 without the database being queried.
+
+    Versions are drawn from a single increasing counter, and only the versions of the
+    most recently written keys are kept. Keys without a version get the newest evicted
+    version, so a response computed before an eviction never becomes current again.
+    """
+
+    # Random per-process prefix, so ETags from before a restart never match
+    epoch: str
+    versions: _Versions
+    entries: cachetools.LRUCache
+    _counter: int
+
+    def __init__(self, maxsize: int = 1000, max_versions: int = 100_000) -> None:
+        self.epoch = secrets.token_hex(4)
+        self.versions = _Versions(maxsize=max_versions)
+        self.entries = cachetools.LRUCache(maxsize=maxsize)
+        self._counter = 0
+
+    def version(self, key: uuid.UUID) -> int:
+        """Get the current content version for a question or quiz"""
+        return self.versions.get(key, self.versions.floor)
+
+    def bump(
+        self,
+        question_id: uuid.UUID | None = None,
+        quiz_id: uuid.UUID | None = None,
+    ) -> None:
+        """
+        Invalidate cached responses after a write to a question and/or the quiz it belongs to.
+
+        Args:
+            question_id (uuid.UUID | None): The question that was written to.
+            quiz_id (uuid.UUID | None): The quiz that was written to.
+        """
+        for key in (question_id, quiz_id):
+            if key is not None:
+                self._counter += 1
+                self.versions[key] = self._counter
+
+    def etag(self, name: str, key: uuid.UUID, version: int | None = None) -> str:
+        """Get the ETag of an endpoint for a question or quiz at a given version, defaulting to the current"""
+        version = self.version(key) if version is None else version
+        return f'W/"{self.epoch}-{name}-{key}-{version}"'
+
+    def get(self, name: str, key: uuid.UUID) -> CachedResponse | None:
+        """
+        Get a cached response if it was computed from the current content version.
+
+        Args:
+            name (str): Name of the cached endpoint.
+            key (uuid.UUID): The question or quiz id of the response.
+
+        Returns:
+            CachedResponse | None: The cached response, or None if missing or stale.
+        """
+        entry: CachedResponse | None = self.entries.get((name, key))
+        if entry is None or entry.version != self.version(key):
+            return None
+        return entry
+
+    def set(self, name: str, key: uuid.UUID, entry: CachedResponse) -> None:
+        """
+        Cache a serialised response.
+
+        Args:
+            name (str): Name of the cached endpoint.
+            key (uuid.UUID): The question or quiz id of the response.
+            entry (CachedResponse): The response, with the content version read before computing it.
+        """
+        self.entries[(name, key)] = entry
+
+    def response(
+        self,
+        request: Request,
+        name: str,
+        key: uuid.UUID,
+        entry: CachedResponse,
+    ) -> Response:
+        """
+        Create a response for a cached entry, or a 304 if the client already has it.
+
+        Args:
+            request (Request): The incoming request, checked for an If-None-Match header.
+            name (str): Name of the cached endpoint.
+            key (uuid.UUID): The question or quiz id of the response.
+            entry (CachedResponse): The response to return.
+
+        Returns:
+            Response: A JSON response with an ETag header, or a 304 Not Modified response.
+        """
+        etag = self.etag(name, key, entry.version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        return Response(
+            content=entry.payload,
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+response_cache = ResponseCache()
@@ -7,10 +7,16 @@ import uuid
 
 from fastapi import WebSocket
 from pydantic import BaseModel
-from app.database.setup import Answer, Question, QuestionPublic, SessionLocal
+from app.database.setup import Answer, Question, QuestionPublic, Quiz, SessionLocal
 from app.internal.analysis import perform_sentiment_analysis
-from processing.definitions import Answer as AnalysisAnswer
+from processing.definitions import (
+    AnalysisRequest,
+    Answer as AnalysisAnswer,
+    SummaryResult,
+)
+from processing.llm import scheduler, usage
 from processing.preprocessing import preprocessing
+from processing.summary import rolling
 
 logger = logging.getLogger("app")
 
@@ -36,6 +42,7 @@ class SessionPublic(BaseModel):
     audience_count: int
     current_question: QuestionPublic | None = None
     current_answers: list[Answer] = []
+    draft_summary: SummaryResult | None = None
 
 
 class Session:
@@ -58,6 +65,12 @@ class Session:
     sleep_task: asyncio.Task | None
     sentiment_tasks: set[asyncio.Task]
 
+    # Summary of the first `draft_answer_count` prepared answers, when rolling summaries are enabled
+    draft_summary: SummaryResult | None
+    draft_answer_count: int
+    draft_lock: asyncio.Lock
+    draft_tasks: set[asyncio.Task]
+
     def __init__(self, id: str, owner_id: str, quiz_id: uuid.UUID) -> None:
         self.id = id
         self.owner_id = owner_id
@@ -76,6 +89,11 @@ class Session:
         self.sleep_task = None
         self.sentiment_tasks = set()
 
+        self.draft_summary = None
+        self.draft_answer_count = 0
+        self.draft_lock = asyncio.Lock()
+        self.draft_tasks = set()
+
     def register_connection(self, connection: WebSocket) -> None:
         """
         Registers a new WebSocket connection in the session.
@@ -129,6 +147,7 @@ class Session:
             audience_count=self.audience_count(),
             current_question=self.current_question,
             current_answers=self.current_answers,
+            draft_summary=self.draft_summary,
         )
 
     async def shut_down(self) -> None:
@@ -142,18 +161,21 @@ class Session:
 
     async def _handle_sentiment(
         self,
+        question: Question,
         prepared_answers: Iterable[AnalysisAnswer],
     ) -> None:
         """
         Perform sentiment analysis on a batch of prepared answers and store in database.
 
         Args:
+            question (Question): The question to which the answers belong.
             prepared_answers (Iterable[AnalysisAnswer]): List of preprocessed answers
         """
         try:
             with SessionLocal() as db:
                 await perform_sentiment_analysis(
                     db=db,
+                    question=question,
                     prepared_answers=prepared_answers,
                 )
         except Exception as e:
@@ -162,12 +184,56 @@ class Session:
                 exc_info=e,
             )
 
+    async def _handle_draft_summary(self, question: Question) -> None:
+        """
+        Update the draft summary with the prepared answers it does not cover yet.
+        Answers of a failed update are included in the next one.
+
+        Args:
+            question (Question): The question to which the answers belong.
+        """
+        # Drafts are not urgent, so live analyses of every session go first
+        scheduler.priority.set(scheduler.Priority.Background)
+        usage.stage.set("draft_summary")
+        async with self.draft_lock:
+            if question is not self.current_question:
+                return
+            new_answers = self.prepared_answers[self.draft_answer_count :]
+            if not new_answers:
+                return
+
+            try:
+                with SessionLocal() as db:
+                    quiz = db.get(Quiz, self.quiz_id)
+                draft_summary = await rolling.update(
+                    request=AnalysisRequest(
+                        question=question.text,
+                        answers=[answer.text for answer in new_answers],
+                        quiz_name=quiz.name,
+                        quiz_description=quiz.description,
+                        audience_count=self.audience_count(),
+                    ),
+                    draft=self.draft_summary,
+                    draft_count=self.draft_answer_count,
+                )
+            except Exception as e:
+                logger.debug(
+                    "Draft summary update failed for answer batch",
+                    exc_info=e,
+                )
+                return
+
+            if question is self.current_question:
+                self.draft_summary = draft_summary
+                self.draft_answer_count += len(new_answers)
+
     async def _handle_batch(self) -> None:
         """
         Prepares a batch of answers by passing them to preprocessing functions
         in the processing module. If a batch fails, the original answers are
         used as a fallback.
         """
+        usage.stage.set("preprocessing")
         async with self.batch_lock:
             start_time = time.monotonic()
 
@@ -209,9 +275,18 @@ class Session:
             # Run sentiment analysis as a background task
             self.sentiment_tasks.add(
                 asyncio.create_task(
-                    self._handle_sentiment(prepared_answers=prepared_answers)
+                    self._handle_sentiment(
+                        question=self.current_question,
+                        prepared_answers=prepared_answers,
+                    )
                 )
             )
+            if rolling.ENABLED:
+                self.draft_tasks.add(
+                    asyncio.create_task(
+                        self._handle_draft_summary(question=self.current_question)
+                    )
+                )
             logger.debug(
                 f"Batch of {batch_size} answers processed in {time.monotonic() - start_time}s"
             )
@@ -223,10 +298,14 @@ class Session:
         same time right before the analyses should be rendered on screen.
         """
         logger.debug(f"Worker task for session {self.id} started")
+        usage.attribute(session=self.id, quiz=self.quiz_id)
 
         self.answer_batch = []
         self.prepared_answers = []
         self.sentiment_tasks = set()
+        self.draft_summary = None
+        self.draft_answer_count = 0
+        self.draft_tasks = set()
 
         try:
             while not self.cancel_worker_task:
@@ -266,3 +345,28 @@ class Session:
         """Await any running sentiment analysis tasks"""
         await asyncio.gather(*self.sentiment_tasks)
         self.sentiment_tasks.clear()
+
+    async def get_draft_summary(self) -> rolling.Draft | None:
+        """
+        Prepares any remaining answers and returns the draft summary with the number of
+        answers it covers, so that the answers it does not cover yet are folded in when
+        it is refined. Pending draft updates run at background priority, so they are
+        cancelled instead of awaited. Drafts that do not cover a large share of the answers
+        are dropped, and the answers are summarised without a draft.
+
+        Returns:
+            rolling.Draft | None: The draft summary, if rolling summaries are enabled and it covers enough answers.
+        """
+        await self.get_prepared_answers()
+        for task in self.draft_tasks:
+            task.cancel()
+        self.draft_tasks.clear()
+
+        if self.draft_summary is None:
+            return None
+        uncovered = len(self.prepared_answers) - self.draft_answer_count
+        if uncovered > rolling.MAX_UNCOVERED_SHARE * len(self.prepared_answers):
+            return None
+        return rolling.Draft(
+            summary=self.draft_summary, answer_count=self.draft_answer_count
+        )
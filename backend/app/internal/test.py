@@ -0,0 +1,715 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+
+# The setup module requires a database url to be configured on import
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'quizzma_test.db')}",
+)
+
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.database.setup import (
+    Answer,
+    ImportJob,
+    ImportJobStage,
+    LLMUsage,
+    Question,
+    Quiz,
+    QuizPublic,
+    SentimentAnalysis,
+    Summary,
+    Topic,
+)
+from app.internal import analysis, export, import_jobs, usage
+from app.internal.pagination import NEXT_CURSOR_HEADER, PageParams, paginate
+from app.internal.response_cache import CachedResponse, ResponseCache
+from app.internal.session import Session as QuizSession
+from app.routers import host
+from processing.definitions import (
+    AnalysisRequest,
+    Answer as AnalysisAnswer,
+    SummaryResult,
+)
+from processing.formatting.question_import import QuestionFormat
+from processing.llm.usage import UsageAccumulator
+from processing.preprocessing import preprocessing
+from processing.summary import rolling
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(self.engine)
+        # Quizzes created in the same instant are ordered by id
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        with Session(self.engine) as db:
+            for i in range(7):
+                quiz = Quiz(
+                    name=f"Quiz {i}",
+                    user_id="u" * 28,
+                    created_at=created_at + timedelta(minutes=i // 2),
+                )
+                db.add(quiz)
+                db.add(Question(quiz_id=quiz.id, text=f"Question {i}"))
+            db.commit()
+            self.expected_ids = [
+                str(quiz.id)
+                for quiz in db.exec(
+                    select(Quiz).order_by(Quiz.created_at, Quiz.id)
+                ).all()
+            ]
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def fetch(self, page: PageParams) -> tuple[list[dict], str | None]:
+        with Session(self.engine) as db:
+            response = paginate(
+                db=db,
+                statement=select(Quiz),
+                model=Quiz,
+                public_model=QuizPublic,
+                page=page,
+                relationships={"questions": selectinload(Quiz.questions)},
+                order_by=Quiz.created_at,
+            )
+        return json.loads(response.body), response.headers.get(NEXT_CURSOR_HEADER)
+
+    def test_every_item_is_returned_without_a_limit(self):
+        items, cursor = self.fetch(PageParams())
+        self.assertEqual([item["id"] for item in items], self.expected_ids)
+        self.assertIsNone(cursor)
+        self.assertEqual(len(items[0]["questions"]), 1)
+
+    def test_cursor_round_trip(self):
+        ids: list[str] = []
+        cursor = None
+        pages = 0
+        while True:
+            items, cursor = self.fetch(PageParams(limit=2, cursor=cursor))
+            ids.extend(item["id"] for item in items)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(ids, self.expected_ids)
+        self.assertEqual(pages, 4)
+
+    def test_last_page(self):
+        items, cursor = self.fetch(PageParams(limit=7))
+        self.assertEqual(len(items), 7)
+        self.assertIsNone(cursor)
+
+        items, cursor = self.fetch(PageParams(limit=6))
+        self.assertIsNotNone(cursor)
+        items, cursor = self.fetch(PageParams(limit=6, cursor=cursor))
+        self.assertEqual([item["id"] for item in items], self.expected_ids[6:])
+        self.assertIsNone(cursor)
+
+    def test_fields_projection(self):
+        items, _ = self.fetch(PageParams(limit=3, fields="id, name"))
+        self.assertEqual([set(item) for item in items], [{"id", "name"}] * 3)
+
+        with self.assertRaises(HTTPException) as context:
+            self.fetch(PageParams(fields="id,secret"))
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(HTTPException) as context:
+            self.fetch(PageParams(cursor="not a cursor"))
+        self.assertEqual(context.exception.status_code, 400)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self) -> None:
+        # A file database, so that the connections checked out of the pool can be counted
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.directory.name, 'export.db')}"
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session_local = sessionmaker(
+            autocommit=False, autoflush=False, bind=self.engine, class_=Session
+        )
+        self.patches = [
+            mock.patch.object(export, "SessionLocal", self.session_local),
+            mock.patch.object(export, "EXPORT_BATCH_SIZE", 4),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def seed_quiz(self, n_questions: int, n_answers: int) -> uuid.UUID:
+        with Session(self.engine) as db:
+            quiz = Quiz(name="Quiz", user_id="u" * 28)
+            db.add(quiz)
+            for i in range(n_questions):
+                question = Question(quiz_id=quiz.id, text=f"Question {i}")
+                answers = [
+                    Answer(question_id=question.id, text=f"Answer {i}.{j}")
+                    for j in range(n_answers)
+                ]
+                topic = Topic(
+                    algorithm="LDA",
+                    question_id=question.id,
+                    label=f"Topic {i}",
+                    topic="a, b",
+                    answers=answers[::2],
+                )
+                db.add(question)
+                db.add_all(answers)
+                db.add(topic)
+                if answers:
+                    db.add(
+                        SentimentAnalysis(
+                            answer_id=answers[0].id,
+                            algorithm="VADER",
+                            verdict="Positive",
+                            compound=0.5,
+                            positive=0.5,
+                            neutral=0.5,
+                            negative=0.0,
+                        )
+                    )
+                db.add(
+                    Summary(
+                        question_id=question.id,
+                        summary_text=f"Summary {i}",
+                        algorithm="x",
+                    )
+                )
+                db.add(
+                    Summary(
+                        question_id=question.id,
+                        topic_id=topic.id,
+                        summary_text=f"Topic summary {i}",
+                        algorithm="x",
+                    )
+                )
+            db.commit()
+            return quiz.id
+
+    def test_ndjson_contains_every_answer_once(self):
+        quiz_id = self.seed_quiz(n_questions=2, n_answers=5)
+        chunks = []
+        for chunk in export.stream_export(quiz_id, export.ExportFormat.NDJSON):
+            # No connection is held while the client reads a chunk
+            self.assertEqual(self.engine.pool.checkedout(), 0)
+            chunks.append(chunk)
+
+        rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len({row["answer_id"] for row in rows}), 10)
+        self.assertEqual(
+            sorted(row["answer"] for row in rows),
+            sorted(f"Answer {i}.{j}" for i in range(2) for j in range(5)),
+        )
+
+        first_answers = [row for row in rows if row["answer"].endswith(".0")]
+        for row in first_answers:
+            index = row["answer"][len("Answer ")]
+            self.assertEqual(row["summary"], f"Summary {index}")
+            self.assertEqual(row["sentiment_verdict"], "Positive")
+            self.assertEqual(row["topic_labels"], [f"Topic {index}"])
+            self.assertEqual(row["topic_summaries"], [f"Topic summary {index}"])
+
+    def test_csv_has_a_header_and_a_row_per_answer(self):
+        quiz_id = self.seed_quiz(n_questions=1, n_answers=4)
+        content = "".join(export.stream_export(quiz_id, export.ExportFormat.CSV))
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(list(rows[0]), export.EXPORT_COLUMNS)
+        self.assertEqual(
+            sorted(row["topic_labels"] for row in rows), ["", "", "Topic 0", "Topic 0"]
+        )
+
+    def test_overall_summary_matches_the_analyses(self):
+        quiz_id = self.seed_quiz(n_questions=1, n_answers=1)
+        with Session(self.engine) as db:
+            question = db.exec(
+                select(Question).where(Question.quiz_id == quiz_id)
+            ).one()
+            db.add(
+                Summary(
+                    question_id=question.id, summary_text="Later summary", algorithm="x"
+                )
+            )
+            db.commit()
+            db.refresh(question)
+            # The analyses show the first overall summary of the question
+            shown = [
+                summary.summary_text
+                for summary in question.summaries
+                if summary.topic_id is None
+            ][0]
+
+        (line,) = export.stream_export(quiz_id, export.ExportFormat.NDJSON)
+        self.assertEqual(json.loads(line)["summary"], shown)
+
+    def test_empty_quiz(self):
+        quiz_id = self.seed_quiz(n_questions=1, n_answers=0)
+        self.assertEqual(
+            list(export.stream_export(quiz_id, export.ExportFormat.NDJSON)), []
+        )
+        content = "".join(export.stream_export(quiz_id, export.ExportFormat.CSV))
+        self.assertEqual(content.strip(), ",".join(export.EXPORT_COLUMNS))
+
+
+class TestImportJobs(unittest.TestCase):
+    def setUp(self) -> None:
+        # A file database, so that the job can use sessions from other threads
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.directory.name, 'import.db')}"
+        )
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as db:
+            quiz = Quiz(name="Quiz", user_id="u" * 28)
+            job = ImportJob(quiz_id=quiz.id)
+            db.add(quiz)
+            db.add(job)
+            db.commit()
+            self.quiz_id, self.job_id = quiz.id, job.id
+
+        self.formatting_results = [
+            QuestionFormat(
+                question=f"Question {i}", answers=[f"Answer {i}.{j}" for j in range(3)]
+            )
+            for i in range(3)
+        ]
+        self.summarised: list[str] = []
+        self.patches = [
+            mock.patch.object(
+                import_jobs,
+                "SessionLocal",
+                sessionmaker(
+                    autocommit=False, autoflush=False, bind=self.engine, class_=Session
+                ),
+            ),
+            mock.patch.object(
+                import_jobs,
+                "perform_import_formatting",
+                mock.AsyncMock(return_value=self.formatting_results),
+            ),
+            mock.patch.object(
+                import_jobs.preprocessing,
+                "correct_and_translate",
+                mock.AsyncMock(side_effect=self.correct_and_translate),
+            ),
+            mock.patch.object(
+                import_jobs, "perform_summarisation", self.perform_summarisation
+            ),
+            mock.patch.object(
+                import_jobs, "perform_sentiment_analysis", mock.AsyncMock()
+            ),
+            mock.patch.object(
+                import_jobs, "perform_topic_modelling", mock.AsyncMock(return_value=[])
+            ),
+            mock.patch.object(
+                import_jobs, "perform_topic_summarisation", mock.AsyncMock()
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    async def correct_and_translate(self, documents: list[str]) -> list[str]:
+        await asyncio.sleep(0)
+        return [document.upper() for document in documents]
+
+    async def perform_summarisation(self, db, quiz, question, prepared_answers) -> None:
+        self.summarised.extend(answer.text for answer in prepared_answers)
+
+    def run_job(self) -> ImportJob:
+        asyncio.run(import_jobs.run_import_job(self.job_id, ["file contents"]))
+        with Session(self.engine) as db:
+            return db.get(ImportJob, self.job_id)
+
+    def test_questions_are_stored_prepared_and_analysed(self):
+        job = self.run_job()
+        self.assertEqual(job.stage, ImportJobStage.Analysed)
+        self.assertEqual(job.question_count, 3)
+        self.assertEqual(job.prepared_count, 3)
+        self.assertEqual(job.analysed_count, 3)
+        self.assertIsNone(job.error)
+
+        with Session(self.engine) as db:
+            questions = db.exec(
+                select(Question).where(Question.quiz_id == self.quiz_id)
+            ).all()
+            self.assertEqual(len(questions), 3)
+            self.assertEqual(sum(len(question.answers) for question in questions), 9)
+        # Analyses receive the prepared answers
+        self.assertEqual(
+            sorted(self.summarised),
+            sorted(f"ANSWER {i}.{j}" for i in range(3) for j in range(3)),
+        )
+
+    def test_questions_are_analysed_in_parallel(self):
+        running = 0
+        max_running = 0
+
+        async def perform_sentiment_analysis(db, question, prepared_answers) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        with mock.patch.object(
+            import_jobs, "perform_sentiment_analysis", perform_sentiment_analysis
+        ), mock.patch.object(import_jobs, "IMPORT_CONCURRENCY", 2):
+            job = self.run_job()
+        self.assertEqual(job.stage, ImportJobStage.Analysed)
+        self.assertEqual(max_running, 2)
+
+    def test_questions_are_analysed_as_soon_as_they_are_prepared(self):
+        events: list[str] = []
+
+        async def correct_and_translate(documents: list[str]) -> list[str]:
+            question = documents[0].split(".")[0]
+            events.append(f"preparing {question}")
+            # The first question takes longer to prepare than the others
+            await asyncio.sleep(0.05 if question == "Answer 0" else 0)
+            events.append(f"prepared {question}")
+            return documents
+
+        async def perform_summarisation(db, quiz, question, prepared_answers) -> None:
+            events.append(f"analysed {prepared_answers[0].text.split('.')[0]}")
+
+        with mock.patch.object(
+            import_jobs.preprocessing, "correct_and_translate", correct_and_translate
+        ), mock.patch.object(
+            import_jobs, "perform_summarisation", perform_summarisation
+        ):
+            self.run_job()
+        # Every question is prepared at the same time
+        self.assertEqual(set(events[:3]), {f"preparing Answer {i}" for i in range(3)})
+        self.assertLess(
+            events.index("analysed Answer 1"), events.index("prepared Answer 0")
+        )
+        self.assertEqual(events[-1], "analysed Answer 0")
+
+    def test_failed_analysis_step_does_not_fail_the_job(self):
+        with mock.patch.object(
+            import_jobs,
+            "perform_sentiment_analysis",
+            mock.AsyncMock(side_effect=RuntimeError("model unavailable")),
+        ):
+            job = self.run_job()
+        self.assertEqual(job.stage, ImportJobStage.Analysed)
+        self.assertEqual(job.analysed_count, 3)
+
+    def test_failure_is_stored_without_details(self):
+        with mock.patch.object(
+            import_jobs,
+            "perform_import_formatting",
+            mock.AsyncMock(side_effect=RuntimeError("secret details")),
+        ):
+            job = self.run_job()
+        self.assertEqual(job.stage, ImportJobStage.Failed)
+        self.assertEqual(job.error, import_jobs.IMPORT_FAILED_ERROR)
+
+    def test_failed_preparation_cancels_the_analyses(self):
+        leftover: list[asyncio.Task] = []
+
+        async def run() -> None:
+            await import_jobs.run_import_job(self.job_id, ["file contents"])
+            leftover.extend(
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            )
+
+        write_job = import_jobs._write_job
+
+        def fail_preparations(job_id: uuid.UUID, values: dict) -> None:
+            if "prepared_count" in values:
+                raise RuntimeError("database unavailable")
+            write_job(job_id, values)
+
+        with mock.patch.object(import_jobs, "_write_job", fail_preparations):
+            asyncio.run(run())
+        self.assertEqual(leftover, [])
+        with Session(self.engine) as db:
+            job = db.get(ImportJob, self.job_id)
+        self.assertEqual(job.stage, ImportJobStage.Failed)
+        self.assertEqual(job.analysed_count, 0)
+        self.assertEqual(self.summarised, [])
+
+
+class TestDraftSummary(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.session = QuizSession(id="ABCD", owner_id="u" * 28, quiz_id=uuid.uuid4())
+        self.session.prepared_answers = [
+            AnalysisAnswer(id=uuid.uuid4(), text=text) for text in ["Good", "Fast"]
+        ]
+        self.draft = SummaryResult(algorithm="rolling", summary_text="Mostly good")
+
+    async def test_complete_draft_is_returned(self):
+        self.session.draft_summary = self.draft
+        self.session.draft_answer_count = 2
+        self.assertEqual(
+            await self.session.get_draft_summary(),
+            rolling.Draft(summary=self.draft, answer_count=2),
+        )
+
+    async def test_pending_updates_are_cancelled_instead_of_awaited(self):
+        self.session.draft_summary = self.draft
+        self.session.draft_answer_count = 1
+        update = asyncio.create_task(asyncio.sleep(60))
+        self.session.draft_tasks.add(update)
+
+        draft = await asyncio.wait_for(self.session.get_draft_summary(), timeout=1)
+        self.assertEqual(draft, rolling.Draft(summary=self.draft, answer_count=1))
+        await asyncio.sleep(0)
+        self.assertTrue(update.cancelled())
+        self.assertEqual(self.session.draft_tasks, set())
+
+    async def test_answers_after_the_last_update_are_refined_into_the_draft(self):
+        self.session.draft_summary = self.draft
+        self.session.draft_answer_count = 2
+        # An answer that came in after the last draft update, prepared when the analyses are shown
+        self.session.answer_batch = [Answer(question_id=uuid.uuid4(), text="Too fast")]
+        refined: list[tuple[list[str], rolling.Draft]] = []
+
+        async def refine(
+            request: AnalysisRequest, draft: rolling.Draft
+        ) -> SummaryResult:
+            refined.append((request.answers, draft))
+            return SummaryResult(algorithm="rolling", summary_text="Good but fast")
+
+        with (
+            mock.patch.object(rolling, "ENABLED", True),
+            mock.patch.object(
+                preprocessing,
+                "correct_and_translate",
+                mock.AsyncMock(side_effect=lambda documents: documents),
+            ),
+            mock.patch.object(QuizSession, "_handle_sentiment", mock.AsyncMock()),
+            mock.patch.object(rolling, "refine", refine),
+        ):
+            draft = await self.session.get_draft_summary()
+            prepared_answers = await self.session.get_prepared_answers()
+            request = AnalysisRequest(
+                question="How is the course?",
+                answers=[answer.text for answer in prepared_answers],
+                quiz_name="Quiz",
+            )
+            summary = await analysis._refine_draft(request, draft)
+
+        self.assertEqual(draft, rolling.Draft(summary=self.draft, answer_count=2))
+        self.assertEqual(summary.summary_text, "Good but fast")
+        ((answers, refined_draft),) = refined
+        self.assertEqual(answers[refined_draft.answer_count :], ["Too fast"])
+
+    async def test_drafts_missing_many_answers_are_dropped(self):
+        self.session.draft_summary = self.draft
+        self.session.draft_answer_count = 2
+        self.session.prepared_answers += [
+            AnalysisAnswer(id=uuid.uuid4(), text=text)
+            for text in ["Slow", "Hard", "Ok"]
+        ]
+        self.assertIsNone(await self.session.get_draft_summary())
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = (
+        [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    )
+    return Request({"type": "http", "headers": headers})
+
+
+class TestUsage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.accumulator = UsageAccumulator()
+        self.patches = [
+            mock.patch.object(
+                usage,
+                "SessionLocal",
+                sessionmaker(
+                    autocommit=False, autoflush=False, bind=self.engine, class_=Session
+                ),
+            ),
+            mock.patch.object(usage.usage, "accumulator", self.accumulator),
+        ]
+        for patch in self.patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_flushed_usage_is_reported(self):
+        quiz_id = uuid.uuid4()
+        usage.usage.attribute(quiz=quiz_id)
+        self.addCleanup(usage.usage.attribute)
+        for latency in [0.1, 0.1, 3.0]:
+            self.accumulator.record("gpt-4o-mini", 100, 10, latency=latency)
+        usage.flush_usage()
+        self.accumulator.record("gpt-4o-mini", 100, 10, latency=0.1)
+        usage.flush_usage()
+
+        report = usage.get_usage_report(quiz_id=quiz_id)
+        (stage,) = report.stages
+        self.assertEqual((stage.requests, stage.prompt_tokens), (4, 400))
+        self.assertEqual((stage.latency_p50, stage.latency_p99), (0.25, 4))
+        self.assertEqual(usage.get_usage_report(quiz_id=uuid.uuid4()).stages, [])
+
+    def test_usage_is_kept_when_a_flush_fails(self):
+        self.accumulator.record("gpt-4o-mini", 100, 10, latency=0.1)
+        with (
+            mock.patch.object(usage, "bulk_insert", side_effect=RuntimeError),
+            self.assertLogs("app", "ERROR"),
+        ):
+            usage.flush_usage()
+        usage.flush_usage()
+
+        with Session(self.engine) as db:
+            (row,) = db.exec(select(LLMUsage)).all()
+        self.assertEqual((row.requests, row.prompt_tokens), (1, 100))
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = ResponseCache()
+        self.question_id = uuid.uuid4()
+        self.quiz_id = uuid.uuid4()
+
+    def store(self, key: uuid.UUID, version: int | None = None) -> CachedResponse:
+        entry = CachedResponse(
+            version=self.cache.version(key) if version is None else version,
+            payload=b'{"summary": "Good"}',
+        )
+        self.cache.set("overall_analysis", key, entry)
+        return entry
+
+    def test_etag_and_not_modified(self):
+        entry = self.store(self.question_id)
+        response = self.cache.response(
+            request=_request(),
+            name="overall_analysis",
+            key=self.question_id,
+            entry=entry,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, entry.payload)
+
+        etag = response.headers["ETag"]
+        response = self.cache.response(
+            request=_request(f'W/"other", {etag}'),
+            name="overall_analysis",
+            key=self.question_id,
+            entry=entry,
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # A new version gets a new ETag
+        self.cache.bump(question_id=self.question_id)
+        entry = self.store(self.question_id)
+        response = self.cache.response(
+            request=_request(etag),
+            name="overall_analysis",
+            key=self.question_id,
+            entry=entry,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_bump_invalidates_only_the_written_keys(self):
+        self.store(self.question_id)
+        self.store(self.quiz_id)
+        self.cache.bump(question_id=self.question_id)
+        self.assertIsNone(self.cache.get("overall_analysis", self.question_id))
+        self.assertIsNotNone(self.cache.get("overall_analysis", self.quiz_id))
+
+        self.cache.bump(question_id=uuid.uuid4(), quiz_id=self.quiz_id)
+        self.assertIsNone(self.cache.get("overall_analysis", self.quiz_id))
+
+    def test_write_while_computing_is_not_served(self):
+        # The version is read before the response is computed from the database
+        version = self.cache.version(self.question_id)
+        self.cache.bump(question_id=self.question_id)
+        self.store(self.question_id, version=version)
+        self.assertIsNone(self.cache.get("overall_analysis", self.question_id))
+
+    def test_evicted_versions_never_serve_stale_responses(self):
+        cache = ResponseCache(max_versions=2)
+        self.cache = cache
+        # Cached before the question was ever written to
+        self.store(self.question_id)
+        cache.bump(question_id=self.question_id)
+        for _ in range(3):
+            cache.bump(question_id=uuid.uuid4())
+        self.assertEqual(len(cache.versions), 2)
+        self.assertIsNone(cache.get("overall_analysis", self.question_id))
+
+        self.store(self.question_id)
+        self.assertIsNotNone(cache.get("overall_analysis", self.question_id))
+
+    def test_deleted_quiz_is_not_served(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(engine)
+        user_id = "u" * 28
+        with Session(engine) as db:
+            quiz = Quiz(name="Quiz", user_id=user_id)
+            db.add(quiz)
+            db.add(Question(quiz_id=quiz.id, text="Question"))
+            db.commit()
+            quiz_id = quiz.id
+
+        async def get_analyses():
+            with Session(engine) as db:
+                return await host.get_quiz_analyses(
+                    quiz_id, _request(), db, user_id, self.cache
+                )
+
+        self.assertEqual(asyncio.run(get_analyses()).status_code, 200)
+        # Served from the cache
+        self.assertIsNotNone(self.cache.get("quiz_analyses", quiz_id))
+
+        async def delete():
+            with Session(engine) as db:
+                await host.delete_quiz(quiz_id, db, user_id, self.cache)
+
+        asyncio.run(delete())
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(get_analyses())
+        self.assertEqual(context.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
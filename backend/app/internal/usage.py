@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from sqlmodel import select
+
+from app.database.bulk import bulk_insert
+from app.database.setup import LLMUsage, SessionLocal
+from processing.llm import usage
+
+load_dotenv()
+
+logger = logging.getLogger("app")
+
+# Seconds between every flush of the LLM usage aggregated in memory to the database
+USAGE_FLUSH_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", "60"))
+
+
+class StageUsage(BaseModel):
+    """Usage of LLM requests of a pipeline stage with a single model"""
+
+    stage: str
+    model: str
+    requests: int
+    failures: int
+    prompt_tokens: int
+    completion_tokens: int
+    # Upper bounds of the latency buckets of the percentiles in seconds, None if no
+    # request succeeded
+    latency_p50: float | None
+    latency_p95: float | None
+    latency_p99: float | None
+    # Estimated cost in USD, None if the price of the model is unknown
+    estimated_cost: float | None
+
+
+class UsageReport(BaseModel):
+    stages: list[StageUsage]
+    requests: int
+    failures: int
+    prompt_tokens: int
+    completion_tokens: int
+    estimated_cost: float
+
+
+def flush_usage() -> None:
+    """Persist the LLM usage aggregated in memory since the last flush"""
+    drained = usage.accumulator.drain()
+    if not drained:
+        return
+
+    created_at = datetime.now(timezone.utc)
+    rows = [
+        {
+            "session_id": key.session_id,
+            "quiz_id": key.quiz_id,
+            "stage": key.stage,
+            "model": key.model,
+            "requests": key_usage.requests,
+            "failures": key_usage.failures,
+            "prompt_tokens": key_usage.prompt_tokens,
+            "completion_tokens": key_usage.completion_tokens,
+            "latency_histogram": json.dumps(key_usage.latency_histogram),
+            "created_at": created_at,
+        }
+        for key, key_usage in drained.items()
+    ]
+    try:
+        with SessionLocal() as db:
+            bulk_insert(db, LLMUsage, rows)
+            db.commit()
+    except Exception:
+        logger.exception(f"Failed to persist the usage of {len(rows)} LLM stages")
+        # Keep the usage, so that it is persisted by the next flush
+        usage.accumulator.merge(drained)
+
+
+async def flush_usage_periodically() -> None:
+    """Flush the LLM usage every `USAGE_FLUSH_SECONDS` until cancelled"""
+    while True:
+        await asyncio.sleep(USAGE_FLUSH_SECONDS)
+        await asyncio.to_thread(flush_usage)
+
+
+def get_usage_report(
+    quiz_id: uuid.UUID | None = None, session_id: str | None = None
+) -> UsageReport:
+    """
+    Report the persisted LLM usage by pipeline stage and model.
+
+    Arguments:
+        quiz_id (uuid.UUID | None): Only report the usage attributed to this quiz.
+        session_id (str | None): Only report the usage attributed to this session.
+
+    Returns:
+        UsageReport: The usage of each stage and model, and the totals.
+    """
+    query = select(LLMUsage)
+    if quiz_id is not None:
+        query = query.where(LLMUsage.quiz_id == quiz_id)
+    if session_id is not None:
+        query = query.where(LLMUsage.session_id == session_id)
+    with SessionLocal() as db:
+        rows = db.exec(query).all()
+
+    grouped: dict[tuple[str, str], usage.Usage] = {}
+    for row in rows:
+        grouped.setdefault((row.stage, row.model), usage.Usage()).merge(
+            usage.Usage(
+                requests=row.requests,
+                failures=row.failures,
+                prompt_tokens=row.prompt_tokens,
+                completion_tokens=row.completion_tokens,
+                latency_histogram=json.loads(row.latency_histogram),
+            )
+        )
+
+    stages = [
+        StageUsage(
+            stage=stage,
+            model=model,
+            requests=stage_usage.requests,
+            failures=stage_usage.failures,
+            prompt_tokens=stage_usage.prompt_tokens,
+            completion_tokens=stage_usage.completion_tokens,
+            latency_p50=usage.percentile(stage_usage.latency_histogram, 0.5),
+            latency_p95=usage.percentile(stage_usage.latency_histogram, 0.95),
+            latency_p99=usage.percentile(stage_usage.latency_histogram, 0.99),
+            estimated_cost=usage.estimate_cost(
+                model, stage_usage.prompt_tokens, stage_usage.completion_tokens
+            ),
+        )
+        for (stage, model), stage_usage in sorted(grouped.items())
+    ]
+    return UsageReport(
+        stages=stages,
+        requests=sum(stage.requests for stage in stages),
+        failures=sum(stage.failures for stage in stages),
+        prompt_tokens=sum(stage.prompt_tokens for stage in stages),
+        completion_tokens=sum(stage.completion_tokens for stage in stages),
+        estimated_cost=sum(stage.estimated_cost or 0.0 for stage in stages),
+    )
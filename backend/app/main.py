@@ -1,10 +1,14 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.database.setup import configure_db
+from app.internal.import_jobs import fail_interrupted_import_jobs
+from app.internal.pagination import NEXT_CURSOR_HEADER
+from app.internal.usage import flush_usage, flush_usage_periodically
 
-from .routers import host, session
+from .routers import host, metrics, session
 
 import firebase_admin
 from firebase_admin import credentials
@@ -20,7 +24,11 @@ async def lifespan(app: FastAPI):
     Shutdown: Code after yield is executed after having stopped receiving requests.
     """
     configure_db()
+    fail_interrupted_import_jobs()
+    flush_task = asyncio.create_task(flush_usage_periodically())
     yield
+    flush_task.cancel()
+    flush_usage()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -41,7 +49,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 app.include_router(host.router, prefix="/host", tags=["Host"])
 app.include_router(session.router, prefix="/sessions", tags=["Sessions"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
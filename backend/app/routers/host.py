@@ -1,10 +1,11 @@
 import asyncio
 import logging
-import time
-from typing import Annotated, Iterable, Optional
+from typing import Annotated, Optional
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import selectinload
 from sqlmodel import select, SQLModel
 from sqlmodel import Session as DatabaseSession
 from typing import cast
@@ -12,6 +13,8 @@ from typing import cast
 from app.database.setup import (
     Answer,
     AnswerPublicExtended,
+    ImportJob,
+    ImportJobPublic,
     Question,
     QuestionCreate,
     QuestionPublic,
@@ -27,16 +30,13 @@ from app.database.setup import (
     TopicExtended,
     TopicPublic,
 )
-from app.dependencies import authenticate, get_db_session
-from app.internal.analysis import (
-    perform_import_formatting,
-    perform_sentiment_analysis,
-    perform_summarisation,
-    perform_topic_modelling,
-    perform_topic_summarisation,
-)
-from processing.definitions import Answer as AnalysisAnswer
-from processing.preprocessing import preprocessing
+from app.database.queries import get_quiz_extended, get_quiz_with_analyses
+from app.dependencies import authenticate, get_db_session, get_response_cache
+from app.internal.export import EXPORT_MEDIA_TYPES, ExportFormat, stream_export
+from app.internal.import_jobs import start_import_job
+from app.internal.pagination import PageParams, paginate
+from app.internal.response_cache import CachedResponse, ResponseCache
+from app.internal.usage import UsageReport, get_usage_report
 
 router = APIRouter()
 
@@ -68,7 +68,7 @@ async def get_quiz(
     user_id: Annotated[str, Depends(authenticate)],
 ) -> QuizPublicExtended:
     """Fetch a single quiz by its id with related questions and ratings"""
-    quiz = db.get(Quiz, quiz_id)
+    quiz = get_quiz_extended(db=db, quiz_id=quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     if quiz.user_id != user_id and not is_admin(user_id):
@@ -76,18 +76,30 @@ async def get_quiz(
     return quiz
 
 
-@router.get("/quizzes", operation_id="get_all_quizzes")
+@router.get(
+    "/quizzes",
+    operation_id="get_all_quizzes",
+    response_model=list[QuizPublic],
+)
 async def get_quizzes(
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
-) -> list[QuizPublic]:
+    page: Annotated[PageParams, Depends()],
+) -> JSONResponse:
+    """Fetch quizzes, oldest first. When paginated, the cursor for the next page is given in the X-Next-Cursor header"""
     if is_admin(user_id):
         statement = select(Quiz)
     else:
         statement = select(Quiz).where(Quiz.user_id == user_id)
-    quizzes = db.exec(statement)
-    quizzes = quizzes.all()
-    return quizzes
+    return paginate(
+        db=db,
+        statement=statement,
+        model=Quiz,
+        public_model=QuizPublic,
+        page=page,
+        relationships={"questions": selectinload(Quiz.questions)},
+        order_by=Quiz.created_at,
+    )
 
 
 @router.post("/quizzes", operation_id="create_quiz")
@@ -108,6 +120,7 @@ async def delete_quiz(
     quiz_id: uuid.UUID,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> ResponseBase:
     """Delete a quiz by id"""
     db_quiz = db.get(Quiz, quiz_id)
@@ -116,8 +129,12 @@ async def delete_quiz(
     if db_quiz.user_id != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    question_ids = [db_question.id for db_question in db_quiz.questions]
     db.delete(db_quiz)
     db.commit()
+    cache.bump(quiz_id=quiz_id)
+    for question_id in question_ids:
+        cache.bump(question_id=question_id)
     return ResponseBase(message=f"Quiz {db_quiz.id} deleted")
 
 
@@ -131,6 +148,7 @@ async def add_predefined_question(
     question: QuestionCreate,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> QuizPublicExtended:
     """Add a predefined question to the quiz that can be asked later during a session"""
     # Retrieve the quiz and check access
@@ -144,10 +162,9 @@ async def add_predefined_question(
     db_question = Question.model_validate(question, update={"predefined": True})
     db.add(db_question)
     db.commit()
-    db.refresh(db_question)
-    db.refresh(db_quiz)
+    cache.bump(quiz_id=quiz_id)
 
-    return db_quiz
+    return get_quiz_extended(db=db, quiz_id=quiz_id)
 
 
 # Custom class for updating a question (optional field was recommended by sqlmodel docs)
@@ -165,6 +182,7 @@ async def update_predefined_question(
     question_update: QuestionUpdate,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> QuizPublicExtended:
     """
     Partially update a predefined question.
@@ -198,10 +216,9 @@ async def update_predefined_question(
 
     db.add(db_question)
     db.commit()
-    db.refresh(db_question)
-    db.refresh(db_quiz)
+    cache.bump(quiz_id=quiz_id)
 
-    return db_quiz
+    return get_quiz_extended(db=db, quiz_id=quiz_id)
 
 
 @router.delete(
@@ -213,6 +230,7 @@ async def delete_predefined_question(
     question_id: uuid.UUID,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> QuizPublicExtended:
     """
     Delete a predefined question from a quiz.
@@ -239,21 +257,26 @@ async def delete_predefined_question(
 
     db.delete(db_question)
     db.commit()
-    db.refresh(db_quiz)
-    return db_quiz
+    cache.bump(question_id=question_id, quiz_id=quiz_id)
+    return get_quiz_extended(db=db, quiz_id=quiz_id)
 
 
 # endregion
 # region Analyses
 
 
-@router.get("/quizzes/{quiz_id}/analyses/sentiment", operation_id="get_quiz_sentiment")
+@router.get(
+    "/quizzes/{quiz_id}/analyses/sentiment",
+    operation_id="get_quiz_sentiment",
+    response_model=list[SentimentAnalysisPublic],
+)
 async def get_quiz_sentiment(
     quiz_id: uuid.UUID,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
-) -> list[SentimentAnalysisPublic]:
-    """Retrieve all sentiment analyses tied to a quiz"""
+    page: Annotated[PageParams, Depends()],
+) -> JSONResponse:
+    """Retrieve the sentiment analyses tied to a quiz, optionally paginated"""
     db_quiz = db.get(Quiz, quiz_id)
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -267,17 +290,27 @@ async def get_quiz_sentiment(
         .join(Question)
         .where(Question.quiz_id == db_quiz.id)
     )
-    sentiments = db.exec(statement).all()
-    return sentiments
+    return paginate(
+        db=db,
+        statement=statement,
+        model=SentimentAnalysis,
+        public_model=SentimentAnalysisPublic,
+        page=page,
+    )
 
 
-@router.get("/quizzes/{quiz_id}/analyses/topics", operation_id="get_quiz_topics")
+@router.get(
+    "/quizzes/{quiz_id}/analyses/topics",
+    operation_id="get_quiz_topics",
+    response_model=list[TopicPublic],
+)
 async def get_quiz_topics(
     quiz_id: uuid.UUID,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
-) -> list[TopicPublic]:
-    """Retrieve all topics tied to a quiz"""
+    page: Annotated[PageParams, Depends()],
+) -> JSONResponse:
+    """Retrieve the topics tied to a quiz, optionally paginated"""
     db_quiz = db.get(Quiz, quiz_id)
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -286,17 +319,28 @@ async def get_quiz_topics(
 
     # Get topics for quiz
     statement = select(Topic).join(Question).where(Question.quiz_id == db_quiz.id)
-    topics = db.exec(statement).all()
-    return topics
+    return paginate(
+        db=db,
+        statement=statement,
+        model=Topic,
+        public_model=TopicPublic,
+        page=page,
+        relationships={"answers": selectinload(Topic.answers)},
+    )
 
 
-@router.get("/quizzes/{quiz_id}/analyses/summaries", operation_id="get_quiz_summaries")
+@router.get(
+    "/quizzes/{quiz_id}/analyses/summaries",
+    operation_id="get_quiz_summaries",
+    response_model=list[SummaryPublic],
+)
 async def get_quiz_summaries(
     quiz_id: uuid.UUID,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
-) -> list[SummaryPublic]:
-    """Retrieve all summaries tied to a quiz"""
+    page: Annotated[PageParams, Depends()],
+) -> JSONResponse:
+    """Retrieve the summaries tied to a quiz, optionally paginated"""
     db_quiz = db.get(Quiz, quiz_id)
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -305,8 +349,13 @@ async def get_quiz_summaries(
 
     # Get summaries for quiz
     statement = select(Summary).join(Question).where(Question.quiz_id == db_quiz.id)
-    summaries = db.exec(statement).all()
-    return summaries
+    return paginate(
+        db=db,
+        statement=statement,
+        model=Summary,
+        public_model=SummaryPublic,
+        page=page,
+    )
 
 
 class QuestionPublicFullAnalysis(QuestionPublic):
@@ -315,14 +364,32 @@ class QuestionPublicFullAnalysis(QuestionPublic):
     topics: list[TopicExtended] = []
 
 
+_question_full_analyses_adapter = TypeAdapter(list[QuestionPublicFullAnalysis])
+
+
 @router.get("/quizzes/{quiz_id}/analyses", operation_id="get_quiz_analyses")
 async def get_quiz_analyses(
     quiz_id: uuid.UUID,
+    request: Request,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> list[QuestionPublicFullAnalysis]:
-    """Retrieve all analyses tied to a quiz"""
-    db_quiz = db.get(Quiz, quiz_id)
+    """
+    Retrieve all analyses tied to a quiz.
+    Responses are cached until the quiz or its analyses change, and support If-None-Match.
+    """
+    # Return the cached analyses if nothing has changed since they were computed
+    cached = cache.get("quiz_analyses", quiz_id)
+    if cached is not None:
+        if cached.owner_id != user_id and not is_admin(user_id):
+            raise HTTPException(status_code=403, detail="Access denied")
+        return cache.response(
+            request=request, name="quiz_analyses", key=quiz_id, entry=cached
+        )
+    version = cache.version(quiz_id)
+
+    db_quiz = get_quiz_with_analyses(db=db, quiz_id=quiz_id)
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     if db_quiz.user_id != user_id and not is_admin(user_id):
@@ -340,125 +407,129 @@ async def get_quiz_analyses(
             )
         )
 
-    return questions_with_analysis
+    entry = CachedResponse(
+        version=version,
+        payload=_question_full_analyses_adapter.dump_json(questions_with_analysis),
+        owner_id=db_quiz.user_id,
+    )
+    cache.set("quiz_analyses", quiz_id, entry)
+    return cache.response(
+        request=request, name="quiz_analyses", key=quiz_id, entry=entry
+    )
+
+
+@router.get("/quizzes/{quiz_id}/export", operation_id="export_quiz")
+async def export_quiz(
+    quiz_id: uuid.UUID,
+    db: Annotated[DatabaseSession, Depends(get_db_session)],
+    user_id: Annotated[str, Depends(authenticate)],
+    export_format: ExportFormat = ExportFormat.NDJSON,
+) -> StreamingResponse:
+    """
+    Stream every answer in a quiz with its sentiment, topic labels and summaries
+    as NDJSON or CSV rows
+    """
+    db_quiz = db.get(Quiz, quiz_id)
+    if not db_quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if db_quiz.user_id != user_id and not is_admin(user_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return StreamingResponse(
+        stream_export(quiz_id=quiz_id, export_format=export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="quiz-{quiz_id}.{export_format.value}"'
+        },
+    )
 
 
 # endregion
 # region Question imports
 
 
-@router.post("/quizzes/{quiz_id}/import", operation_id="import_questions")
+@router.post(
+    "/quizzes/{quiz_id}/import",
+    operation_id="import_questions",
+    status_code=202,
+)
 async def import_questions(
     quiz_id: uuid.UUID,
     question_imports: list[str],
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     user_id: Annotated[str, Depends(authenticate)],
-) -> QuizPublic:
-    """Import a set of questions and answers from file contents"""
+) -> ImportJobPublic:
+    """
+    Start importing a set of questions and answers from file contents.
+    The import runs in the background, and its progress can be polled with the returned job id.
+    """
     db_quiz = db.get(Quiz, quiz_id)
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     if db_quiz.user_id != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    start_time = time.monotonic()
+    db_job = ImportJob(quiz_id=quiz_id)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
 
-    # Parse and format the raw file contents
-    formatting_results = await asyncio.gather(
-        *[perform_import_formatting(raw_content) for raw_content in question_imports]
-    )
-    # Flatten list of lists
-    formatting_results = [
-        content for contents in formatting_results for content in contents
-    ]
-    logger.info(
-        f"Imported file contents formated after {time.monotonic() - start_time}s"
-    )
+    start_import_job(job_id=db_job.id, question_imports=question_imports)
+    return db_job
 
-    # Store questions and answers in the database
-    db_questions: list[Question] = []
-    for formatting_result in formatting_results:
-        db_question = Question(
-            quiz_id=db_quiz.id,
-            text=formatting_result.question,
-        )
-        db_question.answers = [
-            Answer(question_id=db_question.id, text=answer)
-            for answer in formatting_result.answers
-        ]
 
-        db.add(db_question)
-        db_questions.append(db_question)
-    db.commit()
-    logger.info(f"Imported questions stored after {time.monotonic() - start_time}s")
-
-    # Prepare the answers by correcting and translating them
-    question_answers_map: dict[uuid.UUID, Iterable[AnalysisAnswer]] = {}
-    for db_question in db_questions:
-        documents = [answer.text for answer in db_question.answers]
-        documents = await preprocessing.correct_and_translate(
-            documents=documents,
-        )
+@router.get(
+    "/quizzes/{quiz_id}/imports/{job_id}",
+    operation_id="get_import_job",
+)
+async def get_import_job(
+    quiz_id: uuid.UUID,
+    job_id: uuid.UUID,
+    db: Annotated[DatabaseSession, Depends(get_db_session)],
+    user_id: Annotated[str, Depends(authenticate)],
+) -> ImportJobPublic:
+    """Fetch the progress of a question import"""
+    db_job = db.get(ImportJob, job_id)
+    if not db_job or db_job.quiz_id != quiz_id:
+        raise HTTPException(status_code=404, detail="Import job not found")
 
-        if len(documents) == len(db_question.answers):
-            question_answers_map[db_question.id] = [
-                AnalysisAnswer(id=answer.id, text=document)
-                for answer, document in zip(db_question.answers, documents)
-            ]
-        else:
-            # Use original answers if preprocessing produced the wrong number of documents
-            question_answers_map[db_question.id] = [
-                AnalysisAnswer(id=answer.id, text=answer.text)
-                for answer in db_question.answers
-            ]
-    logger.info(f"Prepared answers after {time.monotonic() - start_time}s")
-
-    # Perform analyses asynchronously for the new questions
-    tasks = [
-        task
-        for db_question in db_questions
-        for task in (
-            perform_summarisation(
-                db=db,
-                quiz=db_quiz,
-                question=db_question,
-                prepared_answers=question_answers_map[db_question.id],
-            ),
-            perform_sentiment_analysis(
-                db=db,
-                prepared_answers=question_answers_map[db_question.id],
-            ),
-            perform_topic_modelling(
-                db=db,
-                question=db_question,
-                prepared_answers=question_answers_map[db_question.id],
-            ),
-        )
-    ]
-    await asyncio.gather(*tasks)
+    db_quiz = db.get(Quiz, quiz_id)
+    if not db_quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if db_quiz.user_id != user_id and not is_admin(user_id):
+        raise HTTPException(status_code=403, detail="Access denied")
 
-    # Perform topic summarisation on the new topics
-    statement = select(Topic).where(
-        Topic.question_id.in_([db_question.id for db_question in db_questions])
-    )
-    db_topics = db.exec(statement).all()
-    prepared_answers = [
-        answer for answers in question_answers_map.values() for answer in answers
-    ]
-    try:
-        await perform_topic_summarisation(
-            db=db,
-            quiz=db_quiz,
-            topics=db_topics,
-            prepared_answers=prepared_answers,
-        )
-    except Exception as e:
-        logger.debug("Topic summarisation step failed", exc_info=e)
-        db.rollback()
-    logger.info(f"Imported questions analysed after {time.monotonic() - start_time}s")
+    return db_job
 
-    db.refresh(db_quiz)
-    return db_quiz
+
+# endregion
+# region Usage
+
+
+@router.get("/usage", operation_id="get_llm_usage")
+async def get_llm_usage(
+    db: Annotated[DatabaseSession, Depends(get_db_session)],
+    user_id: Annotated[str, Depends(authenticate)],
+    quiz_id: uuid.UUID | None = None,
+    session_id: str | None = None,
+) -> UsageReport:
+    """
+    Report the tokens, latency and estimated cost of the LLM requests by pipeline stage.
+    Hosts can report the usage of their own quizzes, and admins the usage of everything.
+    Only the flushed usage is reported, so the report lags by up to `LLM_USAGE_FLUSH_SECONDS`.
+    """
+    if quiz_id is not None:
+        db_quiz = db.get(Quiz, quiz_id)
+        if not db_quiz:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        if db_quiz.user_id != user_id and not is_admin(user_id):
+            raise HTTPException(status_code=403, detail="Access denied")
+    elif not is_admin(user_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return await asyncio.to_thread(
+        get_usage_report, quiz_id=quiz_id, session_id=session_id
+    )
 
 
 # endregion
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+from processing.llm import openai as llm
+from processing.llm.circuit_breaker import CircuitStatistics
+from processing.preprocessing import preprocessing
+from processing.preprocessing.preprocessing import FastPathStatistics
+from processing.summary import hedged
+from processing.summary.hedged import HedgeStatistics
+
+router = APIRouter()
+
+
+class LLMMetrics(BaseModel):
+    circuit: CircuitStatistics
+    # Waiting requests of each priority, and requests in flight
+    queue: dict[str, int]
+    hedging: HedgeStatistics
+    fast_path: FastPathStatistics
+
+
+@router.get("/llm", operation_id="llm_metrics")
+async def llm_metrics() -> LLMMetrics:
+    """
+    Get the health of the LLM API as seen by this process: the state of the circuit breaker,
+    the depth of the request queue, the outcome of hedged summarisations and the requests
+    saved by the preprocessing fast path.
+    While the circuit is open, analyses use their local fallbacks instead of the LLM.
+    """
+    return LLMMetrics(
+        circuit=llm.circuit_breaker.statistics(),
+        queue=llm.scheduler.queue_depth(),
+        hedging=hedged.statistics,
+        fast_path=preprocessing.statistics,
+    )
@@ -6,9 +6,11 @@ from fastapi import (
     APIRouter,
     HTTPException,
     Depends,
+    Request,
     WebSocket,
     WebSocketDisconnect,
 )
+from fastapi.responses import StreamingResponse
 from typing import Annotated, Any, Coroutine, Iterable
 from pydantic import BaseModel, ValidationError
 from sqlmodel import Session as DatabaseSession
@@ -16,6 +18,7 @@ from sqlmodel import Session as DatabaseSession
 from app.dependencies import (
     get_db_session,
     authenticate,
+    get_response_cache,
     get_session_manager,
 )
 from app.database.setup import (
@@ -32,11 +35,14 @@ from app.database.setup import (
     TopicExtended,
 )
 from app.internal.analysis import (
+    perform_extractive_summarisation,
     perform_sentiment_analysis,
+    perform_streaming_summarisation,
     perform_summarisation,
     perform_topic_modelling,
     perform_topic_summarisation,
 )
+from app.internal.response_cache import CachedResponse, ResponseCache
 from app.internal.session_manager import SessionManager
 from app.internal.session import (
     Session,
@@ -51,9 +57,11 @@ from app.internal.ws_helpers import (
     send_session_message,
 )
 
+from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from app.database.setup import Question
 from processing.definitions import Answer as AnalysisAnswer
+from processing.llm import usage
 
 logger = logging.getLogger("app")
 
@@ -183,6 +191,7 @@ async def await_answers_transition(
     user_id: Annotated[str, Depends(authenticate)],
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     session_manager: Annotated[SessionManager, Depends(get_session_manager)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> SessionPublic:
     """
     Submit a new question, transition to the await_answers and notify the clients.
@@ -201,6 +210,7 @@ async def await_answers_transition(
     db.add(db_question)
     db.commit()
     db.refresh(db_question)
+    cache.bump(quiz_id=db_question.quiz_id)
 
     session.stage = SessionStage.AwaitAnswers
     session.current_question = db_question
@@ -273,24 +283,37 @@ class OverallAnalysis(BaseModel):
 @router.get("/{session_id}/analyses/overall", operation_id="overall_analysis")
 async def overall_analysis(
     session_id: str,
+    request: Request,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     session_manager: Annotated[SessionManager, Depends(get_session_manager)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> OverallAnalysis:
     """
     Perform sentiment analysis on all answers to the question and create an LLM summary.
+    If the LLM fails or times out, the most representative answers are returned as the summary.
+    Responses are cached until new answers or analyses are stored, and support If-None-Match.
     """
     session = await session_manager.get_session(session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    quiz = db.get(Quiz, session.quiz_id)
-    if not quiz:
-        raise HTTPException(status_code=400, detail="Quiz not found for session")
+    usage.attribute(session=session.id, quiz=session.quiz_id)
     question = session.current_question
     if not question:
         raise HTTPException(
             status_code=400, detail="No active question in this session"
         )
 
+    # Return the cached analysis if nothing has changed since it was computed
+    cached = cache.get("overall_analysis", question.id)
+    if cached is not None:
+        return cache.response(
+            request=request, name="overall_analysis", key=question.id, entry=cached
+        )
+
+    quiz = db.get(Quiz, session.quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=400, detail="Quiz not found for session")
+
     start_time = time.monotonic()
 
     # Get the prepared answers of the session and ensure the preparation finishes
@@ -304,6 +327,7 @@ async def overall_analysis(
     ).first()
 
     # Run summarisation if necessary
+    summary_complete = db_summary is not None
     if not db_summary:
         try:
             db_summary = await perform_summarisation(
@@ -312,8 +336,10 @@ async def overall_analysis(
                 question=question,
                 prepared_answers=prepared_answers,
                 audience_count=session.audience_count(),
+                draft=await session.get_draft_summary(),
             )
             db.refresh(db_summary)
+            summary_complete = True
         except Exception as e:
             logger.debug(
                 "Summarisation failed for the question",
@@ -321,14 +347,126 @@ async def overall_analysis(
                 exc_info=e,
             )
             db.rollback()
+            db_summary = _extractive_summary(quiz, question, prepared_answers)
     await session.await_sentiments()
 
+    # Read the content version before the final read, so later writes invalidate the result
+    version = cache.version(question.id)
+
     # Retrieve the updated answers
     db_answers_statement = select(Answer).where(Answer.question_id == question.id)
     db_answers = db.exec(db_answers_statement).all()
 
     logger.debug(f"Time overall analysis: {time.monotonic() - start_time}s")
-    return OverallAnalysis(summary=db_summary, answers=db_answers)
+    payload = OverallAnalysis(summary=db_summary, answers=db_answers).model_dump_json()
+    entry = CachedResponse(version=version, payload=payload.encode())
+    # Only cache complete analyses, so a failed summarisation is retried
+    if summary_complete:
+        cache.set("overall_analysis", question.id, entry)
+    return cache.response(
+        request=request, name="overall_analysis", key=question.id, entry=entry
+    )
+
+
+def _extractive_summary(
+    quiz: Quiz, question: Question, prepared_answers: Iterable[AnalysisAnswer]
+) -> Summary | None:
+    """Summarise without an LLM after a failed summarisation, or None if that fails too"""
+    try:
+        return perform_extractive_summarisation(
+            quiz=quiz, question=question, prepared_answers=prepared_answers
+        )
+    except Exception as e:
+        logger.debug(
+            "Extractive summarisation failed for the question",
+            extra={"question_id": question.id},
+            exc_info=e,
+        )
+        return None
+
+
+def _server_sent_event(event: str, data: str) -> str:
+    """Format a server-sent event with a single line of data"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get(
+    "/{session_id}/analyses/overall/stream",
+    operation_id="stream_overall_summary",
+    response_class=StreamingResponse,
+)
+async def stream_overall_summary(
+    session_id: str,
+    db: Annotated[DatabaseSession, Depends(get_db_session)],
+    session_manager: Annotated[SessionManager, Depends(get_session_manager)],
+) -> StreamingResponse:
+    """
+    Stream the LLM summary of the answers to the current question as server-sent events.
+    `partial` events contain the summary received so far, and a final `summary` event
+    contains the persisted summary. An existing summary is sent as the final event at once.
+    If the LLM fails, the final event contains the most representative answers instead.
+    """
+    session = await session_manager.get_session(session_id=session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    usage.attribute(session=session.id, quiz=session.quiz_id)
+    question = session.current_question
+    if not question:
+        raise HTTPException(
+            status_code=400, detail="No active question in this session"
+        )
+
+    quiz = db.get(Quiz, session.quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=400, detail="Quiz not found for session")
+
+    db_summary = db.exec(
+        select(Summary).where(
+            (Summary.question_id == question.id) & (Summary.topic_id == None)
+        )
+    ).first()
+    summary_public = SummaryPublic.model_validate(db_summary) if db_summary else None
+
+    async def events():
+        if summary_public:
+            yield _server_sent_event("summary", summary_public.model_dump_json())
+            return
+
+        try:
+            prepared_answers = await session.get_prepared_answers()
+            async for result in perform_streaming_summarisation(
+                quiz=quiz,
+                question=question,
+                prepared_answers=prepared_answers,
+                audience_count=session.audience_count(),
+                draft=await session.get_draft_summary(),
+            ):
+                if isinstance(result, Summary):
+                    data = SummaryPublic.model_validate(result).model_dump_json()
+                    yield _server_sent_event("summary", data)
+                else:
+                    data = result.model_dump_json(include={"summary_text", "emoji"})
+                    yield _server_sent_event("partial", data)
+        except Exception as e:
+            logger.debug(
+                "Streaming summarisation failed for the question",
+                extra={"question_id": question.id},
+                exc_info=e,
+            )
+            fallback = _extractive_summary(quiz, question, session.prepared_answers)
+            if fallback:
+                data = SummaryPublic.model_validate(fallback).model_dump_json()
+                yield _server_sent_event("summary", data)
+            else:
+                error = SessionErrorPayload(message="Summarisation failed")
+                yield _server_sent_event("error", error.model_dump_json())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Deliver every event at once, also through buffering proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class DetailedAnalysis(BaseModel):
@@ -338,25 +476,37 @@ class DetailedAnalysis(BaseModel):
 @router.get("/{session_id}/analyses/detailed", operation_id="detailed_analysis")
 async def detailed_analysis(
     session_id: str,
+    request: Request,
     db: Annotated[DatabaseSession, Depends(get_db_session)],
     session_manager: Annotated[SessionManager, Depends(get_session_manager)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> DetailedAnalysis:
     """
     Perform topic modelling on all answers to the question, retrieve related sentiments
     and create an LLM summary for each topic.
+    Responses are cached until new answers or analyses are stored, and support If-None-Match.
     """
     session = await session_manager.get_session(session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    quiz = db.get(Quiz, session.quiz_id)
-    if not quiz:
-        raise HTTPException(status_code=400, detail="Quiz not found for session")
+    usage.attribute(session=session.id, quiz=session.quiz_id)
     question = session.current_question
     if not question:
         raise HTTPException(
             status_code=400, detail="No active question in this session"
         )
 
+    # Return the cached analysis if nothing has changed since it was computed
+    cached = cache.get("detailed_analysis", question.id)
+    if cached is not None:
+        return cache.response(
+            request=request, name="detailed_analysis", key=question.id, entry=cached
+        )
+
+    quiz = db.get(Quiz, session.quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=400, detail="Quiz not found for session")
+
     start_time = time.monotonic()
 
     # Get the prepared answers of the session and ensure the preparation finishes
@@ -402,18 +552,35 @@ async def detailed_analysis(
             )
             db.rollback()
 
+    # Read the content version before the final read, so later writes invalidate the result
+    version = cache.version(question.id)
+
     # Retrieve the final topics. Needed to get the related sentiments and summaries.
-    db_topics = db.exec(db_topic_statement).all()
+    db_topics = db.exec(
+        db_topic_statement.options(
+            selectinload(Topic.summary),
+            selectinload(Topic.answers).selectinload(Answer.sentiment),
+        ).execution_options(populate_existing=True)
+    ).all()
 
     logger.debug(f"Time detailed analysis: {time.monotonic() - start_time}s")
-    return DetailedAnalysis(topics=db_topics)
+    payload = DetailedAnalysis(topics=db_topics).model_dump_json()
+    entry = CachedResponse(version=version, payload=payload.encode())
+    # Only cache complete analyses, so failed topic summaries are retried
+    if all(topic.summary is not None for topic in db_topics):
+        cache.set("detailed_analysis", question.id, entry)
+    return cache.response(
+        request=request, name="detailed_analysis", key=question.id, entry=entry
+    )
 
 
 # endregion
 # region Websocket
 
 
-async def handle_answer(session: Session, payload: dict) -> SessionErrorPayload | None:
+async def handle_answer(
+    session: Session, payload: dict, cache: ResponseCache
+) -> SessionErrorPayload | None:
     """
     Handle an answer sent by a user (via WebSocket).
     We create/close our own short-lived DB session to avoid holding a connection forever.
@@ -437,6 +604,7 @@ async def handle_answer(session: Session, payload: dict) -> SessionErrorPayload
             db.add(db_answer)
             db.commit()
             db.refresh(db_answer)
+        cache.bump(question_id=db_answer.question_id, quiz_id=session.quiz_id)
 
         session.register_answer(answer=db_answer)
     except ValidationError as e:
@@ -453,6 +621,7 @@ async def websocket_endpoint(
     session_id: str,
     socket: WebSocket,
     session_manager: Annotated[SessionManager, Depends(get_session_manager)],
+    cache: Annotated[ResponseCache, Depends(get_response_cache)],
 ) -> None:
     """
     WebSocket endpoint to manage real-time communication for a session with audience.
@@ -480,6 +649,7 @@ async def websocket_endpoint(
                     error = await handle_answer(
                         session=session,
                         payload=message.payload,
+                        cache=cache,
                     )
                     await send_session_message(
                         socket=socket,
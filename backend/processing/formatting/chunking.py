@@ -0,0 +1,113 @@
+import csv
+import io
+from typing import Iterator
+
+
+def _sniff_dialect(content: str) -> type[csv.Dialect] | csv.Dialect:
+    """Detect the delimiter of the file content, defaulting to comma-separated values"""
+    try:
+        return csv.Sniffer().sniff(content[:8192], delimiters=",;\t")
+    except csv.Error:
+        return csv.excel
+
+
+def read_rows(content: str) -> list[list[str]] | None:
+    """
+    Read the file content as a table if it has a consistent number of columns.
+
+    Arguments:
+        content (str): The raw file content.
+
+    Returns:
+        list[list[str]] | None: The rows of the table, or None if the content is not tabular.
+    """
+    reader = csv.reader(io.StringIO(content, newline=""), _sniff_dialect(content))
+    try:
+        rows = [row for row in reader if any(cell.strip() for cell in row)]
+    except csv.Error:
+        return None
+
+    if len(rows) < 2 or len(rows[0]) < 2:
+        return None
+    # Most rows must have as many columns as the header
+    consistent_rows = sum(1 for row in rows if len(row) == len(rows[0]))
+    if consistent_rows < 0.9 * len(rows):
+        return None
+
+    return rows
+
+
+def _serialise_row(row: list[str]) -> str:
+    """Serialise a single table row as a CSV line, quoting cells where needed"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+
+def _text_records(content: str, max_characters: int) -> Iterator[tuple[str, str]]:
+    """
+    Split text content into blocks separated by blank lines.
+    Blocks that are too large are split by line, repeating the first line of the block,
+    which usually holds the question, as the header of every part.
+    """
+    block: list[str] = []
+    for line in io.StringIO(content + "\n\n"):
+        if line.strip():
+            block.append(line)
+            continue
+        if not block:
+            continue
+
+        text = "".join(block)
+        if len(text) <= max_characters:
+            yield "", text + "\n"
+        else:
+            for line in block[1:]:
+                yield block[0], line
+        block = []
+
+
+def _table_records(rows: list[list[str]]) -> Iterator[tuple[str, str]]:
+    """Split a table into rows, repeating the header row as the header of every chunk"""
+    header = _serialise_row(rows[0])
+    for row in rows[1:]:
+        yield header, _serialise_row(row)
+
+
+def split_records(content: str, max_characters: int) -> list[str]:
+    """
+    Split file content into chunks that never break a record in two.
+    Records are table rows for CSV content and blocks separated by blank lines otherwise.
+    Every chunk of a table starts with the header row, so that it can be interpreted on its own.
+
+    Arguments:
+        content (str): The raw file content.
+        max_characters (int): The preferred maximum size of a chunk. Single records
+            larger than this are kept whole in a chunk of their own.
+
+    Returns:
+        list[str]: The chunks of the content, in order.
+    """
+    rows = read_rows(content)
+    records = (
+        _table_records(rows)
+        if rows is not None
+        else _text_records(content, max_characters)
+    )
+
+    chunks: list[str] = []
+    chunk_header, chunk_records, chunk_size = "", [], 0
+    for header, record in records:
+        if chunk_records and (
+            header != chunk_header
+            or chunk_size + len(header) + len(record) > max_characters
+        ):
+            chunks.append(chunk_header + "".join(chunk_records))
+            chunk_records, chunk_size = [], 0
+        chunk_header = header
+        chunk_records.append(record)
+        chunk_size += len(record)
+    if chunk_records:
+        chunks.append(chunk_header + "".join(chunk_records))
+
+    return chunks
@@ -0,0 +1,230 @@
+import csv
+import io
+import re
+from typing import Iterable, Iterator
+
+from .chunking import read_rows
+from .question_import import ColumnMapping, QuestionFormat
+
+# Header names recognised for files with one row per answer
+_question_headers = frozenset(["question", "question text", "questions", "spørsmål"])
+_answer_headers = frozenset(
+    ["answer", "answers", "answer text", "response", "responses", "svar"]
+)
+# Header names of columns that never contain open-text answers
+_metadata_header_pattern = re.compile(
+    r"^(id|#|timestamp|time|date|created|submitted|e-?mail|name|user(name)?|"
+    r"respondent|participant|voter|session)\b",
+    re.IGNORECASE,
+)
+_numeric_pattern = re.compile(r"^[-+]?\d+([.,]\d+)?%?$")
+_bullet_pattern = re.compile(r"^\s*(?:[-*•·]|\d+[.)])\s+")
+
+# Maximum number of rows and characters per cell in samples sent to the LLM
+_sample_rows = 20
+_sample_cell_length = 200
+
+
+def _column(rows: list[list[str]], index: int) -> Iterator[str]:
+    """Iterate over the non-empty values of a column, skipping the header"""
+    for row in rows[1:]:
+        if index < len(row) and row[index].strip():
+            yield row[index].strip()
+
+
+def _is_open_text(header: str, values: list[str]) -> bool:
+    """
+    Decide whether a column contains answers to an open-ended question.
+    Metadata, numeric, likert-scale and multiple-choice columns are excluded.
+    """
+    if not header.strip() or _metadata_header_pattern.match(header.strip()):
+        return False
+    if not values or all(_numeric_pattern.match(value) for value in values):
+        return False
+    # Categorical columns repeat a small set of values
+    distinct_values = len(set(value.lower() for value in values))
+    if len(values) >= 5 and distinct_values <= max(4, 0.2 * len(values)):
+        return False
+    return True
+
+
+def _parse_long_table(rows: list[list[str]]) -> list[QuestionFormat] | None:
+    """Parse a table with one row per answer and separate question and answer columns"""
+    header = [cell.strip().lower() for cell in rows[0]]
+    question_index = next(
+        (i for i, cell in enumerate(header) if cell in _question_headers), None
+    )
+    answer_index = next(
+        (i for i, cell in enumerate(header) if cell in _answer_headers), None
+    )
+    if question_index is None or answer_index is None:
+        return None
+
+    questions: dict[str, list[str]] = {}
+    for row in rows[1:]:
+        if max(question_index, answer_index) >= len(row):
+            continue
+        question, answer = row[question_index].strip(), row[answer_index].strip()
+        if question and answer:
+            questions.setdefault(question, []).append(answer)
+
+    return [
+        QuestionFormat(question=question, answers=answers)
+        for question, answers in questions.items()
+    ]
+
+
+def _looks_like_header(rows: list[list[str]]) -> bool:
+    """
+    Decide whether the first row of a table is a header. A header never repeats in the
+    values of its columns, and has a question or a recognised metadata column, like the
+    timestamp and email columns of survey exports. Other tables are left to the column
+    mapping of the LLM, which also handles tables without a header.
+    """
+    header = [cell.strip() for cell in rows[0]]
+    for index, cell in enumerate(header):
+        if cell and cell.lower() in {value.lower() for value in _column(rows, index)}:
+            return False
+    return any(
+        cell.endswith(("?", ":")) or _metadata_header_pattern.match(cell)
+        for cell in header
+        if cell
+    )
+
+
+def _parse_wide_table(rows: list[list[str]]) -> list[QuestionFormat] | None:
+    """Parse a survey export with a header row and one column per question"""
+    if not _looks_like_header(rows):
+        return None
+
+    results: list[QuestionFormat] = []
+    for index, header in enumerate(rows[0]):
+        values = list(_column(rows, index))
+        if _is_open_text(header, values):
+            results.append(QuestionFormat(question=header.strip(), answers=values))
+    return results or None
+
+
+def parse_csv(content: str) -> list[QuestionFormat] | None:
+    """
+    Parse questions and answers from a CSV file without using an LLM.
+    Supports files with a question and an answer column, and survey exports
+    with a header row and one column per question. Tables without a recognisable
+    header are not parsed.
+
+    Arguments:
+        content (str): The raw file content.
+
+    Returns:
+        list[QuestionFormat] | None: The questions and answers, or None if the layout is not recognised.
+    """
+    rows = read_rows(content)
+    if rows is None:
+        return None
+    return _parse_long_table(rows) or _parse_wide_table(rows)
+
+
+def _blocks(content: str) -> Iterator[list[str]]:
+    """Split text content into blocks of non-empty lines separated by blank lines"""
+    block: list[str] = []
+    for line in io.StringIO(content):
+        line = line.strip()
+        if line:
+            block.append(line)
+        elif block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def parse_txt(content: str) -> list[QuestionFormat] | None:
+    """
+    Parse questions and answers from a text file without using an LLM.
+    Every block of lines separated by a blank line must start with a question,
+    ending with a question mark or colon, followed by one answer per line.
+
+    Arguments:
+        content (str): The raw file content.
+
+    Returns:
+        list[QuestionFormat] | None: The questions and answers, or None if the layout is not recognised.
+    """
+    results: list[QuestionFormat] = []
+    for block in _blocks(content):
+        question, answers = block[0], block[1:]
+        if not answers or not question.endswith(("?", ":")):
+            return None
+        results.append(
+            QuestionFormat(
+                question=question.rstrip(":").strip(),
+                answers=[_bullet_pattern.sub("", answer) for answer in answers],
+            )
+        )
+    return results or None
+
+
+def parse_local(content: str) -> list[QuestionFormat] | None:
+    """
+    Parse questions and answers from a CSV or text file with the local parsers.
+
+    Arguments:
+        content (str): The raw file content.
+
+    Returns:
+        list[QuestionFormat] | None: The questions and answers, or None if no layout is recognised.
+    """
+    return parse_csv(content) or parse_txt(content)
+
+
+def sample_rows(rows: Iterable[list[str]]) -> str:
+    """
+    Create a small CSV sample of a table, used to have an LLM infer the column mapping.
+
+    Arguments:
+        rows (Iterable[list[str]]): The rows of the table.
+
+    Returns:
+        str: The first rows as CSV, with long cells truncated.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(rows):
+        if i >= _sample_rows:
+            break
+        writer.writerow([cell[:_sample_cell_length] for cell in row])
+    return buffer.getvalue()
+
+
+def apply_column_mapping(
+    rows: list[list[str]],
+    mapping: ColumnMapping,
+) -> list[QuestionFormat]:
+    """
+    Extract questions and answers from a table using a column mapping.
+
+    Arguments:
+        rows (list[list[str]]): The rows of the table.
+        mapping (ColumnMapping): The open-text columns and their questions.
+
+    Returns:
+        list[QuestionFormat]: The questions and answers, or an empty list if the mapping
+            refers to columns outside the table.
+    """
+    # The mapping is inferred by an LLM, so indices outside the first row are rejected
+    # instead of reading the wrong column, e.g. from the end of the row
+    width = len(rows[0]) if rows else 0
+    if any(not 0 <= column.index < width for column in mapping.columns):
+        return []
+
+    data_rows = rows[1:] if mapping.has_header_row else rows
+    results: list[QuestionFormat] = []
+    for column in mapping.columns:
+        answers = [
+            row[column.index].strip()
+            for row in data_rows
+            if column.index < len(row) and row[column.index].strip()
+        ]
+        if answers:
+            results.append(QuestionFormat(question=column.question, answers=answers))
+    return results
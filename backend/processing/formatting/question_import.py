@@ -1,13 +1,22 @@
+import asyncio
 import logging
+import re
+from typing import Iterable
 
 from openai.types.chat import ChatCompletionMessageParam
 from pydantic import BaseModel
 
-from ..llm.openai import client
-
+from ..llm.openai import parse_chat_completion
+from .chunking import split_records
 
 logger = logging.getLogger("processing")
 
+# Size of the content chunks formatted by separate LLM calls, and how many run at once
+FORMATTING_CHUNK_CHARACTERS = 12000
+FORMATTING_CONCURRENCY = 4
+
+_whitespace_pattern = re.compile(r"\s+")
+
 
 class QuestionFormat(BaseModel):
     question: str
@@ -18,6 +27,16 @@ class ResponseFormat(BaseModel):
     content: list[QuestionFormat]
 
 
+class ColumnQuestion(BaseModel):
+    index: int
+    question: str
+
+
+class ColumnMapping(BaseModel):
+    has_header_row: bool
+    columns: list[ColumnQuestion]
+
+
 system_prompt: ChatCompletionMessageParam = {
     "role": "system",
     "content": """
@@ -28,27 +47,50 @@ system_prompt: ChatCompletionMessageParam = {
         2. Ignore multiple-choice, likert-scale, range and similar questions.
         3. Structure the questions and answers into the requested JSON format.
         4. Respond in valid JSON!
+
+    The data may be a part of a larger file. Tables always start with their header row.
     """,
 }
 
 
-async def run_formatting(content: str) -> list[QuestionFormat]:
+def _question_key(question: str) -> str:
+    """Normalise question text so that the same question from different chunks is merged"""
+    return _whitespace_pattern.sub(" ", question).strip().rstrip("?:.").casefold()
+
+
+def merge_questions(results: Iterable[list[QuestionFormat]]) -> list[QuestionFormat]:
     """
-    Have an LLM reformat a .csv, .txt or .json file into a given format.
+    Merge formatted chunks of a file, stitching together the answers to questions
+    that were split across chunks.
 
     Parameters:
-        content (str): The content of the .csv, .txt or .json file to provide to the LLM.
+        results (Iterable[list[QuestionFormat]]): The formatted chunks, in order.
 
     Returns:
-        list[QuestionResponse]: A list of questions with their related answers.
+        list[QuestionFormat]: The questions in order of first appearance, with all their answers.
     """
+    questions: dict[str, QuestionFormat] = {}
+    for result in results:
+        for item in result:
+            key = _question_key(item.question)
+            if key in questions:
+                questions[key].answers.extend(item.answers)
+            else:
+                questions[key] = QuestionFormat(
+                    question=item.question, answers=list(item.answers)
+                )
+    return list(questions.values())
+
+
+async def _format_chunk(content: str) -> list[QuestionFormat]:
+    """Have an LLM reformat a single chunk of a file"""
     user_prompt: ChatCompletionMessageParam = dict(
         role="user",
         content=content,
     )
 
     messages = [system_prompt, user_prompt]
-    chat_completion = await client.beta.chat.completions.parse(
+    chat_completion = await parse_chat_completion(
         messages=messages,
         model="gpt-4o-mini",
         response_format=ResponseFormat,
@@ -59,3 +101,70 @@ async def run_formatting(content: str) -> list[QuestionFormat]:
     response = ResponseFormat.model_validate_json(json_response)
 
     return response.content
+
+
+async def run_formatting(content: str) -> list[QuestionFormat]:
+    """
+    Have an LLM reformat a .csv, .txt or .json file into a given format.
+    Large files are split into record-aligned chunks that are formatted concurrently and merged.
+
+    Parameters:
+        content (str): The content of the .csv, .txt or .json file to provide to the LLM.
+
+    Returns:
+        list[QuestionResponse]: A list of questions with their related answers.
+    """
+    chunks = split_records(content, FORMATTING_CHUNK_CHARACTERS)
+    logger.debug(f"Formatting file content in {len(chunks)} chunks")
+
+    semaphore = asyncio.Semaphore(FORMATTING_CONCURRENCY)
+
+    async def format_chunk(chunk: str) -> list[QuestionFormat]:
+        async with semaphore:
+            return await _format_chunk(chunk)
+
+    results = await asyncio.gather(*(format_chunk(chunk) for chunk in chunks))
+    return merge_questions(results)
+
+
+column_mapping_prompt: ChatCompletionMessageParam = {
+    "role": "system",
+    "content": """
+    You will be provided with the first rows of a table of questions and answers formatted as .csv.
+
+    Your task is to:
+        1. Identify the columns containing open-text answers to open-ended questions, by their zero-based index.
+        2. Ignore columns with metadata, multiple-choice, likert-scale, range and similar questions.
+        3. Give the question text of each identified column, using the header if there is one.
+        4. Tell whether the first row is a header row.
+        5. Respond in valid JSON!
+    """,
+}
+
+
+async def run_column_mapping(sample: str) -> ColumnMapping:
+    """
+    Have an LLM infer which columns of a table contain open-ended questions from a small sample.
+    The mapping is applied locally to the full table, so the whole file is never sent to the LLM.
+
+    Parameters:
+        sample (str): The first rows of the table as .csv.
+
+    Returns:
+        ColumnMapping: The open-text columns and their questions.
+    """
+    user_prompt: ChatCompletionMessageParam = dict(
+        role="user",
+        content=sample,
+    )
+
+    messages = [column_mapping_prompt, user_prompt]
+    chat_completion = await parse_chat_completion(
+        messages=messages,
+        model="gpt-4o-mini",
+        response_format=ColumnMapping,
+        n=1,
+    )
+
+    json_response = chat_completion.choices[0].message.content
+    return ColumnMapping.model_validate_json(json_response)
@@ -0,0 +1,151 @@
+import unittest
+
+from processing.formatting.chunking import split_records
+from processing.formatting.local_parsers import (
+    apply_column_mapping,
+    parse_csv,
+    parse_local,
+    parse_txt,
+    read_rows,
+)
+from processing.formatting.question_import import (
+    ColumnMapping,
+    ColumnQuestion,
+    QuestionFormat,
+    merge_questions,
+)
+
+
+class TestLocalParsers(unittest.TestCase):
+    def test_survey_export(self):
+        content = (
+            "Timestamp,Email,How satisfied are you?,What could be improved?\n"
+            + "".join(
+                f"2024-01-0{i} 10:00,user{i}@example.com,{i % 3 + 1},Improvement number {i}\n"
+                for i in range(1, 10)
+            )
+        )
+        result = parse_csv(content)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(
+            [item.question for item in result], ["What could be improved?"]
+        )
+        self.assertEqual(len(result[0].answers), 9)
+
+    def test_long_table(self):
+        content = (
+            "question;answer\n"
+            "What went well?;The lectures\n"
+            'What went well?;"The exercises; mostly"\n'
+            "What went badly?;The exam\n"
+        )
+        result = parse_csv(content)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(
+            {item.question: item.answers for item in result},
+            {
+                "What went well?": ["The lectures", "The exercises; mostly"],
+                "What went badly?": ["The exam"],
+            },
+        )
+
+    def test_txt_blocks(self):
+        content = (
+            "What went well?\n- The lectures\n- The exercises\n\n"
+            "Any other comments:\n1. None\n"
+        )
+        result = parse_txt(content)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(result[0].answers, ["The lectures", "The exercises"])
+        self.assertEqual(result[1].question, "Any other comments")
+
+    def test_headerless_table_is_not_parsed(self):
+        content = (
+            "Alice,Great lecture\n"
+            "Bob,Too fast\n"
+            "Carol,More examples please\n"
+            "Dave,The slides were hard to read\n"
+            "Eve,Good pace\n"
+        )
+        self.assertIsNone(parse_csv(content))
+        self.assertIsNone(parse_local(content))
+
+    def test_header_repeated_in_data_is_not_a_header(self):
+        content = "Feedback?,Name\nGood,Alice\nFeedback?,Bob\nToo long,Carol\n"
+        self.assertIsNone(parse_csv(content))
+
+    def test_unrecognised_layouts(self):
+        self.assertIsNone(parse_txt("Some free-form notes\nwithout any questions"))
+        self.assertIsNone(parse_csv("just one line of text"))
+
+    def test_column_mapping(self):
+        rows = read_rows("a,b\nyes,Good course\nno,Too long\n")
+        mapping = ColumnMapping(
+            has_header_row=True,
+            columns=[ColumnQuestion(index=1, question="Feedback?")],
+        )
+        result = apply_column_mapping(rows, mapping)
+
+        self.assertEqual(result[0].answers, ["Good course", "Too long"])
+
+    def test_column_mapping_outside_the_table_is_rejected(self):
+        rows = read_rows("a,b\nyes,Good course\nno,Too long\n")
+        for index in (-1, 2):
+            with self.subTest(index):
+                mapping = ColumnMapping(
+                    has_header_row=True,
+                    columns=[
+                        ColumnQuestion(index=1, question="Feedback?"),
+                        ColumnQuestion(index=index, question="Other?"),
+                    ],
+                )
+                self.assertEqual(apply_column_mapping(rows, mapping), [])
+
+
+class TestChunkedFormatting(unittest.TestCase):
+    def test_table_chunks_repeat_header(self):
+        content = "Question A,Question B\n" + "".join(
+            f'"Answer {i}, with comma",Other {i}\n' for i in range(100)
+        )
+        chunks = split_records(content, max_characters=200)
+
+        self.assertGreater(len(chunks), 1)
+        rows = []
+        for chunk in chunks:
+            chunk_rows = read_rows(chunk)
+            self.assertEqual(chunk_rows[0], ["Question A", "Question B"])
+            rows.extend(chunk_rows[1:])
+        self.assertEqual(len(rows), 100)
+
+    def test_text_chunks_keep_question(self):
+        content = "What went well?\n" + "".join(f"Answer {i}\n" for i in range(50))
+        content += "\nAnything else?\nNo\n"
+        chunks = split_records(content, max_characters=100)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith(("What went well?", "Anything else?")))
+        self.assertEqual(sum(chunk.count("Answer") for chunk in chunks), 50)
+
+    def test_merge_split_questions(self):
+        result = merge_questions(
+            [
+                [QuestionFormat(question="What went well?", answers=["a"])],
+                [
+                    QuestionFormat(question="what went  well", answers=["b"]),
+                    QuestionFormat(question="Other?", answers=["c"]),
+                ],
+            ]
+        )
+
+        self.assertEqual(
+            [item.question for item in result], ["What went well?", "Other?"]
+        )
+        self.assertEqual(result[0].answers, ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
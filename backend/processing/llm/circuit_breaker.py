@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Iterator
+
+import openai
+from pydantic import BaseModel
+
+logger = logging.getLogger("processing")
+
+# Errors that indicate the API is unavailable, rather than a problem with the request
+_failure_errors = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class CircuitState(str, Enum):
+    Closed = "closed"
+    Open = "open"
+    HalfOpen = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open"""
+
+
+class CircuitStatistics(BaseModel):
+    """State of the circuit breaker and the outcome of the calls in its window"""
+
+    state: CircuitState
+    calls: int
+    failures: int
+    slow_calls: int
+    failure_rate: float
+    # Seconds until a probe request is allowed, while the circuit is open
+    retry_in: float
+    # Number of times the circuit has opened since the process started
+    opened: int
+    rejected: int
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an API that is failing, so that callers use their
+    fallbacks at once instead of waiting for every request to time out.
+
+    The outcome of the most recent calls within a time window is tracked. Calls that fail
+    with an error of the API, or take longer than `slow_call_seconds`, count as failures,
+    also when they are cancelled after that time.
+    When the failure rate of at least `minimum_calls` calls reaches `failure_rate`, the
+    circuit opens and every call is rejected for `open_seconds`. Then the circuit is half
+    open, and a single probe call is allowed. The circuit closes if the probe succeeds,
+    and opens again if it fails.
+    """
+
+    failure_rate: float
+    slow_call_seconds: float
+    open_seconds: float
+    minimum_calls: int
+    window_seconds: float
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        open_seconds: float = 30.0,
+        minimum_calls: int = 10,
+        window_seconds: float = 60.0,
+        window_size: int = 50,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+
+        # Recent calls as (finished at, failed, slow)
+        self._calls: deque[tuple[float, bool, bool]] = deque(maxlen=window_size)
+        self._state = CircuitState.Closed
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened = 0
+        self._rejected = 0
+        # Calls are also made from the worker threads of blocking libraries
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        if self._state != CircuitState.Open:
+            self._opened += 1
+            logger.warning(
+                f"LLM circuit opened, using fallbacks for {self.open_seconds}s"
+            )
+        self._state = CircuitState.Open
+        self._opened_at = now
+        self._probing = False
+
+    def _current_state(self, now: float) -> CircuitState:
+        if (
+            self._state == CircuitState.Open
+            and now - self._opened_at >= self.open_seconds
+        ):
+            self._state = CircuitState.HalfOpen
+        return self._state
+
+    def _rejects_calls(self, now: float) -> bool:
+        state = self._current_state(now)
+        return state == CircuitState.Open or (
+            state == CircuitState.HalfOpen and self._probing
+        )
+
+    def is_open(self) -> bool:
+        """Whether calls are currently rejected, so that callers can skip to their fallbacks"""
+        with self._lock:
+            return self._rejects_calls(time.monotonic())
+
+    def check(self) -> None:
+        """
+        Fail fast while calls are rejected, before waiting for a slot to make the call.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            if not self._rejects_calls(time.monotonic()):
+                return
+            self._rejected += 1
+        raise CircuitOpenError("The LLM circuit is open")
+
+    def _before_call(self) -> bool:
+        """Reject the call while the circuit is open, returning whether it is the probe"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CircuitState.Closed:
+                return False
+            if state == CircuitState.HalfOpen and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+        raise CircuitOpenError("The LLM circuit is open")
+
+    def _after_call(self, is_probe: bool, failed: bool, latency: float) -> None:
+        now = time.monotonic()
+        slow = latency > self.slow_call_seconds
+        with self._lock:
+            if is_probe:
+                self._probing = False
+                if failed or slow:
+                    self._open(now)
+                    return
+                self._state = CircuitState.Closed
+                self._calls.clear()
+                logger.warning("LLM circuit closed")
+
+            self._calls.append((now, failed, slow))
+            self._expire(now)
+            if (
+                self._state != CircuitState.Closed
+                or len(self._calls) < self.minimum_calls
+            ):
+                return
+            failures = sum(failed or slow for _, failed, slow in self._calls)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Record the outcome of the call made within the context.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, before the call is made.
+        """
+        is_probe = self._before_call()
+        start_time = time.monotonic()
+        try:
+            yield
+        except _failure_errors:
+            self._after_call(is_probe, True, time.monotonic() - start_time)
+            raise
+        except BaseException:
+            latency = time.monotonic() - start_time
+            if latency > self.slow_call_seconds:
+                # Calls cancelled by the timeout of their caller are slow, even though they never finished
+                self._after_call(is_probe, False, latency)
+            elif is_probe:
+                # Invalid requests and early cancellations say nothing about the API
+                with self._lock:
+                    self._probing = False
+            raise
+        self._after_call(is_probe, False, time.monotonic() - start_time)
+
+    def statistics(self) -> CircuitStatistics:
+        """Get the state of the circuit and the outcome of the calls in its window"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._expire(now)
+            failures = sum(failed for _, failed, _ in self._calls)
+            slow_calls = sum(slow and not failed for _, failed, slow in self._calls)
+            return CircuitStatistics(
+                state=state,
+                calls=len(self._calls),
+                failures=failures,
+                slow_calls=slow_calls,
+                failure_rate=(
+                    (failures + slow_calls) / len(self._calls) if self._calls else 0.0
+                ),
+                retry_in=(
+                    max(0.0, self._opened_at + self.open_seconds - now)
+                    if state == CircuitState.Open
+                    else 0.0
+                ),
+                opened=self._opened,
+                rejected=self._rejected,
+            )
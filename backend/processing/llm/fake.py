@@ -0,0 +1,265 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator
+
+import httpx
+import openai
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ParsedChatCompletion
+from pydantic import BaseModel
+
+from processing.llm.providers import Provider
+from processing.llm.tokens import count_tokens
+
+# Words of the generated text
+_vocabulary = (
+    "students answers lecture question topic example assignment pace exam feedback "
+    "confusing clear helpful more less time slides exercises"
+).split()
+# Length of generated strings, in words
+_words_per_string = 6
+# Length of responses that don't follow a JSON schema, in words
+_words_per_text = 40
+
+
+def _json_values(text: str) -> list[Any]:
+    """Find the JSON objects and lists embedded in a text, outermost first"""
+    decoder = json.JSONDecoder()
+    values: list[Any] = []
+    i = 0
+    while i < len(text):
+        if text[i] in "[{":
+            try:
+                value, end = decoder.raw_decode(text, i)
+                values.append(value)
+                i = end
+                continue
+            except ValueError:
+                pass
+        i += 1
+    return values
+
+
+class _ResponseGenerator:
+    """
+    Generates responses following a JSON schema. Lists of objects are filled with a
+    list of matching objects from the prompt when there is one, so that requests
+    which send a list of documents get their documents back.
+    """
+
+    definitions: dict[str, Any]
+    prompt_values: list[Any]
+    rng: random.Random
+
+    def __init__(self, schema: dict[str, Any], prompt: str, rng: random.Random):
+        self.definitions = schema.get("$defs", {})
+        self.prompt_values = _json_values(prompt)
+        self.rng = rng
+
+    def _resolve(self, schema: dict[str, Any]) -> dict[str, Any]:
+        while "$ref" in schema:
+            schema = self.definitions[schema["$ref"].rsplit("/", 1)[-1]]
+        if "anyOf" in schema:
+            return self._resolve(schema["anyOf"][0])
+        return schema
+
+    def _matching_list(self, item_schema: dict[str, Any]) -> list[Any] | None:
+        keys = set(item_schema.get("properties", {}))
+        for value in self.prompt_values:
+            if (
+                isinstance(value, list)
+                and value
+                and all(isinstance(item, dict) and set(item) == keys for item in value)
+            ):
+                return value
+        return None
+
+    def generate(self, schema: dict[str, Any]) -> Any:
+        schema = self._resolve(schema)
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        match schema.get("type"):
+            case "object":
+                return {
+                    key: self.generate(value)
+                    for key, value in schema.get("properties", {}).items()
+                }
+            case "array":
+                item_schema = self._resolve(schema.get("items", {}))
+                matching = self._matching_list(item_schema)
+                if matching is not None:
+                    return matching
+                return [
+                    self.generate(item_schema) for _ in range(self.rng.randint(1, 3))
+                ]
+            case "integer":
+                return self.rng.randint(0, 10)
+            case "number":
+                return self.rng.random()
+            case "boolean":
+                return self.rng.random() < 0.5
+            case "null":
+                return None
+            case _:
+                return " ".join(self.rng.choices(_vocabulary, k=_words_per_string))
+
+
+class FakeProvider(Provider):
+    """
+    In-process stand-in for the OpenAI API, for load testing the pipeline without network.
+
+    Responses follow the `response_format` of a request, or a JSON schema embedded in its
+    prompt, and fall back to generated text. Every response takes `latency` seconds plus
+    the time of generating its tokens at `tokens_per_second`, and fails with a rate limit
+    or server error with the probability `error_rate`.
+    """
+
+    latency: float
+    tokens_per_second: float
+    error_rate: float
+    rng: random.Random
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        tokens_per_second: float = 80,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def _error(self) -> openai.APIStatusError | None:
+        if self.rng.random() >= self.error_rate:
+            return None
+        request = httpx.Request("POST", "https://fake.invalid/v1/chat/completions")
+        if self.rng.random() < 0.5:
+            response = httpx.Response(
+                429, headers={"retry-after": "1"}, request=request
+            )
+            return openai.RateLimitError(
+                "Fake rate limit", response=response, body=None
+            )
+        response = httpx.Response(500, request=request)
+        return openai.InternalServerError(
+            "Fake server error", response=response, body=None
+        )
+
+    def _completion(
+        self, request: dict[str, Any], response_format: type[BaseModel] | None = None
+    ) -> tuple[dict[str, Any], float]:
+        """Generate a chat completion, and the time it would take to receive it"""
+        prompt = "\n".join(
+            message["content"]
+            for message in request["messages"]
+            if isinstance(message.get("content"), str)
+        )
+        if response_format is not None:
+            schema = response_format.model_json_schema()
+        else:
+            schema = next(
+                (
+                    value
+                    for value in _json_values(prompt)
+                    if isinstance(value, dict) and "properties" in value
+                ),
+                None,
+            )
+
+        if schema is not None:
+            content = json.dumps(
+                _ResponseGenerator(schema, prompt, self.rng).generate(schema),
+                ensure_ascii=False,
+            )
+        else:
+            content = " ".join(self.rng.choices(_vocabulary, k=_words_per_text))
+
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        if response_format is not None:
+            message["parsed"] = response_format.model_validate_json(content)
+        completion = {
+            "id": f"chatcmpl-fake-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return completion, self.latency + completion_tokens / self.tokens_per_second
+
+    async def create_chat_completion(self, **request: Any) -> ChatCompletion:
+        completion, duration = self._completion(request)
+        await asyncio.sleep(duration)
+        if error := self._error():
+            raise error
+        return ChatCompletion.model_validate(completion)
+
+    async def parse_chat_completion(self, **request: Any) -> ParsedChatCompletion:
+        response_format = request["response_format"]
+        completion, duration = self._completion(request, response_format)
+        await asyncio.sleep(duration)
+        if error := self._error():
+            raise error
+        return ParsedChatCompletion[response_format].model_validate(completion)
+
+    async def stream_chat_completion(
+        self, **request: Any
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        completion, duration = self._completion(request)
+        await asyncio.sleep(self.latency)
+        if error := self._error():
+            raise error
+
+        async def chunks() -> AsyncIterator[ChatCompletionChunk]:
+            content = completion["choices"][0]["message"]["content"]
+            # Roughly one token per chunk, like the OpenAI API
+            pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep((duration - self.latency) / len(pieces))
+                yield ChatCompletionChunk.model_validate(
+                    {
+                        "id": completion["id"],
+                        "object": "chat.completion.chunk",
+                        "created": completion["created"],
+                        "model": completion["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": piece},
+                                "finish_reason": (
+                                    "stop" if i == len(pieces) - 1 else None
+                                ),
+                            }
+                        ],
+                    }
+                )
+            if request.get("stream_options", {}).get("include_usage"):
+                yield ChatCompletionChunk.model_validate(
+                    {
+                        "id": completion["id"],
+                        "object": "chat.completion.chunk",
+                        "created": completion["created"],
+                        "model": completion["model"],
+                        "choices": [],
+                        "usage": completion["usage"],
+                    }
+                )
+
+        return chunks()
+
+    def create_chat_completion_sync(self, **request: Any) -> ChatCompletion:
+        completion, duration = self._completion(request)
+        time.sleep(duration)
+        if error := self._error():
+            raise error
+        return ChatCompletion.model_validate(completion)
@@ -1,9 +1,181 @@
+import logging
 import os
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ParsedChatCompletion
+
+from processing.llm.circuit_breaker import CircuitBreaker, CircuitOpenError
+from processing.llm.fake import FakeProvider
+from processing.llm.providers import OpenAIProvider, Provider
+from processing.llm.scheduler import Scheduler
+from processing.llm.tokens import count_tokens
+from processing.llm.usage import accumulator
 
 load_dotenv()
 
-_api_key = os.getenv("OPENAI_API_KEY")
-client = AsyncOpenAI(api_key=_api_key)
+logger = logging.getLogger("processing")
+
+T = TypeVar("T")
+
+
+def _load_provider() -> Provider:
+    """Select the provider of chat completions with the `LLM_PROVIDER` environment variable"""
+    name = os.getenv("LLM_PROVIDER", "openai").strip() or "openai"
+    if name == "fake":
+        logger.warning("Using the fake LLM provider, responses are generated locally")
+        return FakeProvider(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.5")),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "80")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        )
+    if name != "openai":
+        logger.warning(f"Unknown LLM provider {name}, using openai")
+    return OpenAIProvider(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+provider = _load_provider()
+
+# Budgets of the API key, shared by every request of the process
+scheduler = Scheduler(
+    requests_per_minute=int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500")),
+    tokens_per_minute=int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000")),
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "16")),
+)
+
+# Health of the API, shared by every request of the process
+circuit_breaker = CircuitBreaker(
+    failure_rate=float(os.getenv("LLM_CIRCUIT_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("LLM_CIRCUIT_SLOW_CALL_SECONDS", "20")),
+    open_seconds=float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30")),
+)
+
+# Completion tokens reserved for requests that don't set a limit
+_default_completion_tokens = 1024
+
+
+def _estimate_tokens(request: dict[str, Any]) -> int:
+    """Estimate the prompt and completion tokens of a chat completion request"""
+    prompt_tokens = sum(
+        count_tokens(message["content"], request["model"])
+        for message in request["messages"]
+        if isinstance(message.get("content"), str)
+    )
+    completion_tokens = (
+        request.get("max_completion_tokens")
+        or request.get("max_tokens")
+        or _default_completion_tokens
+    )
+    return prompt_tokens + completion_tokens * request.get("n", 1)
+
+
+def _record_usage(model: str, usage: Any, latency: float) -> None:
+    accumulator.record(
+        model=model,
+        prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+        latency=latency,
+    )
+
+
+async def _recorded_stream(
+    chunks: AsyncIterator[ChatCompletionChunk], model: str, start_time: float
+) -> AsyncIterator[ChatCompletionChunk]:
+    """Pass on the chunks of a stream, recording its usage when it ends"""
+    usage = None
+    try:
+        async for chunk in chunks:
+            # The usage is sent in the last chunk
+            usage = chunk.usage or usage
+            yield chunk
+    finally:
+        _record_usage(model, usage, time.monotonic() - start_time)
+
+
+async def _run(
+    call: Callable[[], Awaitable[T]], request: dict[str, Any], stream: bool = False
+) -> T:
+    """
+    Schedule a request, guarded by the circuit breaker, and record its usage. While the
+    circuit is open, the request fails at once with `CircuitOpenError`, without waiting
+    in the queue.
+    """
+    circuit_breaker.check()
+
+    async def guarded_call() -> T:
+        start_time = time.monotonic()
+        try:
+            with circuit_breaker.guard():
+                response = await call()
+        except CircuitOpenError:
+            raise
+        except Exception:
+            accumulator.record(model=request["model"], failed=True)
+            raise
+
+        if stream:
+            return _recorded_stream(response, request["model"], start_time)
+        _record_usage(
+            request["model"],
+            getattr(response, "usage", None),
+            time.monotonic() - start_time,
+        )
+        return response
+
+    return await scheduler.run(guarded_call, _estimate_tokens(request), stream=stream)
+
+
+async def create_chat_completion(**request: Any) -> ChatCompletion:
+    """Create a chat completion with the shared provider, once the scheduler allows it"""
+    return await _run(lambda: provider.create_chat_completion(**request), request)
+
+
+async def parse_chat_completion(**request: Any) -> ParsedChatCompletion:
+    """Create a chat completion parsed into a response format, once the scheduler allows it"""
+    return await _run(lambda: provider.parse_chat_completion(**request), request)
+
+
+async def stream_chat_completion(**request: Any) -> AsyncIterator[ChatCompletionChunk]:
+    """
+    Create a chat completion with the shared provider once the scheduler allows it,
+    returning its chunks as they are generated. The request is retried if it fails
+    before the stream starts. Its concurrency slot is held until the stream is
+    exhausted or closed, so callers that stop early should close it.
+    """
+    request = {**request, "stream_options": {"include_usage": True}}
+    return await _run(
+        lambda: provider.stream_chat_completion(**request), request, stream=True
+    )
+
+
+def scheduled_sync_client() -> Any:
+    """
+    Get a blocking client for libraries that call `client.chat.completions.create`
+    from a worker thread, such as the OpenAI representation of BERTopic. Its requests
+    are scheduled together with the requests of the shared provider.
+    """
+
+    def guarded_create(**request: Any) -> ChatCompletion:
+        start_time = time.monotonic()
+        try:
+            with circuit_breaker.guard():
+                response = provider.create_chat_completion_sync(**request)
+        except CircuitOpenError:
+            raise
+        except Exception:
+            accumulator.record(model=request["model"], failed=True)
+            raise
+        _record_usage(request["model"], response.usage, time.monotonic() - start_time)
+        return response
+
+    def create(**request: Any) -> ChatCompletion:
+        circuit_breaker.check()
+        return scheduler.run_sync(
+            lambda: guarded_create(**request), _estimate_tokens(request)
+        )
+
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
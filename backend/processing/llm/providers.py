@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator
+
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ParsedChatCompletion
+
+
+class Provider(ABC):
+    """
+    A provider of chat completions. Requests and responses use the types of the
+    OpenAI API, which every processing module is written against.
+    """
+
+    @abstractmethod
+    async def create_chat_completion(self, **request: Any) -> ChatCompletion:
+        """Create a chat completion"""
+
+    @abstractmethod
+    async def parse_chat_completion(self, **request: Any) -> ParsedChatCompletion:
+        """Create a chat completion parsed into the `response_format` of the request"""
+
+    @abstractmethod
+    async def stream_chat_completion(
+        self, **request: Any
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        """Create a chat completion, returning its chunks as they are generated"""
+
+    @abstractmethod
+    def create_chat_completion_sync(self, **request: Any) -> ChatCompletion:
+        """Create a chat completion, blocking the calling thread"""
+
+
+class OpenAIProvider(Provider):
+    """Chat completions from the OpenAI API"""
+
+    client: AsyncOpenAI
+    sync_client: OpenAI
+
+    def __init__(self, api_key: str | None) -> None:
+        # Retries are handled by the scheduler, which knows about every other request
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.sync_client = OpenAI(api_key=api_key, max_retries=0)
+
+    async def create_chat_completion(self, **request: Any) -> ChatCompletion:
+        return await self.client.chat.completions.create(**request)
+
+    async def parse_chat_completion(self, **request: Any) -> ParsedChatCompletion:
+        return await self.client.beta.chat.completions.parse(**request)
+
+    async def stream_chat_completion(
+        self, **request: Any
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        return await self.client.chat.completions.create(**request, stream=True)
+
+    def create_chat_completion_sync(self, **request: Any) -> ChatCompletion:
+        return self.sync_client.chat.completions.create(**request)
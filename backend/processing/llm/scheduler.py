@@ -0,0 +1,262 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+import openai
+
+logger = logging.getLogger("processing")
+
+T = TypeVar("T")
+
+# Errors that are worth retrying after a delay
+_retryable_errors = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+# Upper bound of the delay before retrying a request, in seconds
+_max_retry_delay = 30.0
+
+
+class Priority(IntEnum):
+    """Priority of LLM requests. Lower values are dispatched first."""
+
+    Live = 0
+    Background = 1
+
+
+# Priority of the LLM requests made in the current context. Background jobs set this
+# at their start, and every task they create inherits it.
+priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.Live)
+
+
+class Scheduler:
+    """
+    Schedules requests to a rate limited API, shared by every caller in the process.
+
+    Requests wait in a priority queue until a concurrency slot is free and the request
+    and token budgets of the last minute allow them. The budgets are refilled
+    continuously, and the estimated token usage of a request is corrected with its
+    actual usage when it completes. Failed requests are retried with jittered
+    exponential backoff, and a rate limit response pauses the whole queue.
+    """
+
+    requests_per_minute: int
+    tokens_per_minute: int
+    max_concurrency: int
+    max_retries: int
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        max_retries: int = 5,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        # Waiting requests as (priority, sequence number, future, tokens)
+        self._queue: list[tuple[Priority, int, asyncio.Future[None], int]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def queue_depth(self) -> dict[str, int]:
+        """Get the number of waiting requests of each priority, and of requests in flight"""
+        depth = {level.name.lower(): 0 for level in Priority}
+        for request_priority, _, future, _ in self._queue:
+            if not future.done():
+                depth[request_priority.name.lower()] += 1
+        depth["in_flight"] = self._in_flight
+        return depth
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._request_budget = min(
+            self.requests_per_minute,
+            self._request_budget + elapsed * self.requests_per_minute / 60,
+        )
+        self._token_budget = min(
+            self.tokens_per_minute,
+            self._token_budget + elapsed * self.tokens_per_minute / 60,
+        )
+
+    def _dispatch(self) -> None:
+        """Start as many waiting requests as the budgets allow, in order of priority"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        now = time.monotonic()
+        self._refill(now)
+
+        while self._queue and self._in_flight < self.max_concurrency:
+            _, _, future, tokens = self._queue[0]
+            if future.done():
+                # The waiting request was cancelled
+                heapq.heappop(self._queue)
+                continue
+
+            # Requests larger than the budget would never start, so they wait for a full budget
+            tokens = min(tokens, self.tokens_per_minute)
+            wait = max(
+                self._paused_until - now,
+                (1 - self._request_budget) * 60 / self.requests_per_minute,
+                (tokens - self._token_budget) * 60 / self.tokens_per_minute,
+            )
+            if wait > 0:
+                # Lower priority requests are held back too, so they can't starve the first one
+                self._wakeup = asyncio.get_running_loop().call_later(
+                    wait, self._dispatch
+                )
+                return
+
+            heapq.heappop(self._queue)
+            self._request_budget -= 1
+            self._token_budget -= tokens
+            self._in_flight += 1
+            future.set_result(None)
+
+    async def _acquire(self, tokens: int, request_priority: Priority) -> None:
+        """Wait until the request may be sent"""
+        self._loop = asyncio.get_running_loop()
+        future = self._loop.create_future()
+        heapq.heappush(
+            self._queue, (request_priority, next(self._sequence), future, tokens)
+        )
+        self._dispatch()
+
+        if not future.done():
+            logger.debug(
+                f"Queued {request_priority.name.lower()} LLM request, depth {self.queue_depth()}"
+            )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before the cancellation
+                self._release()
+            raise
+
+    def _release(
+        self, estimated_tokens: int = 0, used_tokens: int | None = None
+    ) -> None:
+        """Free the slot of a finished request, refunding any overestimated tokens"""
+        self._in_flight -= 1
+        if used_tokens is not None:
+            self._token_budget += (
+                min(estimated_tokens, self.tokens_per_minute) - used_tokens
+            )
+        self._dispatch()
+
+    def _pause(self, seconds: float) -> None:
+        """Hold back every waiting request, after the API responded that the rate limit is exceeded"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Full jitter exponential backoff, respecting the delay requested by the API"""
+        delay = random.uniform(0, min(_max_retry_delay, 0.5 * 2**attempt))
+        if isinstance(error, openai.APIStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            try:
+                delay = max(delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+    async def _release_when_closed(
+        self, chunks: AsyncIterator[Any], tokens: int
+    ) -> AsyncIterator[Any]:
+        """Pass on the chunks of a streamed response, holding its slot until the stream is closed"""
+        usage = None
+        try:
+            async for chunk in chunks:
+                # The usage is sent in the last chunk
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            try:
+                if hasattr(chunks, "aclose"):
+                    await chunks.aclose()
+            finally:
+                self._release(tokens, getattr(usage, "total_tokens", None))
+
+    async def run(
+        self, call: Callable[[], Awaitable[T]], tokens: int, stream: bool = False
+    ) -> T:
+        """
+        Run a request when the budgets allow it, retrying it if it fails temporarily.
+
+        Parameters:
+            call (Callable[[], Awaitable[T]]): Sends the request. Called again for every retry.
+            tokens (int): The estimated number of prompt and completion tokens of the request.
+            stream (bool): Whether the response is an async iterator of chunks. Its slot is
+                held until the iterator is closed, and it is not retried once it started.
+
+        Returns:
+            T: The response of the request.
+        """
+        request_priority = priority.get()
+        for attempt in itertools.count():
+            await self._acquire(tokens, request_priority)
+            try:
+                response = await call()
+            except _retryable_errors as e:
+                delay = self._retry_delay(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    self._pause(delay)
+                self._release()
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(
+                    f"LLM request failed with {type(e).__name__}, retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1} of {self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                if stream:
+                    return self._release_when_closed(response, tokens)
+                usage = getattr(response, "usage", None)
+                self._release(tokens, getattr(usage, "total_tokens", None))
+                return response
+
+    def run_sync(self, call: Callable[[], T], tokens: int) -> T:
+        """
+        Run a blocking request from a worker thread, scheduled together with the
+        requests of the event loop. Runs the request directly if the scheduler
+        has not been used on an event loop yet.
+
+        Parameters:
+            call (Callable[[], T]): Sends the request. Called again for every retry.
+            tokens (int): The estimated number of prompt and completion tokens of the request.
+
+        Returns:
+            T: The response of the request.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return call()
+
+        async def call_in_thread() -> T:
+            return await asyncio.to_thread(call)
+
+        return asyncio.run_coroutine_threadsafe(
+            self.run(call_in_thread, tokens), loop
+        ).result()
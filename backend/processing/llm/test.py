@@ -0,0 +1,333 @@
+import asyncio
+import contextvars
+import time
+import unittest
+from typing import AsyncIterator
+from unittest import mock
+
+import httpx
+import openai
+
+from pydantic import BaseModel
+
+from processing.llm import openai as llm, scheduler, usage
+from processing.llm.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+from processing.llm.fake import FakeProvider
+from processing.llm.scheduler import Priority, Scheduler
+from processing.llm.usage import UsageAccumulator, UsageKey
+from processing.preprocessing import openai_language_processing
+from processing.preprocessing.cache import PreprocessingCache
+
+
+def _rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+    return openai.RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+class TestScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_live_requests_are_dispatched_first(self):
+        llm_scheduler = Scheduler(
+            requests_per_minute=1000, tokens_per_minute=100000, max_concurrency=1
+        )
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def request(name: str) -> str:
+            order.append(name)
+            await release.wait()
+            return name
+
+        async def run(name: str, request_priority: Priority) -> str:
+            scheduler.priority.set(request_priority)
+            return await llm_scheduler.run(lambda: request(name), tokens=10)
+
+        first = asyncio.create_task(run("first", Priority.Background))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(run("background", Priority.Background))
+        live = asyncio.create_task(run("live", Priority.Live))
+        await asyncio.sleep(0)
+        self.assertEqual(
+            llm_scheduler.queue_depth(), {"live": 1, "background": 1, "in_flight": 1}
+        )
+
+        release.set()
+        await asyncio.gather(first, background, live)
+        self.assertEqual(order, ["first", "live", "background"])
+
+    async def test_requests_wait_for_the_token_budget(self):
+        llm_scheduler = Scheduler(
+            requests_per_minute=1000, tokens_per_minute=6000, max_concurrency=10
+        )
+
+        async def request() -> None:
+            return None
+
+        await llm_scheduler.run(request, tokens=6000)
+        with self.assertRaises(TimeoutError):
+            # The budget refills at 100 tokens per second
+            await asyncio.wait_for(llm_scheduler.run(request, tokens=60), 0.3)
+        await asyncio.wait_for(llm_scheduler.run(request, tokens=60), 1)
+        self.assertEqual(llm_scheduler.queue_depth()["in_flight"], 0)
+
+    async def test_rate_limited_requests_are_retried(self):
+        llm_scheduler = Scheduler(
+            requests_per_minute=1000,
+            tokens_per_minute=100000,
+            max_concurrency=1,
+            max_retries=2,
+        )
+        attempts = 0
+
+        async def request() -> str:
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise _rate_limit_error()
+            return "done"
+
+        with mock.patch("processing.llm.scheduler.random.uniform", return_value=0):
+            self.assertEqual(await llm_scheduler.run(request, tokens=10), "done")
+            self.assertEqual(attempts, 3)
+
+            attempts = 0
+            with self.assertRaises(openai.RateLimitError):
+                await Scheduler(1000, 100000, 1, max_retries=1).run(request, tokens=10)
+
+
+class Summary(BaseModel):
+    text: str
+    emoji: str
+
+
+class TestFakeProvider(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.provider = FakeProvider(latency=0, tokens_per_second=1e9, seed=0)
+
+    async def test_parsed_response_follows_the_response_format(self):
+        completion = await self.provider.parse_chat_completion(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "Summarise the answers"}],
+            response_format=Summary,
+        )
+        self.assertIsInstance(completion.choices[0].message.parsed, Summary)
+        self.assertGreater(completion.usage.total_tokens, 0)
+
+    async def test_response_follows_the_schema_in_the_prompt(self):
+        prompt = f"Respond in valid JSON based on the following format:\n{Summary.model_json_schema()}"
+        completion = await self.provider.create_chat_completion(
+            model="o3-mini",
+            messages=[{"role": "user", "content": prompt.replace("'", '"')}],
+        )
+        Summary.model_validate_json(completion.choices[0].message.content)
+
+    async def test_errors(self):
+        provider = FakeProvider(latency=0, tokens_per_second=1e9, error_rate=1)
+        with self.assertRaises(openai.APIStatusError):
+            await provider.create_chat_completion(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}]
+            )
+
+    async def test_preprocessing_gets_its_documents_back(self):
+        circuit_breaker = CircuitBreaker()
+        with (
+            mock.patch.object(llm, "provider", self.provider),
+            mock.patch.object(llm, "circuit_breaker", circuit_breaker),
+            mock.patch.object(
+                openai_language_processing, "circuit_breaker", circuit_breaker
+            ),
+            mock.patch.object(
+                openai_language_processing, "cache", PreprocessingCache("")
+            ),
+        ):
+            documents = ["jeg vet ikke", "I havv goood speling", "ja"]
+            result = await openai_language_processing.process(documents)
+        self.assertEqual(result, documents)
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    def fail(self, circuit_breaker: CircuitBreaker) -> None:
+        with self.assertRaises(openai.RateLimitError):
+            with circuit_breaker.guard():
+                raise _rate_limit_error()
+
+    def test_opens_on_failures_and_recovers_after_a_probe(self):
+        circuit_breaker = CircuitBreaker(minimum_calls=4, open_seconds=0.05)
+        with circuit_breaker.guard():
+            pass
+        for _ in range(3):
+            self.fail(circuit_breaker)
+        self.assertTrue(circuit_breaker.is_open())
+        with self.assertRaises(CircuitOpenError):
+            circuit_breaker.check()
+
+        # A failed probe opens the circuit again
+        time.sleep(0.06)
+        self.assertFalse(circuit_breaker.is_open())
+        self.fail(circuit_breaker)
+        self.assertTrue(circuit_breaker.is_open())
+
+        time.sleep(0.06)
+        with circuit_breaker.guard():
+            # Only a single probe is sent
+            self.assertTrue(circuit_breaker.is_open())
+        statistics = circuit_breaker.statistics()
+        self.assertEqual(statistics.state, CircuitState.Closed)
+        self.assertEqual(statistics.opened, 2)
+        self.assertEqual(statistics.rejected, 1)
+
+    def test_slow_calls_count_as_failures(self):
+        circuit_breaker = CircuitBreaker(minimum_calls=2, slow_call_seconds=0.01)
+        for _ in range(2):
+            with circuit_breaker.guard():
+                time.sleep(0.02)
+        self.assertEqual(circuit_breaker.statistics().state, CircuitState.Open)
+
+    async def test_cancelled_slow_calls_count_as_failures(self):
+        circuit_breaker = CircuitBreaker(minimum_calls=2, slow_call_seconds=0.01)
+
+        async def call(seconds: float) -> None:
+            with circuit_breaker.guard():
+                await asyncio.sleep(seconds)
+
+        # Cancelled before it was slow, so it is not recorded
+        with self.assertRaises(TimeoutError):
+            await asyncio.wait_for(call(1), timeout=0)
+        self.assertEqual(circuit_breaker.statistics().calls, 0)
+
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                await asyncio.wait_for(call(1), timeout=0.02)
+        statistics = circuit_breaker.statistics()
+        self.assertEqual(statistics.slow_calls, 2)
+        self.assertEqual(statistics.state, CircuitState.Open)
+
+    async def test_requests_fail_fast_while_the_circuit_is_open(self):
+        circuit_breaker = CircuitBreaker(minimum_calls=1)
+        provider = FakeProvider(latency=0, tokens_per_second=1e9, error_rate=1)
+        with (
+            mock.patch.object(llm, "circuit_breaker", circuit_breaker),
+            mock.patch.object(llm, "provider", provider),
+            mock.patch.object(
+                llm, "scheduler", Scheduler(1000, 100000, 4, max_retries=3)
+            ),
+        ):
+            with self.assertRaises(CircuitOpenError):
+                await llm.create_chat_completion(
+                    model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}]
+                )
+            self.assertEqual(circuit_breaker.statistics().calls, 1)
+
+    async def test_streams_hold_their_slot_until_closed(self):
+        llm_scheduler = Scheduler(
+            requests_per_minute=1000, tokens_per_minute=100000, max_concurrency=1
+        )
+
+        async def stream() -> AsyncIterator[str]:
+            for chunk in ["a", "b", "c"]:
+                yield chunk
+
+        async def start_stream() -> AsyncIterator[str]:
+            return stream()
+
+        chunks = await llm_scheduler.run(start_stream, tokens=10, stream=True)
+        self.assertEqual(await anext(chunks), "a")
+        self.assertEqual(llm_scheduler.queue_depth()["in_flight"], 1)
+
+        # The next request waits until the stream is closed
+        waiting = asyncio.create_task(
+            llm_scheduler.run(lambda: asyncio.sleep(0, "done"), tokens=10)
+        )
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+
+        await chunks.aclose()
+        self.assertEqual(await waiting, "done")
+        self.assertEqual(llm_scheduler.queue_depth()["in_flight"], 0)
+
+
+class TestUsage(unittest.IsolatedAsyncioTestCase):
+    def test_requests_are_attributed_to_the_current_context(self):
+        accumulator = UsageAccumulator()
+
+        def record_session() -> None:
+            usage.attribute(session="ABCD", quiz=None)
+            usage.stage.set("summary")
+            accumulator.record("gpt-4o-mini", 100, 20, latency=1.0)
+            accumulator.record("gpt-4o-mini", failed=True)
+
+        contextvars.copy_context().run(record_session)
+        accumulator.record("o3-mini", 10, 5, latency=2.0)
+
+        drained = accumulator.drain()
+        summary = drained[UsageKey("ABCD", None, "summary", "gpt-4o-mini")]
+        self.assertEqual((summary.requests, summary.failures), (2, 1))
+        self.assertEqual((summary.prompt_tokens, summary.completion_tokens), (100, 20))
+        # One request in the bucket of up to a second
+        self.assertEqual(summary.latency_histogram[2], 1)
+        self.assertEqual(sum(summary.latency_histogram), 1)
+        self.assertIn(UsageKey(None, None, "other", "o3-mini"), drained)
+        self.assertEqual(accumulator.drain(), {})
+
+    def test_drained_usage_can_be_merged_back(self):
+        accumulator = UsageAccumulator()
+        accumulator.record("gpt-4o-mini", 100, 20, latency=1.0)
+        drained = accumulator.drain()
+        accumulator.record("gpt-4o-mini", 10, 5, latency=1.0)
+        accumulator.merge(drained)
+
+        (merged,) = accumulator.drain().values()
+        self.assertEqual(merged.requests, 2)
+        self.assertEqual((merged.prompt_tokens, merged.completion_tokens), (110, 25))
+        self.assertEqual(merged.latency_histogram[2], 2)
+
+    def test_percentile_and_cost(self):
+        accumulator = UsageAccumulator()
+        for latency in [0.1] * 50 + [3.0] * 45 + [500.0] * 5:
+            accumulator.record("gpt-4o-mini", latency=latency)
+        (histogram,) = [
+            recorded.latency_histogram for recorded in accumulator.drain().values()
+        ]
+        self.assertEqual(usage.percentile(histogram, 0.5), 0.25)
+        self.assertEqual(usage.percentile(histogram, 0.95), 4)
+        # Slower requests than the largest bucket are reported as its bound
+        self.assertEqual(usage.percentile(histogram, 0.99), 120)
+        self.assertIsNone(usage.percentile(usage.Usage().latency_histogram, 0.5))
+        self.assertAlmostEqual(
+            usage.estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000), 0.75
+        )
+        self.assertIsNone(usage.estimate_cost("unknown", 10, 10))
+
+    async def test_completions_and_streams_are_recorded(self):
+        accumulator = UsageAccumulator()
+        provider = FakeProvider(latency=0, tokens_per_second=1e9, seed=0)
+        with (
+            mock.patch.object(llm, "accumulator", accumulator),
+            mock.patch.object(llm, "provider", provider),
+            mock.patch.object(llm, "circuit_breaker", CircuitBreaker()),
+            mock.patch.object(llm, "scheduler", Scheduler(1000, 100000, 4)),
+        ):
+            usage.stage.set("summary")
+            messages = [{"role": "user", "content": "Summarise the answers"}]
+            completion = await llm.create_chat_completion(
+                model="gpt-4o-mini", messages=messages
+            )
+            chunks = await llm.stream_chat_completion(
+                model="gpt-4o-mini", messages=messages
+            )
+            async for _ in chunks:
+                pass
+
+        recorded = accumulator.drain()[UsageKey(None, None, "summary", "gpt-4o-mini")]
+        self.assertEqual(recorded.requests, 2)
+        self.assertEqual(sum(recorded.latency_histogram), 2)
+        self.assertGreater(recorded.prompt_tokens, completion.usage.prompt_tokens)
+        self.assertGreater(recorded.completion_tokens, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
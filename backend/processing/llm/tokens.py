@@ -0,0 +1,45 @@
+import functools
+import logging
+import math
+
+import tiktoken
+
+logger = logging.getLogger("processing")
+
+# Average number of characters per token, used when no tokenizer is available
+_characters_per_token = 4
+
+
+@functools.cache
+def _encoding(model: str) -> tiktoken.Encoding | None:
+    """Load the tokenizer of a model, which is downloaded and cached by tiktoken on first use"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning(
+            f"Tokenizer for {model} is unavailable, estimating token counts instead",
+            exc_info=e,
+        )
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text from its length, without tokenizing it"""
+    return math.ceil(len(text) / _characters_per_token)
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count the tokens of a text with the tokenizer of a model.
+
+    Parameters:
+        text (str): The text to count the tokens of.
+        model (str): The model whose tokenizer to use.
+
+    Returns:
+        int: The number of tokens, estimated from the length of the text if the tokenizer can't be loaded.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
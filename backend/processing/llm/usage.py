@@ -0,0 +1,147 @@
+import bisect
+import math
+import threading
+import uuid
+from contextvars import ContextVar
+from typing import NamedTuple
+
+from pydantic import BaseModel, Field
+
+# Owner and pipeline stage of the LLM requests made in the current context. Sessions and
+# import jobs set the owner at their start, and every analysis sets its stage, so that
+# every task they create inherits them.
+session_id: ContextVar[str | None] = ContextVar("llm_usage_session_id", default=None)
+quiz_id: ContextVar[uuid.UUID | None] = ContextVar("llm_usage_quiz_id", default=None)
+stage: ContextVar[str] = ContextVar("llm_usage_stage", default="other")
+
+# Price in USD per million prompt and completion tokens
+PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "o3-mini": (1.10, 4.40),
+}
+
+# Upper bounds in seconds of the latency histogram buckets. Slower requests are counted
+# in a last, unbounded bucket, and reported as the largest bound.
+LATENCY_BUCKETS: tuple[float, ...] = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+
+class UsageKey(NamedTuple):
+    session_id: str | None
+    quiz_id: uuid.UUID | None
+    stage: str
+    model: str
+
+
+class Usage(BaseModel):
+    """Usage of LLM requests with the same owner, stage and model"""
+
+    requests: int = 0
+    failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Number of successful requests in each of the `LATENCY_BUCKETS`, and slower ones
+    latency_histogram: list[int] = Field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    def merge(self, other: "Usage") -> None:
+        """Add the usage of other to this usage"""
+        self.requests += other.requests
+        self.failures += other.failures
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.latency_histogram = [
+            count + other_count
+            for count, other_count in zip(
+                self.latency_histogram, other.latency_histogram
+            )
+        ]
+
+
+def attribute(session: str | None = None, quiz: uuid.UUID | None = None) -> None:
+    """Attribute the LLM requests made in the current context to a session and quiz"""
+    session_id.set(session)
+    quiz_id.set(quiz)
+
+
+def estimate_cost(
+    model: str, prompt_tokens: int, completion_tokens: int
+) -> float | None:
+    """Estimate the cost of tokens in USD, or None if the price of the model is unknown"""
+    if model not in PRICES:
+        return None
+    prompt_price, completion_price = PRICES[model]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def percentile(histogram: list[int], fraction: float) -> float | None:
+    """
+    Get the upper bound of the latency bucket of the nearest-rank percentile of a
+    histogram, or None if it is empty
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = max(1, math.ceil(fraction * total))
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + (LATENCY_BUCKETS[-1],), histogram):
+        seen += count
+        if seen >= rank:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+
+class UsageAccumulator:
+    """
+    Aggregates the usage of LLM requests in memory, until it is drained to be persisted.
+    Requests are also recorded from the worker threads of blocking libraries.
+    """
+
+    def __init__(self) -> None:
+        self._usage: dict[UsageKey, Usage] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency: float | None = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Record a request, attributed to the owner and stage of the current context.
+
+        Parameters:
+            model (str): The requested model.
+            prompt_tokens (int): The prompt tokens reported by the API.
+            completion_tokens (int): The completion tokens reported by the API.
+            latency (float | None): Seconds until the response was received, if it succeeded.
+            failed (bool): Whether the request failed.
+        """
+        key = UsageKey(session_id.get(), quiz_id.get(), stage.get(), model)
+        with self._lock:
+            usage = self._usage.setdefault(key, Usage())
+            usage.requests += 1
+            usage.failures += int(failed)
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+            if latency is not None:
+                usage.latency_histogram[
+                    bisect.bisect_left(LATENCY_BUCKETS, latency)
+                ] += 1
+
+    def drain(self) -> dict[UsageKey, Usage]:
+        """Take the usage recorded since the last drain"""
+        with self._lock:
+            usage, self._usage = self._usage, {}
+        return usage
+
+    def merge(self, usage: dict[UsageKey, Usage]) -> None:
+        """Add drained usage back, e.g. when it could not be persisted"""
+        with self._lock:
+            for key, key_usage in usage.items():
+                self._usage.setdefault(key, Usage()).merge(key_usage)
+
+
+accumulator = UsageAccumulator()
@@ -0,0 +1,134 @@
+"""
+Benchmark the throughput of the preprocessing backends on synthetic answers.
+
+Usage (from the backend directory):
+    python -m processing.preprocessing.benchmark --answers 10000
+    python -m processing.preprocessing.benchmark --answers 200 --openai
+    LLM_PROVIDER=fake python -m processing.preprocessing.benchmark --answers 10000 --openai
+    python -m processing.preprocessing.benchmark --answers 100000 --normalisation
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+
+from processing.preprocessing import normalisation, symspell
+
+# Number of dictionary words answers are sampled from, favouring common words
+_vocabulary_size = 5000
+
+
+def _misspell(word: str, rng: random.Random) -> str:
+    """Introduce a single random deletion, insertion, substitution or transposition"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(["delete", "insert", "substitute", "transpose"])
+    letter = rng.choice(string.ascii_lowercase)
+    if edit == "delete":
+        return word[:i] + word[i + 1 :]
+    if edit == "insert":
+        return word[:i] + letter + word[i:]
+    if edit == "substitute":
+        return word[:i] + letter + word[i + 1 :]
+    return word[: i - 1] + word[i] + word[i - 1] + word[i + 1 :]
+
+
+def generate_answers(count: int, typo_rate: float = 0.1, seed: int = 0) -> list[str]:
+    """
+    Generate answers of 1 to 12 common dictionary words with random spelling mistakes.
+
+    Parameters:
+        count (int): The number of answers to generate.
+        typo_rate (float): The probability of misspelling each word.
+        seed (int): Seed of the random generator, for reproducible answers.
+
+    Returns:
+        list[str]: The generated answers.
+    """
+    rng = random.Random(seed)
+    vocabulary = list(symspell.get_corrector().words)[:_vocabulary_size]
+    return [
+        " ".join(
+            _misspell(word, rng) if rng.random() < typo_rate else word
+            for word in rng.choices(vocabulary, k=rng.randint(1, 12))
+        )
+        for _ in range(count)
+    ]
+
+
+def _report(name: str, answers: int, seconds: float) -> None:
+    print(
+        f"{name:<28} {answers:>8} answers {seconds:>10.3f}s "
+        f"{answers / seconds:>12.0f} answers/s {seconds / answers * 1e6:>10.1f}us/answer"
+    )
+
+
+async def run(answer_count: int, include_openai: bool) -> None:
+    start_time = time.perf_counter()
+    symspell.get_corrector()
+    print(f"SymSpell index built in {time.perf_counter() - start_time:.2f}s")
+
+    answers = generate_answers(answer_count)
+
+    start_time = time.perf_counter()
+    await symspell.process(answers)
+    _report("symspell (cold)", len(answers), time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await symspell.process(answers)
+    _report("symspell (warm)", len(answers), time.perf_counter() - start_time)
+
+    if include_openai:
+        from processing.preprocessing import openai_language_processing
+        from processing.preprocessing.cache import PreprocessingCache
+
+        # Use an empty cache, so that every answer is sent to the LLM
+        openai_language_processing.cache = PreprocessingCache("")
+        start_time = time.perf_counter()
+        await openai_language_processing.process(answers)
+        _report("openai", len(answers), time.perf_counter() - start_time)
+
+
+def run_normalisation(answer_count: int, include_lemmatisation: bool) -> None:
+    answers = generate_answers(answer_count)
+
+    start_time = time.perf_counter()
+    normalisation.normalise_batch(answers)
+    _report("normalisation", len(answers), time.perf_counter() - start_time)
+
+    if include_lemmatisation:
+        # Load the lemmatiser outside of the measurement
+        normalisation.normalise("answers", lemmatise=True)
+        start_time = time.perf_counter()
+        normalisation.normalise_batch(answers, lemmatise=True)
+        _report(
+            "normalisation (lemmatised)", len(answers), time.perf_counter() - start_time
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=10000)
+    parser.add_argument(
+        "--openai",
+        action="store_true",
+        help="Also benchmark the OpenAI backend. Requires OPENAI_API_KEY and incurs cost, unless LLM_PROVIDER=fake.",
+    )
+    parser.add_argument(
+        "--normalisation",
+        action="store_true",
+        help="Benchmark the text normalisation instead of the spelling correction backends.",
+    )
+    parser.add_argument(
+        "--lemmatise",
+        action="store_true",
+        help="Also benchmark normalisation with lemmatisation. Downloads WordNet on first use.",
+    )
+    arguments = parser.parse_args()
+    if arguments.normalisation:
+        run_normalisation(arguments.answers, arguments.lemmatise)
+    else:
+        asyncio.run(run(arguments.answers, arguments.openai))
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from typing import Iterable
+
+import cachetools
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("processing")
+
+# Path of the SQLite file persisting preprocessing results. An empty value keeps the cache in memory.
+_cache_path = os.getenv(
+    "PREPROCESSING_CACHE_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "preprocessing_cache.sqlite3",
+    ),
+).strip()
+
+# Maximum number of variables in a single SQLite query
+_query_chunk_size = 500
+
+
+def _canonical_text(document: str) -> str:
+    """
+    Canonicalise the unicode form and whitespace of a document, so equivalent answers
+    share a cache entry. Unlike `normalisation.normalise`, the words and punctuation
+    are kept, as they change the corrected text.
+    """
+    return " ".join(unicodedata.normalize("NFC", document).split())
+
+
+def cache_key(document: str, version: str) -> str:
+    """
+    Create a content address for a document.
+
+    Arguments:
+        document (str): The document to preprocess.
+        version (str): Identifies the model and prompt used for preprocessing,
+            so that changing either invalidates earlier results.
+
+    Returns:
+        str: The hex digest of the version and canonical document.
+    """
+    return hashlib.sha256(
+        f"{version}\0{_canonical_text(document)}".encode()
+    ).hexdigest()
+
+
+class PreprocessingCache:
+    """
+    Content-addressed cache of preprocessed documents, with an in-memory
+    LRU cache in front of a persistent SQLite table.
+    The methods block on SQLite, so async callers run them in a worker thread.
+    """
+
+    memory: cachetools.LRUCache
+    connection: sqlite3.Connection
+    thread_lock: threading.Lock
+
+    def __init__(self, path: str = _cache_path, maxsize: int = 10000) -> None:
+        self.memory = cachetools.LRUCache(maxsize=maxsize)
+        self.thread_lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS preprocessed (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """
+        Look up preprocessed documents by their keys.
+
+        Arguments:
+            keys (Iterable[str]): The keys to look up.
+
+        Returns:
+            dict[str, str]: The cached results, keyed by the keys that were found.
+        """
+        with self.thread_lock:
+            return self._get_many(keys)
+
+    def _get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        results: dict[str, str] = {}
+        missing: list[str] = []
+        for key in set(keys):
+            if key in self.memory:
+                results[key] = self.memory[key]
+            else:
+                missing.append(key)
+
+        try:
+            for i in range(0, len(missing), _query_chunk_size):
+                chunk = missing[i : i + _query_chunk_size]
+                rows = self.connection.execute(
+                    f"SELECT key, result FROM preprocessed WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for key, result in rows:
+                    self.memory[key] = result
+                    results[key] = result
+        except sqlite3.Error as e:
+            logger.warning("Failed to read from the preprocessing cache", exc_info=e)
+
+        return results
+
+    def set_many(self, items: Iterable[tuple[str, str]]) -> None:
+        """
+        Store preprocessed documents.
+
+        Arguments:
+            items (Iterable[tuple[str, str]]): Pairs of keys and preprocessed documents.
+        """
+        with self.thread_lock:
+            self._set_many(list(items))
+
+    def _set_many(self, items: list[tuple[str, str]]) -> None:
+        for key, result in items:
+            self.memory[key] = result
+
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO preprocessed (key, result) VALUES (?, ?)", items
+            )
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("Failed to write to the preprocessing cache", exc_info=e)
@@ -0,0 +1,100 @@
+import functools
+import os
+import re
+
+# Bundled list of frequent English words, one "word count" pair per line
+_word_list_path = os.path.join(os.path.dirname(__file__), "data", "english_words.txt")
+
+_word_pattern = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+# Characters expected in English text: ASCII plus typographic quotes and dashes
+_english_characters_pattern = re.compile(r"^[\x20-\x7E\t\n‘’“”–—…]*$")
+# Short words written in capitals are treated as acronyms, which are never corrected
+_acronym_pattern = re.compile(r"^[A-Z]{2,5}s?$")
+
+# Answers with at least this many words must contain an English stopword
+_stopword_check_min_words = 6
+
+_english_stopwords = frozenset(
+    "a about all an and are as at be but by can do for from have how i if in is it "
+    "its me more my no not of on or so than that the their them they this to was "
+    "we what when which who why will with would you your".split()
+)
+# Frequent function words of other languages, leaving out those that are common English words
+_foreign_stopwords = frozenset(
+    # Norwegian, Swedish and Danish
+    "og ikke det som jeg har til av med på att och inte är för ett "
+    "også kan mye hva hvordan hvorfor eller fordi når veldig "
+    # German
+    "und nicht ist das ich sie auf für auch wie aber oder wenn sehr "
+    # French
+    "et les des est une pas je que qui dans pour avec sur mais très "
+    # Spanish and Portuguese
+    "el los las una por pero muy porque também não uma".split()
+)
+
+
+@functools.cache
+def _english_words() -> frozenset[str]:
+    """Load the bundled English word list on first use"""
+    with open(_word_list_path, encoding="utf-8") as file:
+        return frozenset(
+            line.split(" ", 1)[0] for line in file if not line.startswith("#")
+        )
+
+
+def is_foreign(document: str) -> bool:
+    """
+    Decide whether a document shows signs of being written in another language than
+    English, such as unexpected characters or foreign stopwords. Misspelled English is
+    not foreign.
+
+    Parameters:
+        document (str): The document to check.
+
+    Returns:
+        bool: True if the document is likely not English.
+    """
+    if not _english_characters_pattern.match(document):
+        return True
+
+    lowercase_words = [
+        word.lower().replace("’", "'")
+        for word in _word_pattern.findall(document)
+        if not _acronym_pattern.match(word)
+    ]
+    if any(word in _foreign_stopwords for word in lowercase_words):
+        return True
+    if len(lowercase_words) >= _stopword_check_min_words and not any(
+        word in _english_stopwords for word in lowercase_words
+    ):
+        return True
+
+    return False
+
+
+def is_clean_english(document: str) -> bool:
+    """
+    Decide whether a document is already correctly spelled English, so that it
+    can skip LLM correction and translation. The check is conservative: any
+    unknown word, unexpected character or sign of another language marks the
+    document as suspect.
+
+    Parameters:
+        document (str): The document to check.
+
+    Returns:
+        bool: True if the document can be passed through untouched.
+    """
+    if is_foreign(document):
+        return False
+
+    words = _word_pattern.findall(document)
+    if not words:
+        # Numbers, punctuation and emoticons have nothing to correct
+        return bool(document.strip())
+
+    english_words = _english_words()
+    return all(
+        _acronym_pattern.match(word) or word.lower().replace("’", "'") in english_words
+        for word in words
+    )
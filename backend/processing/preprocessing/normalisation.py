@@ -0,0 +1,100 @@
+import functools
+import re
+
+import nltk
+from nltk.stem import WordNetLemmatizer
+
+# Words, numbers and contractions. Unicode letters are included, so that untranslated answers keep their words.
+_token_pattern = re.compile(r"\w+(?:'\w+)*")
+
+# The English stopword list of NLTK, bundled so it is available without downloading the corpus
+_stopwords = frozenset(
+    "i me my myself we our ours ourselves you you're you've you'll you'd your yours "
+    "yourself yourselves he him his himself she she's her hers herself it it's its "
+    "itself they them their theirs themselves what which who whom this that that'll "
+    "these those am is are was were be been being have has had having do does did "
+    "doing a an the and but if or because as until while of at by for with about "
+    "against between into through during before after above below to from up down in "
+    "out on off over under again further then once here there when where why how all "
+    "any both each few more most other some such no nor not only own same so than too "
+    "very s t can will just don don't should should've now d ll m o re ve y ain aren "
+    "aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven "
+    "haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't "
+    "shouldn shouldn't wasn wasn't weren weren't won won't wouldn wouldn't".split()
+)
+
+
+@functools.cache
+def _lemmatiser() -> WordNetLemmatizer:
+    """Load the WordNet lemmatiser, downloading the corpus on first use"""
+    nltk.download("wordnet", quiet=True)
+    return WordNetLemmatizer()
+
+
+@functools.lru_cache(maxsize=100000)
+def _lemmatise(token: str) -> str:
+    return _lemmatiser().lemmatize(token)
+
+
+def normalise(
+    document: str,
+    lowercase: bool = True,
+    remove_stopwords: bool = True,
+    lemmatise: bool = False,
+) -> str:
+    """
+    Normalise a document in a single pass over its tokens. Punctuation is dropped.
+
+    Parameters:
+        document (str): The document to normalise.
+        lowercase (bool): Whether to convert the tokens to lowercase.
+        remove_stopwords (bool): Whether to remove English stopwords, regardless of their case.
+        lemmatise (bool): Whether to reduce the tokens to their WordNet lemma.
+
+    Returns:
+        str: The normalised tokens, separated by single spaces.
+    """
+    document = document.replace("’", "'")
+    if lowercase:
+        document = document.lower()
+        tokens = _token_pattern.findall(document)
+        if remove_stopwords:
+            tokens = [token for token in tokens if token not in _stopwords]
+    else:
+        tokens = _token_pattern.findall(document)
+        if remove_stopwords:
+            tokens = [token for token in tokens if token.lower() not in _stopwords]
+    if lemmatise:
+        tokens = [_lemmatise(token) for token in tokens]
+    return " ".join(tokens)
+
+
+def normalise_batch(
+    documents: list[str],
+    lowercase: bool = True,
+    remove_stopwords: bool = True,
+    lemmatise: bool = False,
+) -> list[str]:
+    """
+    Normalise a batch of documents. Repeated documents, which are common among
+    short answers, are only normalised once.
+
+    Parameters:
+        documents (list[str]): The documents to normalise.
+        lowercase (bool): Whether to convert the tokens to lowercase.
+        remove_stopwords (bool): Whether to remove English stopwords, regardless of their case.
+        lemmatise (bool): Whether to reduce the tokens to their WordNet lemma.
+
+    Returns:
+        list[str]: The normalised documents, in the same order.
+    """
+    normalised: dict[str, str] = {}
+    results: list[str] = []
+    for document in documents:
+        result = normalised.get(document)
+        if result is None:
+            result = normalised[document] = normalise(
+                document, lowercase, remove_stopwords, lemmatise
+            )
+        results.append(result)
+    return results
@@ -1,29 +1,48 @@
 import asyncio
+import hashlib
 import json
 import logging
+import threading
 import time
 from pydantic import BaseModel
 
-from processing.llm.openai import client
+from processing.llm.openai import circuit_breaker, parse_chat_completion
+from processing.llm.tokens import count_tokens
+from processing.preprocessing.cache import PreprocessingCache, cache_key
 
 logger = logging.getLogger("processing")
 
 
-type Batch = list[str]
+class Document(BaseModel):
+    id: int
+    text: str
+
+
+type Batch = list[Document]
 
 
 class ResponseFormat(BaseModel):
-    result: list[str]
+    result: list[Document]
 
 
 model_id = "gpt-4o-mini"
+
+# Output tokens per batch, keeping each request short: tokens per second * seconds
+MAX_OUTPUT_TOKENS_PER_BATCH = 80 * 5
+# Tokens spent on the id and JSON syntax of every document
+DOCUMENT_OVERHEAD_TOKENS = 10
+# Translated documents may be longer than the original text
+TRANSLATION_EXPANSION = 1.3
+# Input tokens per batch including the prompt, keeping the token reservation of every request small
+MAX_INPUT_TOKENS_PER_BATCH = 1000
+
 prompt_template = """
 Your task is to fix simple spelling errors and translate the text from the detected language to English.
 Respond in valid JSON!
 
-The following list of text strings is a list of answers submitted by students to a question asked by a teacher through a student response system during a lecture.
-Correct any misspelled words in the text and return the list of answers as valid JSON.
-[If no corrections are required, return the original list. Correct ONLY misspellings, and do not fix punctuation, grammar, or casing.
+The following list of JSON objects is a list of answers submitted by students to a question asked by a teacher through a student response system during a lecture.
+Correct any misspelled words in the text of each answer and return the list of answers as valid JSON, keeping the id of every answer.
+[If no corrections are required, return the original text. Correct ONLY misspellings, and do not fix punctuation, grammar, or casing.
 Terms like "healthcare" that can be spelled as one word or two distinct words ("health" and "care") should always be returned as one word.
 Expand all abbreviated words such as "dem(s)," "rep(s)," "gov," and "govt." Do not expand acronyms. Always include the dash for words with pro- or anti- in them.]
 Be aware that the answers may be written in different languages, and that you should make sure all of the text is also translated to English in addition to correcting the grammar mistakes.
@@ -31,43 +50,80 @@ Be aware that the answers may be written in different languages, and that you sh
 Answers:
 """
 
+# Cached results are only reused for the same model and prompt
+cache_version = (
+    f"{model_id}:{hashlib.sha256(prompt_template.encode()).hexdigest()[:16]}"
+)
+# Created on first use, so that importing the module does not open the SQLite file
+cache: PreprocessingCache | None = None
+
+
+_cache_lock = threading.Lock()
 
-async def _batch(documents: list[str]) -> list[Batch]:
+
+def _get_cache() -> PreprocessingCache:
+    """Get the cache, opening it on first use. Called from worker threads only."""
+    global cache
+    with _cache_lock:
+        if cache is None:
+            cache = PreprocessingCache()
+        return cache
+
+
+def _batch(documents: list[Document]) -> list[Batch]:
     """
     An LLM's processing time increases linearly with the number of output tokens.
     We speed up the processing by splitting the documents into batches which
-    can be processed by the OpenAI API in parallel.
+    can be processed by the OpenAI API in parallel, budgeting the input and output
+    tokens of every batch with the model's tokenizer.
     """
-    chars_per_batch = 4 * 30 * 5  # Chars per token * tokens per second * seconds
-
+    prompt_tokens = count_tokens(prompt_template, model_id)
     batches: list[Batch] = []
-    current_batch: list[str] = []
-    current_batch_size = 0
+    current_batch: Batch = []
+    current_batch_tokens = 0
+    current_batch_input_tokens = prompt_tokens
 
     for document in documents:
-        if current_batch_size >= chars_per_batch:
+        text_tokens = count_tokens(document.text, model_id)
+        document_tokens = text_tokens * TRANSLATION_EXPANSION + DOCUMENT_OVERHEAD_TOKENS
+        document_input_tokens = text_tokens + DOCUMENT_OVERHEAD_TOKENS
+        if current_batch and (
+            current_batch_tokens + document_tokens > MAX_OUTPUT_TOKENS_PER_BATCH
+            or current_batch_input_tokens + document_input_tokens
+            > MAX_INPUT_TOKENS_PER_BATCH
+        ):
             batches.append(current_batch)
-            current_batch_size = 0
+            current_batch_tokens = 0
+            current_batch_input_tokens = prompt_tokens
             current_batch = []
         current_batch.append(document)
-        current_batch_size += len(document)
+        current_batch_tokens += document_tokens
+        current_batch_input_tokens += document_input_tokens
     if current_batch:
         batches.append(current_batch)
 
     return batches
 
 
-async def _process(batch: Batch) -> list[str]:
-    """Process the document batch by promting the LLM through the OpenAI API"""
+async def _process(batch: Batch) -> dict[int, str]:
+    """
+    Process the document batch by promting the LLM through the OpenAI API.
+
+    Returns:
+        dict[int, str]: The processed text of each document in the batch that was returned, by id.
+    """
+    answers = json.dumps(
+        [document.model_dump() for document in batch], ensure_ascii=False
+    )
     messages = [
         {
             "role": "user",
-            "content": f"{prompt_template} [\"{'\",\n\"'.join(batch)}\"]",
+            "content": f"{prompt_template} {answers}",
         },
     ]
     logger.debug(f"Prompt: {json.dumps(messages, indent=2)}")
 
-    chat_completion = await client.beta.chat.completions.parse(
+    chat_completion = await parse_chat_completion(
         model=model_id,
         messages=messages,
         response_format=ResponseFormat,
@@ -77,15 +133,42 @@ async def _process(batch: Batch) -> list[str]:
     parsed_response = chat_completion.choices[0].message.parsed
 
     if parsed_response:
-        return parsed_response.result
+        batch_ids = {document.id for document in batch}
+        return {
+            document.id: document.text
+            for document in parsed_response.result
+            if document.id in batch_ids
+        }
     logger.warning("OpenAI LLM failed to correct and translate a document batch")
     raise ValueError("OpenAI LLM failed to correct and translate a document batch")
 
 
+async def _process_batches(batches: list[Batch]) -> dict[int, str]:
+    """Process batches concurrently, treating every document of a failed batch as missing"""
+    results = await asyncio.gather(
+        *[_process(batch) for batch in batches],
+        return_exceptions=True,
+    )
+
+    processed: dict[int, str] = {}
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.debug("Failed to correct and translate a batch", exc_info=result)
+        else:
+            processed.update(result)
+    return processed
+
+
 async def process(documents: list[str]) -> list[str]:
     """
     Prompt the OpenAI language model to correct spelling mistakes and
-    translate the documents to English.
+    translate the documents to English. Batches from all concurrent callers
+    are scheduled together with every other request to the OpenAI API.
+
+    Results are cached by the content of the normalised documents, and only
+    distinct documents missing from the cache are sent to the LLM. Documents
+    missing from a response are retried one by one, and returned unchanged
+    if they still fail, or at once while the LLM circuit is open.
 
     Parameters:
         documents (list[str]): The documents to process.
@@ -95,9 +178,41 @@ async def process(documents: list[str]) -> list[str]:
     """
     start_time = time.monotonic()
 
-    batches = await _batch(documents)
-    results = await asyncio.gather(*[_process(batch) for batch in batches])
-    documents = [document for result in results for document in result]
-
-    logger.debug(f"Corrected and translated after {time.monotonic() - start_time}s")
+    keys = [cache_key(document, cache_version) for document in documents]
+    results = await asyncio.to_thread(lambda: _get_cache().get_many(keys))
+
+    # Only send each distinct uncached document to the LLM once
+    misses: dict[str, str] = {}
+    for key, document in zip(keys, documents):
+        if key not in results:
+            misses.setdefault(key, document)
+    miss_keys = list(misses)
+
+    if misses and circuit_breaker.is_open():
+        logger.debug("LLM circuit is open, returning uncached documents unchanged")
+    elif misses:
+        pending = [
+            Document(id=i, text=document) for i, document in enumerate(misses.values())
+        ]
+        processed = await _process_batches(_batch(pending))
+
+        # Retry documents that were missing from the responses individually
+        missing = [document for document in pending if document.id not in processed]
+        if missing:
+            logger.debug(f"Retrying {len(missing)} documents individually")
+            processed.update(
+                await _process_batches([[document] for document in missing])
+            )
+
+        new_results = [(miss_keys[i], text) for i, text in processed.items()]
+        await asyncio.to_thread(lambda: _get_cache().set_many(new_results))
+        results.update(new_results)
+
+    # Documents that failed are returned unchanged, and not cached
+    documents = [results.get(key, document) for key, document in zip(keys, documents)]
+
+    logger.debug(
+        f"Corrected and translated {len(misses)} of {len(keys)} documents "
+        f"after {time.monotonic() - start_time}s"
+    )
     return documents
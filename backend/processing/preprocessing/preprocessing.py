@@ -1,7 +1,60 @@
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+import logging
+import os
+import time
 
-from processing.preprocessing import openai_language_processing
+from dotenv import load_dotenv
+from pydantic import BaseModel, computed_field
+
+from processing.llm.tokens import estimate_tokens
+from processing.preprocessing import fast_path, openai_language_processing, symspell
+
+load_dotenv()
+
+logger = logging.getLogger("processing")
+
+# Backends for correcting suspect documents. The OpenAI backend corrects and translates
+# with an LLM, while the SymSpell backend only corrects spelling, locally on the CPU.
+_backends = {
+    "openai": openai_language_processing,
+    "symspell": symspell,
+}
+_backend = os.getenv("PREPROCESSING_BACKEND", "openai").strip() or "openai"
+if _backend not in _backends:
+    logger.warning(f"Unknown preprocessing backend {_backend}, using openai")
+    _backend = "openai"
+if _backend == "symspell":
+    # Build the spelling index at startup instead of during the first request
+    symspell.get_corrector()
+
+
+class FastPathStatistics(BaseModel):
+    """Counts of documents passed through by the fast path since the process started"""
+
+    documents: int = 0
+    # Clean documents that were not sent to the backend
+    skipped: int = 0
+    # Tokens of the skipped documents, estimated from their length
+    skipped_tokens: int = 0
+    # Calls where every document was clean, so the backend round-trip was skipped
+    skipped_calls: int = 0
+    backend_calls: int = 0
+    backend_seconds: float = 0.0
+
+    @computed_field
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.documents if self.documents else 0.0
+
+    @computed_field
+    @property
+    def estimated_seconds_saved(self) -> float:
+        """Skipped round-trips, at the mean latency of the backend calls"""
+        if not self.backend_calls:
+            return 0.0
+        return self.skipped_calls * self.backend_seconds / self.backend_calls
+
+
+statistics = FastPathStatistics()
 
 
 async def lowercase(documents: list[str]) -> list[str]:
@@ -9,20 +62,48 @@ async def lowercase(documents: list[str]) -> list[str]:
     return [document.lower() for document in documents]
 
 
-async def remove_stopwords(documents: list[str]) -> list[str]:
-    """Remove stop-words from documents"""
-    return [
-        " ".join(
-            [
-                word
-                for word in word_tokenize(document, language="english")
-                if word not in stopwords.words("english")
-            ]
-        )
-        for document in documents
+async def correct_and_translate(documents: list[str]) -> list[str]:
+    """
+    Correct spelling mistakes in and translate the documents to English.
+    Documents that are already correctly spelled English are passed through
+    untouched, and only suspect documents are sent to the backend selected
+    with the `PREPROCESSING_BACKEND` environment variable.
+    """
+    start_time = time.monotonic()
+    clean = [fast_path.is_clean_english(document) for document in documents]
+    suspects = [
+        document for document, is_clean in zip(documents, clean) if not is_clean
     ]
+    classification_time = time.monotonic() - start_time
+
+    skipped = len(documents) - len(suspects)
+    skipped_tokens = sum(
+        estimate_tokens(document)
+        for document, is_clean in zip(documents, clean)
+        if is_clean
+    )
+    statistics.documents += len(documents)
+    statistics.skipped += skipped
+    statistics.skipped_tokens += skipped_tokens
+    if documents:
+        logger.debug(
+            f"Fast path passed {skipped} of {len(documents)} documents through in {classification_time * 1000:.1f}ms, "
+            f"skipping ~{skipped_tokens} tokens"
+            + (", and the backend round-trip" if not suspects else "")
+        )
 
+    if not suspects:
+        if documents:
+            statistics.skipped_calls += 1
+        return documents
 
-async def correct_and_translate(documents: list[str]) -> list[str]:
-    """Correct spelling mistakes in and translate the documents to English"""
-    return await openai_language_processing.process(documents)
+    backend_start_time = time.monotonic()
+    results = await _backends[_backend].process(suspects)
+    statistics.backend_calls += 1
+    statistics.backend_seconds += time.monotonic() - backend_start_time
+
+    processed = iter(results)
+    return [
+        document if is_clean else next(processed)
+        for document, is_clean in zip(documents, clean)
+    ]
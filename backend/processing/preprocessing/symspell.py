@@ -0,0 +1,235 @@
+import asyncio
+import functools
+import os
+import re
+import threading
+
+import cachetools
+
+from processing.preprocessing import fast_path
+
+# Bundled frequency dictionary, one "word count" pair per line
+_dictionary_path = os.path.join(os.path.dirname(__file__), "data", "english_words.txt")
+
+# Only words one edit away from a dictionary word are corrected, as more distant
+# suggestions mostly replace valid domain terms with unrelated words
+MAX_EDIT_DISTANCE = 1
+# The best suggestion must be this many times more frequent than the next one at the
+# same distance, otherwise the word is left unchanged
+MIN_FREQUENCY_RATIO = 2
+# Only deletes of the first characters of a word are indexed, which bounds the index size
+PREFIX_LENGTH = 7
+
+_token_pattern = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+# Words written in capitals are treated as acronyms, which are never corrected
+_acronym_pattern = re.compile(r"^[A-Z]{2,}s?$")
+
+
+def _deletes(word: str, max_distance: int) -> set[str]:
+    """Generate every string that can be made by deleting up to `max_distance` characters"""
+    deletes: set[str] = set()
+    queue = [word]
+    for _ in range(max_distance):
+        next_queue: list[str] = []
+        for candidate in queue:
+            for i in range(len(candidate)):
+                delete = candidate[:i] + candidate[i + 1 :]
+                if delete not in deletes:
+                    deletes.add(delete)
+                    next_queue.append(delete)
+        queue = next_queue
+    return deletes
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance between two strings, where swapping adjacent
+    characters counts as a single edit. Returns `max_distance + 1` when exceeded.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpell:
+    """
+    Symmetric delete spelling corrector.
+
+    Every dictionary word is indexed by the strings that result from deleting up to
+    `max_edit_distance` characters from its prefix. Looking up a misspelled word then
+    only requires generating its own deletes, instead of every possible edit.
+    """
+
+    max_edit_distance: int
+    prefix_length: int
+    words: dict[str, int]
+    # Maps each delete to the dictionary words it was generated from.
+    # A single word is stored as a string to keep the index compact.
+    index: dict[str, str | tuple[str, ...]]
+    # Corrections of previously seen misspellings, shared by the worker threads
+    corrections: cachetools.LRUCache
+    corrections_lock: threading.Lock
+
+    def __init__(
+        self,
+        words: dict[str, int],
+        max_edit_distance: int = MAX_EDIT_DISTANCE,
+        prefix_length: int = PREFIX_LENGTH,
+    ) -> None:
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = words
+        self.index = {}
+        self.corrections = cachetools.LRUCache(maxsize=100000)
+        self.corrections_lock = threading.Lock()
+
+        for word in words:
+            prefix = word[:prefix_length]
+            for delete in _deletes(prefix, max_edit_distance) | {prefix}:
+                existing = self.index.get(delete)
+                if existing is None:
+                    self.index[delete] = word
+                elif isinstance(existing, str):
+                    self.index[delete] = (existing, word)
+                else:
+                    self.index[delete] = (*existing, word)
+
+    @classmethod
+    def from_file(cls, path: str = _dictionary_path) -> "SymSpell":
+        """Build a corrector from a file of "word count" lines"""
+        words: dict[str, int] = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("#"):
+                    continue
+                word, count = line.split()
+                words[word] = int(count)
+        return cls(words)
+
+    def _candidates(self, delete: str) -> tuple[str, ...]:
+        """Get the dictionary words indexed under a delete"""
+        candidates = self.index.get(delete, ())
+        return (candidates,) if isinstance(candidates, str) else candidates
+
+    def correct_word(self, word: str) -> str:
+        """
+        Find the most likely correction of a lowercase word.
+
+        Parameters:
+            word (str): The word to correct.
+
+        Returns:
+            str: The closest dictionary word within the maximum edit distance, if it is
+                clearly more frequent than the other suggestions at that distance, or the
+                word itself otherwise.
+        """
+        if word in self.words or len(word) <= 2:
+            return word
+        with self.corrections_lock:
+            if word in self.corrections:
+                return self.corrections[word]
+
+        prefix = word[: self.prefix_length]
+        distances: dict[str, int] = {}
+        for delete in _deletes(prefix, self.max_edit_distance) | {prefix}:
+            for candidate in self._candidates(delete):
+                if candidate not in distances:
+                    distances[candidate] = _edit_distance(
+                        word, candidate, self.max_edit_distance
+                    )
+
+        correction = word
+        best_distance = min(distances.values(), default=self.max_edit_distance + 1)
+        if best_distance <= self.max_edit_distance:
+            counts = sorted(
+                (
+                    (self.words[candidate], candidate)
+                    for candidate, distance in distances.items()
+                    if distance == best_distance
+                ),
+                reverse=True,
+            )
+            # Ambiguous suggestions are left unchanged
+            if len(counts) == 1 or counts[0][0] >= MIN_FREQUENCY_RATIO * counts[1][0]:
+                correction = counts[0][1]
+
+        with self.corrections_lock:
+            self.corrections[word] = correction
+        return correction
+
+    def correct(self, document: str) -> str:
+        """
+        Correct the spelling of every word in a document, preserving capitalisation,
+        punctuation and whitespace. Acronyms are left untouched.
+
+        Parameters:
+            document (str): The document to correct.
+
+        Returns:
+            str: The corrected document.
+        """
+
+        def replace(match: re.Match[str]) -> str:
+            word = match.group(0)
+            if _acronym_pattern.match(word):
+                return word
+            correction = self.correct_word(word.lower())
+            if word[0].isupper():
+                return correction[0].upper() + correction[1:]
+            return correction
+
+        return _token_pattern.sub(replace, document)
+
+
+_corrector_lock = threading.Lock()
+
+
+@functools.cache
+def _load_corrector() -> SymSpell:
+    return SymSpell.from_file()
+
+
+def get_corrector() -> SymSpell:
+    """Load the corrector from the bundled dictionary once, on first use"""
+    with _corrector_lock:
+        return _load_corrector()
+
+
+def _correct(documents: list[str]) -> list[str]:
+    corrector = get_corrector()
+    return [
+        document if fast_path.is_foreign(document) else corrector.correct(document)
+        for document in documents
+    ]
+
+
+async def process(documents: list[str]) -> list[str]:
+    """
+    Correct spelling mistakes in the documents locally, off the event loop. Unlike the
+    OpenAI backend, the documents are not translated, so documents that are likely not
+    English are returned unchanged.
+
+    Parameters:
+        documents (list[str]): The documents to process.
+
+    Returns:
+        list[str]: The documents after spelling correction.
+    """
+    return await asyncio.to_thread(_correct, documents)
@@ -1,8 +1,37 @@
+import os
+import tempfile
+import threading
 import unittest
-from processing.preprocessing.openai_language_processing import process
+from unittest import mock
+
+from processing.llm import openai as llm
+from processing.llm.circuit_breaker import CircuitBreaker
+from processing.preprocessing import (
+    openai_language_processing,
+    preprocessing,
+    symspell,
+)
+from processing.preprocessing.fast_path import is_clean_english
+from processing.preprocessing.normalisation import normalise, normalise_batch
+from processing.preprocessing.symspell import SymSpell
+from processing.preprocessing.cache import PreprocessingCache
+from processing.preprocessing.openai_language_processing import (
+    Batch,
+    Document,
+    _batch,
+    process,
+)
 
 
 class TestTranslationAndSpelling(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # The circuit breaker is shared by the process, so failed requests of other tests could open it
+        circuit_breaker = CircuitBreaker()
+        for module in (llm, openai_language_processing):
+            patch = mock.patch.object(module, "circuit_breaker", circuit_breaker)
+            patch.start()
+            self.addCleanup(patch.stop)
+
     @staticmethod
     def verify_result(
         result: str, expected_contains: list[str], expected_not_contains: list[str]
@@ -67,5 +96,234 @@ class TestTranslationAndSpelling(unittest.IsolatedAsyncioTestCase):
                 )
 
 
+class TestBatchedPreprocessing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # The circuit breaker is shared by the process, so failed requests of other tests could open it
+        circuit_breaker = CircuitBreaker()
+        for module in (llm, openai_language_processing):
+            patch = mock.patch.object(module, "circuit_breaker", circuit_breaker)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_only_distinct_misses_are_sent(self):
+        sent: list[str] = []
+
+        async def fake_process(batch: Batch) -> dict[int, str]:
+            sent.extend(document.text for document in batch)
+            return {document.id: document.text.upper() for document in batch}
+
+        with (
+            mock.patch.object(
+                openai_language_processing, "cache", PreprocessingCache("")
+            ),
+            mock.patch.object(openai_language_processing, "_process", fake_process),
+        ):
+            result = await process(["yes", "no", " yes ", "no"])
+            self.assertEqual(result, ["YES", "NO", "YES", "NO"])
+            self.assertEqual(sent, ["yes", "no"])
+
+            result = await process(["no", "maybe"])
+            self.assertEqual(result, ["NO", "MAYBE"])
+            self.assertEqual(sent, ["yes", "no", "maybe"])
+
+    async def test_missing_documents_are_retried_individually(self):
+        batch_sizes: list[int] = []
+
+        async def fake_process(batch: Batch) -> dict[int, str]:
+            batch_sizes.append(len(batch))
+            if len(batch) > 1:
+                # Drop the first document of every batch
+                return {document.id: document.text.upper() for document in batch[1:]}
+            if batch[0].text == "fails":
+                raise ValueError("No response")
+            return {batch[0].id: batch[0].text.upper()}
+
+        with (
+            mock.patch.object(
+                openai_language_processing, "cache", PreprocessingCache("")
+            ),
+            mock.patch.object(openai_language_processing, "_process", fake_process),
+        ):
+            result = await process(["fails", "b", "c"])
+
+        self.assertEqual(result, ["fails", "B", "C"])
+        self.assertEqual(batch_sizes, [3, 1])
+
+    def test_batches_budget_input_and_output_tokens(self):
+        documents = [Document(id=i, text=" ".join(["word"] * 10)) for i in range(6)]
+        with (
+            # One token per word, and the prompt is a single token
+            mock.patch.object(
+                openai_language_processing,
+                "count_tokens",
+                lambda text, model: len(text.split()),
+            ),
+            mock.patch.object(openai_language_processing, "prompt_template", "prompt"),
+            mock.patch.object(openai_language_processing, "TRANSLATION_EXPANSION", 1),
+            mock.patch.object(
+                openai_language_processing, "DOCUMENT_OVERHEAD_TOKENS", 0
+            ),
+        ):
+            with (
+                mock.patch.object(
+                    openai_language_processing, "MAX_OUTPUT_TOKENS_PER_BATCH", 30
+                ),
+                mock.patch.object(
+                    openai_language_processing, "MAX_INPUT_TOKENS_PER_BATCH", 1000
+                ),
+            ):
+                self.assertEqual([len(batch) for batch in _batch(documents)], [3, 3])
+            with (
+                mock.patch.object(
+                    openai_language_processing, "MAX_OUTPUT_TOKENS_PER_BATCH", 1000
+                ),
+                # The prompt counts towards the input budget
+                mock.patch.object(
+                    openai_language_processing, "MAX_INPUT_TOKENS_PER_BATCH", 30
+                ),
+            ):
+                self.assertEqual([len(batch) for batch in _batch(documents)], [2, 2, 2])
+
+    def test_results_are_persisted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Missing parent directories are created
+            path = os.path.join(directory, "data", "cache.sqlite3")
+            PreprocessingCache(path).set_many([("key", "result")])
+            self.assertEqual(
+                PreprocessingCache(path).get_many(["key", "other"]), {"key": "result"}
+            )
+
+    async def test_cache_is_created_on_first_use(self):
+        created: list[PreprocessingCache] = []
+        threads: list[threading.Thread] = []
+
+        def create_cache() -> PreprocessingCache:
+            threads.append(threading.current_thread())
+            created.append(PreprocessingCache(""))
+            return created[-1]
+
+        with (
+            mock.patch.object(openai_language_processing, "cache", None),
+            mock.patch.object(
+                openai_language_processing, "PreprocessingCache", create_cache
+            ),
+        ):
+            self.assertEqual(created, [])
+            await process([])
+            await process([])
+            self.assertEqual(len(created), 1)
+            # The SQLite database is opened off the event loop
+            self.assertIsNot(threads[0], threading.main_thread())
+
+
+class TestFastPath(unittest.IsolatedAsyncioTestCase):
+    def test_classification(self):
+        for document in ["yes", "I don't know", "The CPU is fast", "42"]:
+            with self.subTest(document):
+                self.assertTrue(is_clean_english(document))
+        for document in [
+            "I havv goood speling.",
+            "Bonjour, comment ça va?",
+            "Det er en god forelesning",
+            "jeg vet ikke",
+            "",
+        ]:
+            with self.subTest(document):
+                self.assertFalse(is_clean_english(document))
+
+    async def test_only_suspects_are_sent(self):
+        sent: list[str] = []
+
+        async def fake_process(documents: list[str]) -> list[str]:
+            sent.extend(documents)
+            return [document.upper() for document in documents]
+
+        with mock.patch.object(openai_language_processing, "process", fake_process):
+            result = await preprocessing.correct_and_translate(
+                ["yes", "I havv goood speling.", "no"]
+            )
+
+        self.assertEqual(result, ["yes", "I HAVV GOOOD SPELING.", "no"])
+        self.assertEqual(sent, ["I havv goood speling."])
+
+    async def test_skipped_documents_are_measured(self):
+        async def fake_process(documents: list[str]) -> list[str]:
+            return documents
+
+        statistics = preprocessing.FastPathStatistics()
+        with (
+            mock.patch.object(openai_language_processing, "process", fake_process),
+            mock.patch.object(preprocessing, "statistics", statistics),
+        ):
+            await preprocessing.correct_and_translate(["yes", "I havv goood speling."])
+            await preprocessing.correct_and_translate(["yes", "no"])
+
+        self.assertEqual((statistics.documents, statistics.skipped), (4, 3))
+        self.assertEqual(statistics.skip_rate, 0.75)
+        # Estimated from the length of "yes", "yes" and "no", without tokenizing them
+        self.assertEqual(statistics.skipped_tokens, 3)
+        self.assertEqual((statistics.backend_calls, statistics.skipped_calls), (1, 1))
+        self.assertEqual(statistics.estimated_seconds_saved, statistics.backend_seconds)
+
+
+class TestSymSpell(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.corrector = SymSpell(
+            {"the": 1000, "they": 100, "spelling": 50, "good": 80, "have": 90}
+        )
+
+    def test_correct_word(self):
+        self.assertEqual(self.corrector.correct_word("speling"), "spelling")
+        self.assertEqual(self.corrector.correct_word("teh"), "the")
+        self.assertEqual(self.corrector.correct_word("goood"), "good")
+        self.assertEqual(self.corrector.correct_word("xyzzy"), "xyzzy")
+
+    def test_correct_document(self):
+        self.assertEqual(
+            self.corrector.correct("I havv goood Speling, NTNU!"),
+            "I have good Spelling, NTNU!",
+        )
+
+    def test_uncertain_words_are_unchanged(self):
+        corrector = SymSpell({"cat": 100, "car": 90, "cap": 10, "spelling": 50})
+        # Two edits away
+        self.assertEqual(corrector.correct_word("speing"), "speing")
+        # Suggestions of similar frequency
+        self.assertEqual(corrector.correct_word("cax"), "cax")
+        corrector = SymSpell({"cat": 100, "cap": 10})
+        self.assertEqual(corrector.correct_word("cax"), "cat")
+
+    async def test_domain_terms_and_foreign_documents_are_unchanged(self):
+        documents = [
+            "Recursion is hard",
+            "Bonjour, comment ça va?",
+            "jeg vet ikke",
+            "I havv goood speling",
+        ]
+        self.assertEqual(
+            await symspell.process(documents),
+            documents[:3] + ["I have good spelling"],
+        )
+
+
+class TestNormalisation(unittest.TestCase):
+    def test_normalise(self):
+        self.assertEqual(
+            normalise("I don’t think THE answer is 42, it's obvious!"),
+            "think answer 42 obvious",
+        )
+        self.assertEqual(
+            normalise("The answer IS obvious", lowercase=False), "answer obvious"
+        )
+        self.assertEqual(
+            normalise("The answer is", remove_stopwords=False), "the answer is"
+        )
+
+    def test_normalise_batch(self):
+        self.assertEqual(
+            normalise_batch(["Yes!", "No, not at all", "Yes!"]), ["yes", "", "yes"]
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+import logging
+
+from processing.llm.tokens import count_tokens
+from processing.preprocessing.normalisation import normalise
+
+logger = logging.getLogger("processing")
+
+# Longer answers are cut at a word boundary, which keeps a single essay from dominating the prompt
+MAX_ANSWER_CHARACTERS = 600
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= MAX_ANSWER_CHARACTERS:
+        return text
+    truncated = text[:MAX_ANSWER_CHARACTERS].rsplit(" ", 1)[0]
+    return f"{truncated}..."
+
+
+def group_answers(answers: list[str]) -> list[tuple[str, int]]:
+    """
+    Group answers that are equal after lowercasing and removing punctuation.
+
+    Parameters:
+        answers (list[str]): The answers to group.
+
+    Returns:
+        list[tuple[str, int]]: The first spelling of every distinct answer, cut if it
+            is very long, and its number of students. The most frequent answers are first.
+    """
+    # The first spelling of every answer, and its count, by normalised text
+    groups: dict[str, list] = {}
+    for answer in answers:
+        text = " ".join(answer.split())
+        if not text:
+            continue
+        key = normalise(text, remove_stopwords=False) or text.lower()
+        if key in groups:
+            groups[key][1] += 1
+        else:
+            groups[key] = [text, 1]
+
+    return [
+        (_truncate(text), count)
+        for text, count in sorted(groups.values(), key=lambda group: -group[1])
+    ]
+
+
+def format_entry(text: str, count: int) -> str:
+    """Format a group of answers for a prompt, like `Good (x12)`"""
+    return f"{text} (x{count})" if count > 1 else text
+
+
+def compact_answers(answers: list[str]) -> list[str]:
+    """
+    Compact answers for a prompt. Duplicate answers are listed once, followed by the
+    number of students who gave them, and very long answers are cut.
+
+    Parameters:
+        answers (list[str]): The answers to compact.
+
+    Returns:
+        list[str]: The compacted answer entries, the most frequent first.
+    """
+    entries = [format_entry(text, count) for text, count in group_answers(answers)]
+
+    if logger.isEnabledFor(logging.DEBUG):
+        tokens_before = count_tokens("\n".join(answers))
+        tokens_after = count_tokens("\n".join(entries))
+        logger.debug(
+            f"Compacted {len(answers)} answers into {len(entries)} entries, "
+            f"saving {tokens_before - tokens_after} of {tokens_before} prompt tokens"
+        )
+    return entries
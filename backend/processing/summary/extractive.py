@@ -0,0 +1,86 @@
+import logging
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.summary.compaction import format_entry, group_answers
+
+logger = logging.getLogger("processing")
+
+_algorithm = "tf-idf centroid"
+# Weight of representativeness against novelty when selecting answers
+_diversity_lambda = 0.5
+
+
+def select_answers(
+    groups: list[tuple[str, int]], count: int = 3
+) -> list[tuple[str, int]]:
+    """
+    Select the most representative answers, avoiding answers that repeat each other.
+    Every answer is scored by the cosine similarity of its TF-IDF vector to the centroid
+    of all answers, weighted by the number of students, and selected with maximal
+    marginal relevance.
+
+    Parameters:
+        groups (list[tuple[str, int]]): Distinct answers and their number of students.
+        count (int): The maximum number of answers to select.
+
+    Returns:
+        list[tuple[str, int]]: The selected answers, the most representative first.
+    """
+    if len(groups) <= 1:
+        return groups[:count]
+
+    try:
+        vectors = TfidfVectorizer(
+            sublinear_tf=True, stop_words="english"
+        ).fit_transform([text for text, _ in groups])
+    except ValueError:
+        # No answer has a word that is not a stopword, so the most frequent answers are used
+        return groups[:count]
+
+    weights = np.array([group_count for _, group_count in groups], dtype=float)
+    centroid = np.asarray(vectors.T @ weights).ravel()
+    centroid /= np.linalg.norm(centroid) or 1.0
+    # The rows of the TF-IDF matrix have unit length, so dot products are cosine similarities
+    relevance = np.asarray(vectors @ centroid).ravel()
+
+    selected: list[int] = []
+    redundancy = np.zeros(len(groups))
+    for _ in range(min(count, len(groups))):
+        scores = _diversity_lambda * relevance - (1 - _diversity_lambda) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        similarity = np.asarray((vectors @ vectors[best].T).todense()).ravel()
+        redundancy = np.maximum(redundancy, similarity)
+
+    return [groups[i] for i in selected]
+
+
+def process(request: AnalysisRequest) -> SummaryResult:
+    """
+    Summarise answers without an LLM, by listing the most representative answers.
+    Used when the LLM summarisation fails or times out.
+
+    Parameters:
+        request (AnalysisRequest): The answers to summarise.
+
+    Returns:
+        SummaryResult: A bullet point for each selected answer.
+    """
+    start_time = time.monotonic()
+    groups = group_answers(request.answers)
+    if not groups:
+        raise ValueError("There are no answers to summarise")
+
+    selected = select_answers(groups)
+    summary_text = "\n\n".join(f"- {format_entry(*group)}" for group in selected)
+
+    logger.debug(
+        f"Extractive summarisation of {len(request.answers)} answers "
+        f"took {time.monotonic() - start_time}s"
+    )
+    return SummaryResult(algorithm=_algorithm, summary_text=summary_text)
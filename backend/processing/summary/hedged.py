@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, computed_field
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.llm import scheduler
+from processing.summary import openai_llm, openai_reasoning
+
+load_dotenv()
+
+logger = logging.getLogger("processing")
+
+# Seconds to wait for the reasoning model before also asking the faster model
+HEDGE_AFTER_SECONDS = float(os.getenv("SUMMARY_HEDGE_AFTER_SECONDS", "8"))
+
+
+class HedgeStatistics(BaseModel):
+    """Counts of hedged summarisations since the process started"""
+
+    requests: int = 0
+    # Requests where the primary model missed the hedge deadline
+    hedged: int = 0
+    # Requests where the primary model failed before the hedge deadline
+    fallbacks: int = 0
+    failures: int = 0
+    wins: dict[str, int] = {}
+
+    @computed_field
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+statistics = HedgeStatistics()
+
+
+def _record_win(result: SummaryResult) -> SummaryResult:
+    statistics.wins[result.algorithm] = statistics.wins.get(result.algorithm, 0) + 1
+    return result
+
+
+async def process(
+    request: AnalysisRequest, hedge_after: float | None = None
+) -> SummaryResult:
+    """
+    Summarise with the reasoning model, hedging with the faster LLM if the reasoning
+    model has not answered by the deadline or fails. The first valid result is used,
+    and the other request is cancelled. Background requests are not hedged, as
+    nobody is waiting for them.
+
+    Parameters:
+        request (AnalysisRequest): The information to be provided to the LLM.
+        hedge_after (float | None): Seconds before hedging. Defaults to `HEDGE_AFTER_SECONDS`.
+
+    Returns:
+        SummaryResult: The first valid summary. Its algorithm is the model that produced it.
+    """
+    if scheduler.priority.get() == scheduler.Priority.Background:
+        return await openai_reasoning.process(request)
+
+    statistics.requests += 1
+    hedge_after = HEDGE_AFTER_SECONDS if hedge_after is None else hedge_after
+
+    primary = asyncio.create_task(openai_reasoning.process(request))
+    pending: set[asyncio.Task[SummaryResult]] = {primary}
+    try:
+        await asyncio.wait(pending, timeout=hedge_after)
+        if primary.done() and primary.exception() is None:
+            return _record_win(primary.result())
+
+        error: BaseException | None = None
+        if primary.done():
+            error = primary.exception()
+            statistics.fallbacks += 1
+            logger.debug("Summarisation failed, falling back", exc_info=error)
+            pending = set()
+        else:
+            statistics.hedged += 1
+            logger.debug(f"Summarisation exceeded {hedge_after}s, hedging")
+        pending.add(asyncio.create_task(openai_llm.process(request)))
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return _record_win(task.result())
+                error = task.exception()
+
+        statistics.failures += 1
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        logger.debug(
+            f"Summarisation hedge rate {statistics.hedge_rate:.0%} "
+            f"of {statistics.requests} requests, wins {statistics.wins}"
+        )
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.llm.openai import parse_chat_completion
+from processing.llm.tokens import count_tokens
+from processing.summary import openai_llm
+from processing.summary.compaction import format_entry, group_answers
+
+logger = logging.getLogger("processing")
+
+# Requests whose compacted answers exceed this many tokens are summarised with map-reduce
+MAP_REDUCE_THRESHOLD_TOKENS = 12000
+# Tokens of compacted answers in each chunk summarised in the map step
+CHUNK_TOKENS = 4000
+
+_model_id = "gpt-4o-mini"
+_reduce_template = """
+You are in a lecture setting where students answer questions through a student response system.
+There were too many answers to summarise at once, so they were split into groups that were summarised separately.
+You will be provided with three pieces of information:
+    1. Context about the current quiz and ongoing lecture session.
+    2. The current question, and the topic of the answers if they belong to one.
+    3. The summaries of each group of answers, with the number of answers in the group.
+
+Your task is to combine the summaries into a single summary of the main insights, distributed accross 2 or 3 bullet points of max 10 words each:
+- Weigh each summary by the number of answers in its group
+- Summary shall help the teacher gauge the students' understanding or feedback related to the question
+- Summary shall help the teacher discover both patterns and curiosities in the answers
+- Be as concrete as possible, avoid giving general advice!
+
+No more than 25 words!
+Respond in valid JSON!
+
+Quiz context: <|quiz_context|>
+
+Question: <|question|>
+<|topic|>
+Summaries: <|summaries|>
+"""
+
+
+def estimate_prompt_tokens(request: AnalysisRequest) -> int:
+    """Estimate the tokens of the answers in a summary prompt"""
+    groups = group_answers(request.answers)
+    return count_tokens("\n".join(format_entry(*group) for group in groups))
+
+
+def is_large(request: AnalysisRequest) -> bool:
+    """Whether the answers of a request are too many to summarise in a single prompt"""
+    return estimate_prompt_tokens(request) > MAP_REDUCE_THRESHOLD_TOKENS
+
+
+def _chunk(groups: list[tuple[str, int]]) -> list[list[tuple[str, int]]]:
+    """Split groups of answers into chunks of at most `CHUNK_TOKENS` prompt tokens"""
+    chunks: list[list[tuple[str, int]]] = []
+    current_chunk: list[tuple[str, int]] = []
+    current_tokens = 0
+    for group in groups:
+        group_tokens = count_tokens(format_entry(*group)) + 1
+        if current_chunk and current_tokens + group_tokens > CHUNK_TOKENS:
+            chunks.append(current_chunk)
+            current_chunk = []
+            current_tokens = 0
+        current_chunk.append(group)
+        current_tokens += group_tokens
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def _reduce_prompt(
+    request: AnalysisRequest, partials: list[tuple[int, SummaryResult]]
+) -> ChatCompletionMessageParam:
+    quiz_context = f"\n    - Quiz name: {request.quiz_name}"
+    if request.quiz_description:
+        quiz_context += f"\n    - Quiz description: {request.quiz_description}"
+    if request.audience_count is not None:
+        quiz_context += f"\n    - Number of participants: {request.audience_count}"
+    quiz_context += f"\n    - Number of answers: {len(request.answers)}"
+
+    topic = f"\nTopic: {request.topic_label}\n" if request.topic_label else ""
+    summaries = "\n\n".join(
+        f"Group of {count} answers:\n{partial.summary_text}"
+        for count, partial in partials
+    )
+
+    prompt = _reduce_template.replace("<|quiz_context|>", quiz_context, 1)
+    prompt = prompt.replace("<|question|>", request.question, 1)
+    prompt = prompt.replace("<|topic|>", topic, 1)
+    prompt = prompt.replace("<|summaries|>", summaries, 1)
+    return {"role": "user", "content": prompt}
+
+
+async def process(request: AnalysisRequest) -> SummaryResult:
+    """
+    Summarise a large number of answers by splitting them into chunks that are
+    summarised concurrently (map), and combining the chunk summaries (reduce).
+
+    Parameters:
+        request (AnalysisRequest): The information to be provided to the LLM.
+
+    Returns:
+        SummaryResult: The combined summary.
+    """
+    start_time = time.monotonic()
+    chunks = _chunk(group_answers(request.answers))
+
+    # The entries of a chunk are distinct, so compacting them again in the prompt changes nothing
+    results = await asyncio.gather(
+        *[
+            openai_llm.process(
+                request.model_copy(
+                    update={"answers": [format_entry(*group) for group in chunk]}
+                )
+            )
+            for chunk in chunks
+        ],
+        return_exceptions=True,
+    )
+    partials: list[tuple[int, SummaryResult]] = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            logger.debug("Summarisation of a chunk of answers failed", exc_info=result)
+        else:
+            partials.append((sum(count for _, count in chunk), result))
+    if not partials:
+        raise ValueError("Summarisation of every chunk of answers failed")
+
+    chat_completion = await parse_chat_completion(
+        messages=[_reduce_prompt(request, partials)],
+        model=_model_id,
+        response_format=openai_llm.ResponseFormat,
+        max_completion_tokens=256,
+        n=1,
+        temperature=0.5,
+    )
+    response = openai_llm.ResponseFormat.model_validate_json(
+        chat_completion.choices[0].message.content
+    )
+
+    logger.debug(
+        f"Map-reduce summarisation of {len(request.answers)} answers in "
+        f"{len(chunks)} chunks took {time.monotonic() - start_time}s"
+    )
+    return SummaryResult(
+        algorithm=f"{_model_id} map-reduce",
+        summary_text=response.text,
+        emoji=response.emoji,
+    )
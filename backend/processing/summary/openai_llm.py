@@ -6,7 +6,8 @@ from openai.types.chat import ChatCompletionMessageParam
 from pydantic import BaseModel
 
 from processing.definitions import AnalysisRequest, SummaryResult
-from processing.llm.openai import client
+from processing.llm.openai import parse_chat_completion
+from processing.summary.compaction import compact_answers
 
 logger = logging.getLogger("processing")
 
@@ -22,7 +23,7 @@ You are in a lecture setting where students answer questions through a student r
 You will be provided with three pieces of information:
     1. Context about the current quiz and ongoing lecture session.
     2. The current question.
-    3. A list of student answers to that question.
+    3. A list of student answers to that question. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
 
 Your task is to summarise the main insights from the answers to the question distributed accross 2 or 3 bullet points of max 10 words each:
 - Summary shall help the teacher make decisions
@@ -64,7 +65,7 @@ You will be provided with four pieces of information:
     1. Context about the current quiz and ongoing lecture session.
     2. The current question.
     3. The label of the topic.
-    4. A list of student answers grouped under the topic.
+    4. A list of student answers grouped under the topic. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
 
 Your task is to summarise the main insights from the answers in the topic distributed accross 1 to 3 bullet points of max 8 words each:
 - Summary shall provide the teacher with a quick, but concrete, overview of the topic
@@ -124,7 +125,8 @@ async def _synth_user_prompt(request: AnalysisRequest) -> ChatCompletionMessageP
     prompt = prompt.replace("<|quiz_context|>", quiz_context, 1)
     prompt = prompt.replace("<|question|>", request.question, 1)
     prompt = prompt.replace("<|topic|>", topic_label, 1)
-    prompt = prompt.replace("<|answer|>", f"[\"{'\",\n\"'.join(request.answers)}\"]", 1)
+    answers = compact_answers(request.answers)
+    prompt = prompt.replace("<|answer|>", f"[\"{'\",\n\"'.join(answers)}\"]", 1)
 
     return {"role": "user", "content": prompt}
 
@@ -144,7 +146,7 @@ async def process(request: AnalysisRequest) -> SummaryResult:
 
     logger.debug(f"Prompt for OpenAI {_model_id}:\n{user_prompt['content']}")
 
-    chat_completion = await client.beta.chat.completions.parse(
+    chat_completion = await parse_chat_completion(
         messages=[user_prompt],
         model=_model_id,
         response_format=ResponseFormat,
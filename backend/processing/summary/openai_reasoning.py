@@ -1,12 +1,16 @@
 import json
 import logging
 import time
+from contextlib import aclosing
+from typing import AsyncIterator
 
 from openai.types.chat import ChatCompletionMessageParam
 from pydantic import BaseModel
 
 from processing.definitions import AnalysisRequest, SummaryResult
-from processing.llm.openai import client
+from processing.llm.openai import create_chat_completion, stream_chat_completion
+from processing.summary.compaction import compact_answers
+from processing.summary.streaming import partial_json_fields
 
 logger = logging.getLogger("processing")
 
@@ -28,7 +32,7 @@ You are in a lecture setting where students answer questions through a student r
 You will be provided with three pieces of information:
     1. Context about the current quiz and ongoing lecture session.
     2. The current question.
-    3. A list of student answers to that question.
+    3. A list of student answers to that question. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
 
 Your task is to summarise the main insights from the answers to the question distributed accross 2 or 3 bullet points of max 10 words each:
 - Summary shall help the teacher make decisions
@@ -71,7 +75,7 @@ You will be provided with four pieces of information:
     1. Context about the current quiz and ongoing lecture session.
     2. The current question.
     3. The label of the topic.
-    4. A list of student answers grouped under the topic.
+    4. A list of student answers grouped under the topic. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
 
 Your task is to summarise the main insights from the answers in the topic distributed accross 1 to 3 bullet points of max 8 words each:
 - Summary shall provide the teacher with a quick, but concrete, overview of the topic
@@ -133,7 +137,8 @@ async def _synth_user_prompt(request: AnalysisRequest) -> ChatCompletionMessageP
     prompt = prompt.replace("<|quiz_context|>", quiz_context, 1)
     prompt = prompt.replace("<|question|>", request.question, 1)
     prompt = prompt.replace("<|topic|>", topic_label, 1)
-    prompt = prompt.replace("<|answer|>", f"[\"{'\",\n\"'.join(request.answers)}\"]", 1)
+    answers = compact_answers(request.answers)
+    prompt = prompt.replace("<|answer|>", f"[\"{'\",\n\"'.join(answers)}\"]", 1)
 
     return {"role": "user", "content": prompt}
 
@@ -153,7 +158,7 @@ async def process(request: AnalysisRequest) -> SummaryResult:
 
     logger.debug(f"Prompt for OpenAI {_model_id}:\n{user_prompt['content']}")
 
-    response = await client.chat.completions.create(
+    response = await create_chat_completion(
         messages=[user_prompt],
         model=_model_id,
         reasoning_effort="low",
@@ -170,3 +175,54 @@ async def process(request: AnalysisRequest) -> SummaryResult:
         summary_text=response.text,
         emoji=response.emoji,
     )
+
+
+async def stream(request: AnalysisRequest) -> AsyncIterator[SummaryResult]:
+    """
+    Process the analysis request like `process`, streaming the summary while the LLM produces it.
+
+    Parameters:
+        request (AnalysisRequest): The information to be provided to the LLM.
+
+    Yields:
+        SummaryResult: The summary received so far, every time it grows. The last
+            result is the complete and validated summary.
+    """
+    start_time = time.monotonic()
+    user_prompt = await _synth_user_prompt(request=request)
+
+    logger.debug(f"Prompt for OpenAI {_model_id}:\n{user_prompt['content']}")
+
+    chunks = await stream_chat_completion(
+        messages=[user_prompt],
+        model=_model_id,
+        reasoning_effort="low",
+        n=1,
+    )
+
+    json_response = ""
+    partial_text = ""
+    # Closing the stream releases its scheduler slot, also when the summary is abandoned
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            json_response += chunk.choices[0].delta.content
+            fields = partial_json_fields(json_response, ("text", "emoji"))
+            if fields.get("text", "") != partial_text:
+                partial_text = fields["text"]
+                yield SummaryResult(
+                    algorithm=_model_id,
+                    summary_text=partial_text,
+                    emoji=fields.get("emoji"),
+                )
+
+    response = ResponseFormat.model_validate_json(json_response)
+
+    logger.debug(f"Time OpenAI {_model_id} stream: {time.monotonic() - start_time}s")
+
+    yield SummaryResult(
+        algorithm=_model_id,
+        summary_text=response.text,
+        emoji=response.emoji,
+    )
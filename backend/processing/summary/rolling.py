@@ -0,0 +1,182 @@
+import logging
+import os
+import time
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+from openai.types.chat import ChatCompletionMessageParam
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.llm.openai import parse_chat_completion
+from processing.summary import openai_llm
+from processing.summary.compaction import compact_answers
+
+load_dotenv()
+
+logger = logging.getLogger("processing")
+
+# Whether sessions keep a draft summary up to date while answers come in
+ENABLED = os.getenv("ROLLING_SUMMARY", "false").strip() == "true"
+# Drafts that do not cover more than this share of the answers are not refined,
+# and the answers are summarised from scratch instead
+MAX_UNCOVERED_SHARE = 0.5
+
+_model_id = "gpt-4o-mini"
+_update_template = """
+You are in a lecture setting where students answer questions through a student response system.
+Answers are summarised while they come in, so a summary of the earlier answers already exists.
+You will be provided with four pieces of information:
+    1. Context about the current quiz and ongoing lecture session.
+    2. The current question.
+    3. The summary of the earlier answers, with the number of answers it covers.
+    4. A list of new student answers. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
+
+Your task is to update the summary so that it covers both the earlier and the new answers, distributed accross 2 or 3 bullet points of max 10 words each:
+- Weigh the earlier summary and the new answers by their number of answers
+- Keep insights of the earlier summary that are still relevant
+- Summary shall help the teacher gauge the students' understanding or feedback related to the question
+- Summary shall help the teacher discover both patterns and curiosities in the answers
+- Be as concrete as possible, avoid giving general advice!
+
+No more than 25 words!
+Respond in valid JSON!
+
+Quiz context: <|quiz_context|>
+
+Question: <|question|>
+
+Summary of <|draft_count|> earlier answers: <|draft|>
+
+New answers: <|answer|>
+"""
+
+_refine_template = """
+You are in a lecture setting where students answer questions through a student response system.
+The answers were summarised while they came in, and all answers have now been received.
+You will be provided with four pieces of information:
+    1. Context about the current quiz and ongoing lecture session.
+    2. The current question.
+    3. The draft summary of the earlier answers, with the number of answers it covers.
+    4. A list of the last answers, which the draft does not cover yet. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
+
+Your task is to refine the draft into the final summary of the main insights of all answers, distributed accross 2 or 3 bullet points of max 10 words each:
+- Keep every concrete insight of the draft, and only add new ones from the last answers
+- Weigh the draft and the last answers by their number of answers
+- Summary shall help the teacher make decisions
+- Be as concrete as possible, avoid giving general advice!
+
+No more than 25 words!
+Respond in valid JSON!
+
+Quiz context: <|quiz_context|>
+
+Question: <|question|>
+
+Draft summary of <|draft_count|> earlier answers: <|draft|>
+
+Last answers: <|answer|>
+"""
+
+
+class Draft(NamedTuple):
+    """Draft summary of the first answers of a question"""
+
+    summary: SummaryResult
+    # Number of answers the summary covers
+    answer_count: int
+
+
+def _quiz_context(request: AnalysisRequest, answer_count: int) -> str:
+    quiz_context = f"\n    - Quiz name: {request.quiz_name}"
+    if request.quiz_description:
+        quiz_context += f"\n    - Quiz description: {request.quiz_description}"
+    if request.audience_count is not None:
+        quiz_context += f"\n    - Number of participants: {request.audience_count}"
+    quiz_context += f"\n    - Number of answers: {answer_count}"
+    return quiz_context
+
+
+async def _summarise(prompt: ChatCompletionMessageParam) -> SummaryResult:
+    logger.debug(f"Prompt for OpenAI {_model_id}:\n{prompt['content']}")
+
+    chat_completion = await parse_chat_completion(
+        messages=[prompt],
+        model=_model_id,
+        response_format=openai_llm.ResponseFormat,
+        max_completion_tokens=256,
+        n=1,
+        temperature=0.5,
+    )
+    response = openai_llm.ResponseFormat.model_validate_json(
+        chat_completion.choices[0].message.content
+    )
+    return SummaryResult(
+        algorithm=f"{_model_id} rolling",
+        summary_text=response.text,
+        emoji=response.emoji,
+    )
+
+
+async def update(
+    request: AnalysisRequest, draft: SummaryResult | None, draft_count: int
+) -> SummaryResult:
+    """
+    Update a draft summary with new answers, without sending the earlier answers again.
+
+    Parameters:
+        request (AnalysisRequest): The question and the new answers.
+        draft (SummaryResult | None): The summary of the earlier answers, if any.
+        draft_count (int): The number of answers covered by the draft.
+
+    Returns:
+        SummaryResult: The summary of the earlier and the new answers.
+    """
+    start_time = time.monotonic()
+    if draft is None:
+        summary_result = await openai_llm.process(request)
+        summary_result.algorithm = f"{_model_id} rolling"
+        return summary_result
+
+    answers = compact_answers(request.answers)
+    prompt = _update_template.replace(
+        "<|quiz_context|>",
+        _quiz_context(request, draft_count + len(request.answers)),
+        1,
+    )
+    prompt = prompt.replace("<|question|>", request.question, 1)
+    prompt = prompt.replace("<|draft_count|>", str(draft_count), 1)
+    prompt = prompt.replace("<|draft|>", draft.summary_text, 1)
+    prompt = prompt.replace("<|answer|>", f"[\"{'\",\n\"'.join(answers)}\"]", 1)
+    summary_result = await _summarise({"role": "user", "content": prompt})
+
+    logger.debug(
+        f"Rolling summary updated with {len(request.answers)} answers "
+        f"in {time.monotonic() - start_time}s"
+    )
+    return summary_result
+
+
+async def refine(request: AnalysisRequest, draft: Draft) -> SummaryResult:
+    """
+    Refine a draft summary into the final summary, folding in the answers that came in
+    after the last draft update.
+
+    Parameters:
+        request (AnalysisRequest): The question and all answers, of which only those not
+            covered by the draft are sent.
+        draft (Draft): The draft summary of the first answers.
+
+    Returns:
+        SummaryResult: The final summary.
+    """
+    answers = compact_answers(request.answers[draft.answer_count :])
+    prompt = _refine_template.replace(
+        "<|quiz_context|>", _quiz_context(request, len(request.answers)), 1
+    )
+    prompt = prompt.replace("<|question|>", request.question, 1)
+    prompt = prompt.replace("<|draft_count|>", str(draft.answer_count), 1)
+    prompt = prompt.replace("<|draft|>", draft.summary.summary_text, 1)
+    prompt = prompt.replace(
+        "<|answer|>", f"[\"{'\",\n\"'.join(answers)}\"]" if answers else "[]", 1
+    )
+    return await _summarise({"role": "user", "content": prompt})
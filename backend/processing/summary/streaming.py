@@ -0,0 +1,49 @@
+import json
+import re
+
+_hex_digits = frozenset("0123456789abcdefABCDEF")
+
+
+def _partial_string(buffer: str, start: int) -> str:
+    """Decode the part of a JSON string starting at `start` that has been received so far"""
+    end = start
+    while end < len(buffer):
+        character = buffer[end]
+        if character == '"':
+            break
+        if character == "\\":
+            length = 6 if buffer[end + 1 : end + 2] == "u" else 2
+            escape = buffer[end : end + length]
+            if len(escape) < length or (
+                length == 6 and not set(escape[2:]) <= _hex_digits
+            ):
+                # The rest of the escape sequence has not been received yet
+                break
+            end += length
+            continue
+        end += 1
+
+    value = json.loads(f'"{buffer[start:end]}"', strict=False)
+    if value and "\ud800" <= value[-1] <= "\udbff":
+        # Wait for the second half of a surrogate pair
+        value = value[:-1]
+    return value
+
+
+def partial_json_fields(buffer: str, keys: tuple[str, ...]) -> dict[str, str]:
+    """
+    Extract the string fields of a JSON object that is still being generated.
+
+    Parameters:
+        buffer (str): The JSON received so far.
+        keys (tuple[str, ...]): The keys of the string fields to extract.
+
+    Returns:
+        dict[str, str]: The received part of every field that has started.
+    """
+    fields: dict[str, str] = {}
+    for key in keys:
+        match = re.search(rf'"{re.escape(key)}"\s*:\s*"', buffer)
+        if match:
+            fields[key] = _partial_string(buffer, match.end())
+    return fields
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.llm import openai as llm
+from processing.llm.fake import FakeProvider
+from processing.summary import (
+    extractive,
+    hedged,
+    map_reduce,
+    openai_llm,
+    openai_reasoning,
+    rolling,
+    topic_batch,
+)
+from processing.summary.compaction import MAX_ANSWER_CHARACTERS, compact_answers
+from processing.summary.streaming import partial_json_fields
+
+
+class TestPartialJson(unittest.TestCase):
+    def test_fields_grow_with_the_buffer(self):
+        response = json.dumps({"text": 'Mostly "good"\n- Some é', "emoji": "👍"})
+        fields = [
+            partial_json_fields(response[:end], ("text", "emoji"))
+            for end in range(len(response) + 1)
+        ]
+        texts = [field.get("text", "") for field in fields]
+        self.assertEqual(texts, sorted(texts, key=len))
+        for text in texts:
+            self.assertTrue('Mostly "good"\n- Some é'.startswith(text))
+        self.assertEqual(fields[-1], {"text": 'Mostly "good"\n- Some é', "emoji": "👍"})
+
+    def test_missing_fields(self):
+        self.assertEqual(partial_json_fields('{"te', ("text", "emoji")), {})
+        self.assertEqual(
+            partial_json_fields('{"text": "a\\', ("text", "emoji")), {"text": "a"}
+        )
+
+
+def _summariser(algorithm: str, delay: float, fails: bool = False):
+    async def process(request: AnalysisRequest) -> SummaryResult:
+        await asyncio.sleep(delay)
+        if fails:
+            raise ValueError("Invalid JSON")
+        return SummaryResult(algorithm=algorithm, summary_text="- Summary")
+
+    return process
+
+
+class TestHedgedSummarisation(unittest.IsolatedAsyncioTestCase):
+    request = AnalysisRequest(question="Why?", answers=["Because"], quiz_name="Quiz")
+
+    async def summarise(self, primary, fallback) -> SummaryResult:
+        self.statistics = hedged.HedgeStatistics()
+        with (
+            mock.patch.object(openai_reasoning, "process", primary),
+            mock.patch.object(openai_llm, "process", fallback),
+            mock.patch.object(hedged, "statistics", self.statistics),
+        ):
+            return await hedged.process(self.request, hedge_after=0.05)
+
+    async def test_primary_answers_before_the_deadline(self):
+        result = await self.summarise(
+            _summariser("o3-mini", 0.01), _summariser("gpt-4o-mini", 0)
+        )
+        self.assertEqual(result.algorithm, "o3-mini")
+        self.assertEqual(self.statistics.hedged, 0)
+
+    async def test_fastest_result_after_the_deadline_wins(self):
+        result = await self.summarise(
+            _summariser("o3-mini", 1), _summariser("gpt-4o-mini", 0.01)
+        )
+        self.assertEqual(result.algorithm, "gpt-4o-mini")
+        self.assertEqual(self.statistics.hedge_rate, 1)
+
+        result = await self.summarise(
+            _summariser("o3-mini", 0.06), _summariser("gpt-4o-mini", 1)
+        )
+        self.assertEqual(result.algorithm, "o3-mini")
+
+    async def test_failures(self):
+        result = await self.summarise(
+            _summariser("o3-mini", 0, fails=True), _summariser("gpt-4o-mini", 0)
+        )
+        self.assertEqual(result.algorithm, "gpt-4o-mini")
+        self.assertEqual(self.statistics.fallbacks, 1)
+
+        with self.assertRaises(ValueError):
+            await self.summarise(
+                _summariser("o3-mini", 0, fails=True),
+                _summariser("gpt-4o-mini", 0, fails=True),
+            )
+        self.assertEqual(self.statistics.failures, 1)
+
+
+class TestCompaction(unittest.TestCase):
+    def test_duplicates_are_counted(self):
+        answers = ["Good", "good!", "Not good", " good ", "", "Too  fast", "too fast"]
+        self.assertEqual(
+            compact_answers(answers), ["Good (x3)", "Too fast (x2)", "Not good"]
+        )
+
+    def test_long_answers_are_cut(self):
+        (entry,) = compact_answers(["word " * 1000])
+        self.assertLessEqual(len(entry), MAX_ANSWER_CHARACTERS + 3)
+        self.assertTrue(entry.endswith("word..."))
+
+
+class TestMapReduce(unittest.IsolatedAsyncioTestCase):
+    async def test_chunks_are_summarised_and_combined(self):
+        answers = [f"Answer number {i} about topic {i % 7}" for i in range(300)]
+        answers += ["Good"] * 50
+        request = AnalysisRequest(question="Why?", answers=answers, quiz_name="Quiz")
+        chunk_sizes: list[int] = []
+
+        async def summarise_chunk(chunk_request: AnalysisRequest) -> SummaryResult:
+            chunk_sizes.append(len(chunk_request.answers))
+            return SummaryResult(algorithm="gpt-4o-mini", summary_text="- Partial")
+
+        with (
+            mock.patch.object(map_reduce, "MAP_REDUCE_THRESHOLD_TOKENS", 1000),
+            mock.patch.object(map_reduce, "CHUNK_TOKENS", 1000),
+            mock.patch.object(openai_llm, "process", summarise_chunk),
+            mock.patch.object(
+                llm, "provider", FakeProvider(latency=0, tokens_per_second=1e9)
+            ),
+        ):
+            self.assertTrue(map_reduce.is_large(request))
+            result = await map_reduce.process(request)
+
+        self.assertEqual(result.algorithm, "gpt-4o-mini map-reduce")
+        self.assertGreater(len(chunk_sizes), 1)
+        # The duplicate answers are a single entry
+        self.assertEqual(sum(chunk_sizes), 301)
+
+
+class TestTopicBatch(unittest.IsolatedAsyncioTestCase):
+    requests = [
+        AnalysisRequest(
+            question="Why?", topic_label=label, answers=[label], quiz_name="Quiz"
+        )
+        for label in ("Pace", "Exam", "Slides")
+    ]
+
+    async def summarise(self, summaries: list[dict]) -> list[SummaryResult]:
+        self.separate_topics: list[str] = []
+
+        async def parse(**request):
+            message = mock.Mock(content=json.dumps({"summaries": summaries}))
+            return mock.Mock(choices=[mock.Mock(message=message)])
+
+        async def summarise_topic(request: AnalysisRequest) -> SummaryResult:
+            self.separate_topics.append(request.topic_label)
+            return SummaryResult(algorithm="gpt-4o-mini", summary_text="- Separate")
+
+        with (
+            mock.patch.object(topic_batch, "parse_chat_completion", parse),
+            mock.patch.object(openai_llm, "process", summarise_topic),
+        ):
+            return await topic_batch.process(self.requests)
+
+    async def test_topics_are_summarised_together(self):
+        results = await self.summarise(
+            [{"id": i, "text": f"- Topic {i}", "emoji": "👍"} for i in (2, 0, 1)]
+        )
+        self.assertEqual(
+            [result.summary_text for result in results],
+            ["- Topic 0", "- Topic 1", "- Topic 2"],
+        )
+        self.assertEqual(self.separate_topics, [])
+
+    async def test_invalid_topics_are_summarised_separately(self):
+        results = await self.summarise(
+            [
+                {"id": 0, "text": "- Topic 0", "emoji": "👍"},
+                {"id": 1, "text": "", "emoji": "👍"},
+                {"id": 7, "text": "- Unknown", "emoji": "👍"},
+            ]
+        )
+        self.assertEqual(
+            [result.summary_text for result in results],
+            ["- Topic 0", "- Separate", "- Separate"],
+        )
+        self.assertEqual(self.separate_topics, ["Exam", "Slides"])
+
+
+class TestRollingSummary(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_only_send_new_answers(self):
+        prompts: list[str] = []
+
+        async def parse(**request):
+            prompts.append(request["messages"][0]["content"])
+            content = json.dumps({"text": "- Updated", "emoji": "👍"})
+            return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=content))])
+
+        async def summarise(request: AnalysisRequest) -> SummaryResult:
+            return SummaryResult(algorithm="gpt-4o-mini", summary_text="- First")
+
+        def request(answers: list[str]) -> AnalysisRequest:
+            return AnalysisRequest(question="Why?", answers=answers, quiz_name="Quiz")
+
+        with (
+            mock.patch.object(rolling, "parse_chat_completion", parse),
+            mock.patch.object(openai_llm, "process", summarise),
+        ):
+            draft = await rolling.update(request(["Early"]), draft=None, draft_count=0)
+            draft = await rolling.update(request(["Late"]), draft=draft, draft_count=1)
+            # The last answer came in after the last draft update
+            final = await rolling.refine(
+                request(["Early", "Late", "Later"]),
+                rolling.Draft(summary=draft, answer_count=2),
+            )
+
+        self.assertEqual(final.algorithm, "gpt-4o-mini rolling")
+        self.assertEqual(len(prompts), 2)
+        self.assertIn("Summary of 1 earlier answers: - First", prompts[0])
+        self.assertIn('"Late"', prompts[0])
+        self.assertNotIn('"Early"', prompts[0])
+        self.assertIn("Draft summary of 2 earlier answers: - Updated", prompts[1])
+        self.assertIn("Number of answers: 3", prompts[1])
+        self.assertIn('"Later"', prompts[1])
+        self.assertNotIn('"Late"', prompts[1])
+
+
+class TestExtractiveSummary(unittest.TestCase):
+    def test_representative_and_distinct_answers_are_selected(self):
+        answers = ["The pace is too fast"] * 20 + ["Too fast pace"] * 5
+        answers += ["Slides are great", "I like the slides"] * 4 + ["Exam was hard"] * 2
+        result = extractive.process(
+            AnalysisRequest(question="Why?", answers=answers, quiz_name="Quiz")
+        )
+        self.assertEqual(
+            result.summary_text,
+            "- The pace is too fast (x20)\n\n- Slides are great (x4)\n\n- Exam was hard (x2)",
+        )
+
+    def test_answers_without_words(self):
+        result = extractive.process(
+            AnalysisRequest(
+                question="Why?", answers=["the", "?", "the"], quiz_name="Quiz"
+            )
+        )
+        self.assertEqual(result.summary_text, "- the (x2)\n\n- ?")
+        with self.assertRaises(ValueError):
+            extractive.process(
+                AnalysisRequest(question="Why?", answers=[], quiz_name="Quiz")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
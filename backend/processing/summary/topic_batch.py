@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from openai.types.chat import ChatCompletionMessageParam
+from pydantic import BaseModel
+
+from processing.definitions import AnalysisRequest, SummaryResult
+from processing.llm.openai import parse_chat_completion
+from processing.llm.tokens import count_tokens
+from processing.summary import openai_llm
+from processing.summary.compaction import compact_answers
+
+load_dotenv()
+
+logger = logging.getLogger("processing")
+
+# Tokens of compacted answers sent in a single batched request. 0 summarises every topic separately
+BATCH_TOKENS = int(os.getenv("TOPIC_SUMMARY_BATCH_TOKENS", "8000"))
+
+
+class TopicSummary(BaseModel):
+    id: int
+    text: str
+    emoji: str
+
+
+class ResponseFormat(BaseModel):
+    summaries: list[TopicSummary]
+
+
+_model_id = "gpt-4o-mini"
+_batch_template = """
+You are in a lecture setting where students answer questions through a student response system.
+Topic modelling has been performed on the students' answer to a question.
+You will be provided with three pieces of information:
+    1. Context about the current quiz and ongoing lecture session.
+    2. The current question.
+    3. A list of topics, each with an id, a label and the student answers grouped under it. Answers given by several students are listed once, followed by the number of students, like "Good (x12)".
+
+Your task is to summarise each topic separately. For every topic, summarise the main insights from its answers distributed accross 1 to 3 bullet points of max 8 words each:
+- Summary shall provide the teacher with a quick, but concrete, overview of the topic
+- Summary shall help the teacher discover both patterns and curiosities in the answers
+- Summary shall only describe the answers of its own topic
+- Be as concrete as possible, avoid giving general advice!
+
+Example:
+Quiz name: "Mid-term feedback"
+Question: "How do you perceive the pace of the course?"
+Topic: "Fast"
+Do NOT generate a general summary like "- Many find the pace of the course too fast\n\n- Too long assignments and intensive lectures"
+Rather generate a summary like "- Struggling to keep up\n\n- 10 tasks per assignment too much\n\n- Offload more to course book"
+
+- No more than 20 words per topic!
+- Respond with exactly one summary per topic, using the id of the topic!
+- Respond in valid JSON!
+
+Quiz context: <|quiz_context|>
+
+Question: <|question|>
+
+Topics:
+<|topics|>
+"""
+
+
+def _topic_entry(topic_id: int, request: AnalysisRequest, answers: list[str]) -> str:
+    return (
+        f"Id: {topic_id}\n"
+        f"Topic: {request.topic_label}\n"
+        f"Number of answers: {len(request.answers)}\n"
+        f"Answers: [\"{'\",\n\"'.join(answers)}\"]"
+    )
+
+
+def _batches(
+    entries: list[tuple[int, str]],
+) -> list[list[tuple[int, str]]]:
+    """Split topic entries into batches of at most `BATCH_TOKENS` prompt tokens"""
+    batches: list[list[tuple[int, str]]] = []
+    current_batch: list[tuple[int, str]] = []
+    current_tokens = 0
+    for entry in entries:
+        entry_tokens = count_tokens(entry[1])
+        if current_batch and current_tokens + entry_tokens > BATCH_TOKENS:
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(entry)
+        current_tokens += entry_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def _batch_prompt(
+    request: AnalysisRequest, entries: list[tuple[int, str]]
+) -> ChatCompletionMessageParam:
+    quiz_context = f"\n    - Quiz name: {request.quiz_name}"
+    if request.quiz_description:
+        quiz_context += f"\n    - Quiz description: {request.quiz_description}"
+    if request.audience_count is not None:
+        quiz_context += f"\n    - Number of participants: {request.audience_count}"
+
+    prompt = _batch_template.replace("<|quiz_context|>", quiz_context, 1)
+    prompt = prompt.replace("<|question|>", request.question, 1)
+    prompt = prompt.replace("<|topics|>", "\n\n".join(entry for _, entry in entries), 1)
+    return {"role": "user", "content": prompt}
+
+
+async def _summarise_batch(
+    requests: list[AnalysisRequest], entries: list[tuple[int, str]]
+) -> dict[int, SummaryResult]:
+    """Summarise a batch of topics in one request, returning the valid summaries by topic id"""
+    chat_completion = await parse_chat_completion(
+        messages=[_batch_prompt(requests[entries[0][0]], entries)],
+        model=_model_id,
+        response_format=ResponseFormat,
+        max_completion_tokens=128 * len(entries),
+        n=1,
+        temperature=0.5,
+    )
+    response = ResponseFormat.model_validate_json(
+        chat_completion.choices[0].message.content
+    )
+
+    expected_ids = {topic_id for topic_id, _ in entries}
+    results: dict[int, SummaryResult] = {}
+    duplicate_ids: set[int] = set()
+    for summary in response.summaries:
+        if summary.id not in expected_ids or not summary.text.strip():
+            continue
+        if summary.id in results:
+            duplicate_ids.add(summary.id)
+        results[summary.id] = SummaryResult(
+            algorithm=f"{_model_id} batched",
+            summary_text=summary.text,
+            emoji=summary.emoji,
+        )
+    # A topic with several summaries is ambiguous, so it is summarised again on its own
+    for topic_id in duplicate_ids:
+        del results[topic_id]
+    return results
+
+
+async def process(
+    requests: list[AnalysisRequest],
+) -> list[SummaryResult | BaseException]:
+    """
+    Summarise the topics of a question with as few requests as possible. The topics are
+    sent together in batches under a token budget, and every topic without a valid summary
+    in the response of its batch is summarised on its own.
+
+    Parameters:
+        requests (list[AnalysisRequest]): One request for each topic of the same question.
+
+    Returns:
+        list[SummaryResult | BaseException]: The summary of each topic, in the order of the
+            requests, or the error if the topic could not be summarised.
+    """
+    start_time = time.monotonic()
+    entries = [
+        (topic_id, _topic_entry(topic_id, request, compact_answers(request.answers)))
+        for topic_id, request in enumerate(requests)
+    ]
+    # Topics that fill a batch on their own gain nothing from batching
+    batches = (
+        [batch for batch in _batches(entries) if len(batch) > 1]
+        if BATCH_TOKENS > 0
+        else []
+    )
+
+    batch_results = await asyncio.gather(
+        *[_summarise_batch(requests, batch) for batch in batches],
+        return_exceptions=True,
+    )
+    results: dict[int, SummaryResult | BaseException] = {}
+    for batch, batch_result in zip(batches, batch_results):
+        if isinstance(batch_result, BaseException):
+            logger.debug(
+                f"Batched summarisation of {len(batch)} topics failed",
+                exc_info=batch_result,
+            )
+        else:
+            results.update(batch_result)
+
+    missing_ids = [
+        topic_id for topic_id in range(len(requests)) if topic_id not in results
+    ]
+    if results and missing_ids:
+        logger.debug(
+            f"Batched summarisation was missing {len(missing_ids)} of "
+            f"{len(requests)} topics, summarising them separately"
+        )
+    fallback_results = await asyncio.gather(
+        *[openai_llm.process(requests[topic_id]) for topic_id in missing_ids],
+        return_exceptions=True,
+    )
+    results.update(zip(missing_ids, fallback_results))
+
+    logger.debug(
+        f"Summarisation of {len(requests)} topics in {len(batches)} batches and "
+        f"{len(missing_ids)} separate requests took {time.monotonic() - start_time}s"
+    )
+    return [results[topic_id] for topic_id in range(len(requests))]
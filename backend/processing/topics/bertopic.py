@@ -8,13 +8,13 @@ from bertopic import BERTopic
 from bertopic.representation import KeyBERTInspired, OpenAI
 from dotenv import load_dotenv
 from hdbscan import HDBSCAN
-import openai
 from pandas import Series
 from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import CountVectorizer
 from umap import UMAP
 
 from processing.definitions import Answer, TopicModellingResult
+from processing.llm.openai import circuit_breaker, scheduled_sync_client
 
 load_dotenv()
 
@@ -59,9 +59,10 @@ class BERTopicManager:
             topic: <topic label>
             """
             self.representation_model["OpenAI"] = OpenAI(
-                client=openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY")),
+                client=scheduled_sync_client(),
                 model="gpt-4o-mini",
-                exponential_backoff=True,
+                # Rate limits are handled by the shared scheduler
+                exponential_backoff=False,
                 chat=True,
                 prompt=prompt,
             )
@@ -157,12 +158,39 @@ def _process(
     documents = [answer.text for answer in answers]
     embeddings = _manager.embedding_model.encode(documents)
 
+    # Labels are only generated by the LLM while it is available
+    local_representation_model = {
+        name: model
+        for name, model in _manager.representation_model.items()
+        if name != "OpenAI"
+    }
+    use_llm_labels = (
+        "OpenAI" in _manager.representation_model and not circuit_breaker.is_open()
+    )
+
     # The topic model is not thread-safe
     with _manager.thread_lock:
-        topic_indices, _ = _manager.topic_model.fit_transform(
-            documents=documents,
-            embeddings=embeddings,
+        _manager.topic_model.representation_model = (
+            _manager.representation_model
+            if use_llm_labels
+            else local_representation_model
         )
+        try:
+            topic_indices, _ = _manager.topic_model.fit_transform(
+                documents=documents,
+                embeddings=embeddings,
+            )
+        except Exception as e:
+            if not use_llm_labels:
+                raise
+            logger.warning(
+                "Labelling topics with the LLM failed, using local labels", exc_info=e
+            )
+            _manager.topic_model.representation_model = local_representation_model
+            topic_indices, _ = _manager.topic_model.fit_transform(
+                documents=documents,
+                embeddings=embeddings,
+            )
         row_iterator = _manager.topic_model.get_topic_info().iterrows()
 
     # Map original answers to correct topics
@@ -235,6 +263,6 @@ async def process(
         ]
 
     # Perform processing in separate thread and await result
-    loop = asyncio.get_running_loop()
-    topics = await loop.run_in_executor(None, _process, answers, question_id)
+    # The thread inherits the context, so that its LLM requests keep their priority
+    topics = await asyncio.to_thread(_process, answers, question_id)
     return topics
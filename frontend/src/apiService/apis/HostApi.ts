@@ -16,6 +16,7 @@
 import * as runtime from '../runtime';
 import type {
   HTTPValidationError,
+  ImportJobPublic,
   QuestionCreate,
   QuestionPublicFullAnalysis,
   QuestionUpdate,
@@ -30,6 +31,8 @@ import type {
 import {
     HTTPValidationErrorFromJSON,
     HTTPValidationErrorToJSON,
+    ImportJobPublicFromJSON,
+    ImportJobPublicToJSON,
     QuestionCreateFromJSON,
     QuestionCreateToJSON,
     QuestionPublicFullAnalysisFromJSON,
@@ -70,6 +73,11 @@ export interface DeleteQuizRequest {
     quizId: string;
 }
 
+export interface GetImportJobRequest {
+    quizId: string;
+    jobId: string;
+}
+
 export interface GetQuizRequest {
     quizId: string;
 }
@@ -330,6 +338,56 @@ export class HostApi extends runtime.BaseAPI {
         return await response.value();
     }
 
+    /**
+     * Fetch the progress of a question import
+     * Get Import Job
+     */
+    async getImportJobRaw(requestParameters: GetImportJobRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<runtime.ApiResponse<ImportJobPublic>> {
+        if (requestParameters['quizId'] == null) {
+            throw new runtime.RequiredError(
+                'quizId',
+                'Required parameter "quizId" was null or undefined when calling getImportJob().'
+            );
+        }
+
+        if (requestParameters['jobId'] == null) {
+            throw new runtime.RequiredError(
+                'jobId',
+                'Required parameter "jobId" was null or undefined when calling getImportJob().'
+            );
+        }
+
+        const queryParameters: any = {};
+
+        const headerParameters: runtime.HTTPHeaders = {};
+
+        if (this.configuration && this.configuration.accessToken) {
+            const token = this.configuration.accessToken;
+            const tokenString = await token("HTTPBearer", []);
+
+            if (tokenString) {
+                headerParameters["Authorization"] = `Bearer ${tokenString}`;
+            }
+        }
+        const response = await this.request({
+            path: `/host/quizzes/{quiz_id}/imports/{job_id}`.replace(`{${"quiz_id"}}`, encodeURIComponent(String(requestParameters['quizId']))).replace(`{${"job_id"}}`, encodeURIComponent(String(requestParameters['jobId']))),
+            method: 'GET',
+            headers: headerParameters,
+            query: queryParameters,
+        }, initOverrides);
+
+        return new runtime.JSONApiResponse(response, (jsonValue) => ImportJobPublicFromJSON(jsonValue));
+    }
+
+    /**
+     * Fetch the progress of a question import
+     * Get Import Job
+     */
+    async getImportJob(requestParameters: GetImportJobRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<ImportJobPublic> {
+        const response = await this.getImportJobRaw(requestParameters, initOverrides);
+        return await response.value();
+    }
+
     /**
      * Fetch a single quiz by its id with related questions and ratings
      * Get Quiz
@@ -546,10 +604,10 @@ export class HostApi extends runtime.BaseAPI {
     }
 
     /**
-     * Import a set of questions and answers from file contents
+     * Start importing a set of questions and answers from file contents. The import runs in the background, and its progress can be polled with the returned job id.
      * Import Questions
      */
-    async importQuestionsRaw(requestParameters: ImportQuestionsRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<runtime.ApiResponse<QuizPublic>> {
+    async importQuestionsRaw(requestParameters: ImportQuestionsRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<runtime.ApiResponse<ImportJobPublic>> {
         if (requestParameters['quizId'] == null) {
             throw new runtime.RequiredError(
                 'quizId',
@@ -586,14 +644,14 @@ export class HostApi extends runtime.BaseAPI {
             body: requestParameters['requestBody'],
         }, initOverrides);
 
-        return new runtime.JSONApiResponse(response, (jsonValue) => QuizPublicFromJSON(jsonValue));
+        return new runtime.JSONApiResponse(response, (jsonValue) => ImportJobPublicFromJSON(jsonValue));
     }
 
     /**
-     * Import a set of questions and answers from file contents
+     * Start importing a set of questions and answers from file contents. The import runs in the background, and its progress can be polled with the returned job id.
      * Import Questions
      */
-    async importQuestions(requestParameters: ImportQuestionsRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<QuizPublic> {
+    async importQuestions(requestParameters: ImportQuestionsRequest, initOverrides?: RequestInit | runtime.InitOverrideFunction): Promise<ImportJobPublic> {
         const response = await this.importQuestionsRaw(requestParameters, initOverrides);
         return await response.value();
     }
@@ -0,0 +1,148 @@
+/* tslint:disable */
+/* eslint-disable */
+/**
+ * FastAPI
+ * No description provided (generated by Openapi Generator https://github.com/openapitools/openapi-generator)
+ *
+ * The version of the OpenAPI document: 0.1.0
+ * 
+ *
+ * NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+ * https://openapi-generator.tech
+ * Do not edit the class manually.
+ */
+
+
+import { mapValues } from '../runtime';
+import type { ImportJobStage } from './ImportJobStage';
+import {
+    ImportJobStageFromJSON,
+    ImportJobStageFromJSONTyped,
+    ImportJobStageToJSON,
+    ImportJobStageToJSONTyped,
+} from './ImportJobStage';
+
+/**
+ * 
+ * @export
+ * @interface ImportJobPublic
+ */
+export interface ImportJobPublic {
+    /**
+     * 
+     * @type {string}
+     * @memberof ImportJobPublic
+     */
+    quizId: string;
+    /**
+     * 
+     * @type {ImportJobStage}
+     * @memberof ImportJobPublic
+     */
+    stage: ImportJobStage;
+    /**
+     * 
+     * @type {number}
+     * @memberof ImportJobPublic
+     */
+    questionCount: number;
+    /**
+     * 
+     * @type {number}
+     * @memberof ImportJobPublic
+     */
+    preparedCount: number;
+    /**
+     * 
+     * @type {number}
+     * @memberof ImportJobPublic
+     */
+    analysedCount: number;
+    /**
+     * 
+     * @type {string}
+     * @memberof ImportJobPublic
+     */
+    error?: string | null;
+    /**
+     * 
+     * @type {string}
+     * @memberof ImportJobPublic
+     */
+    id: string;
+    /**
+     * 
+     * @type {Date}
+     * @memberof ImportJobPublic
+     */
+    createdAt: Date;
+    /**
+     * 
+     * @type {Date}
+     * @memberof ImportJobPublic
+     */
+    updatedAt: Date;
+}
+
+
+
+/**
+ * Check if a given object implements the ImportJobPublic interface.
+ */
+export function instanceOfImportJobPublic(value: object): value is ImportJobPublic {
+    if (!('quizId' in value) || value['quizId'] === undefined) return false;
+    if (!('stage' in value) || value['stage'] === undefined) return false;
+    if (!('questionCount' in value) || value['questionCount'] === undefined) return false;
+    if (!('preparedCount' in value) || value['preparedCount'] === undefined) return false;
+    if (!('analysedCount' in value) || value['analysedCount'] === undefined) return false;
+    if (!('id' in value) || value['id'] === undefined) return false;
+    if (!('createdAt' in value) || value['createdAt'] === undefined) return false;
+    if (!('updatedAt' in value) || value['updatedAt'] === undefined) return false;
+    return true;
+}
+
+export function ImportJobPublicFromJSON(json: any): ImportJobPublic {
+    return ImportJobPublicFromJSONTyped(json, false);
+}
+
+export function ImportJobPublicFromJSONTyped(json: any, ignoreDiscriminator: boolean): ImportJobPublic {
+    if (json == null) {
+        return json;
+    }
+    return {
+        
+        'quizId': json['quiz_id'],
+        'stage': ImportJobStageFromJSON(json['stage']),
+        'questionCount': json['question_count'],
+        'preparedCount': json['prepared_count'],
+        'analysedCount': json['analysed_count'],
+        'error': json['error'] == null ? undefined : json['error'],
+        'id': json['id'],
+        'createdAt': (new Date(json['created_at'])),
+        'updatedAt': (new Date(json['updated_at'])),
+    };
+}
+
+export function ImportJobPublicToJSON(json: any): ImportJobPublic {
+    return ImportJobPublicToJSONTyped(json, false);
+}
+
+export function ImportJobPublicToJSONTyped(value?: ImportJobPublic | null, ignoreDiscriminator: boolean = false): any {
+    if (value == null) {
+        return value;
+    }
+
+    return {
+        
+        'quiz_id': value['quizId'],
+        'stage': ImportJobStageToJSON(value['stage']),
+        'question_count': value['questionCount'],
+        'prepared_count': value['preparedCount'],
+        'analysed_count': value['analysedCount'],
+        'error': value['error'],
+        'id': value['id'],
+        'created_at': ((value['createdAt']).toISOString()),
+        'updated_at': ((value['updatedAt']).toISOString()),
+    };
+}
+
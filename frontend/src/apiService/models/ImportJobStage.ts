@@ -0,0 +1,56 @@
+/* tslint:disable */
+/* eslint-disable */
+/**
+ * FastAPI
+ * No description provided (generated by Openapi Generator https://github.com/openapitools/openapi-generator)
+ *
+ * The version of the OpenAPI document: 0.1.0
+ * 
+ *
+ * NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+ * https://openapi-generator.tech
+ * Do not edit the class manually.
+ */
+
+
+/**
+ * Stages of a background question import, in the order they are reached
+ * @export
+ */
+export const ImportJobStage = {
+    Queued: 'queued',
+    Formatted: 'formatted',
+    Stored: 'stored',
+    Prepared: 'prepared',
+    Analysed: 'analysed',
+    Failed: 'failed'
+} as const;
+export type ImportJobStage = typeof ImportJobStage[keyof typeof ImportJobStage];
+
+
+export function instanceOfImportJobStage(value: any): boolean {
+    for (const key in ImportJobStage) {
+        if (Object.prototype.hasOwnProperty.call(ImportJobStage, key)) {
+            if (ImportJobStage[key as keyof typeof ImportJobStage] === value) {
+                return true;
+            }
+        }
+    }
+    return false;
+}
+
+export function ImportJobStageFromJSON(json: any): ImportJobStage {
+    return ImportJobStageFromJSONTyped(json, false);
+}
+
+export function ImportJobStageFromJSONTyped(json: any, ignoreDiscriminator: boolean): ImportJobStage {
+    return json as ImportJobStage;
+}
+
+export function ImportJobStageToJSON(value?: ImportJobStage | null): any {
+    return value as any;
+}
+
+export function ImportJobStageToJSONTyped(value: any, ignoreDiscriminator: boolean): ImportJobStage {
+    return value as ImportJobStage;
+}
@@ -34,6 +34,13 @@ import {
     QuestionPublicToJSON,
     QuestionPublicToJSONTyped,
 } from './QuestionPublic';
+import type { SummaryResult } from './SummaryResult';
+import {
+    SummaryResultFromJSON,
+    SummaryResultFromJSONTyped,
+    SummaryResultToJSON,
+    SummaryResultToJSONTyped,
+} from './SummaryResult';
 
 /**
  * 
@@ -83,6 +90,12 @@ export interface SessionPublic {
      * @memberof SessionPublic
      */
     currentAnswers?: Array<Answer>;
+    /**
+     * 
+     * @type {SummaryResult}
+     * @memberof SessionPublic
+     */
+    draftSummary?: SummaryResult | null;
 }
 
 
@@ -116,6 +129,7 @@ export function SessionPublicFromJSONTyped(json: any, ignoreDiscriminator: boole
         'audienceCount': json['audience_count'],
         'currentQuestion': json['current_question'] == null ? undefined : QuestionPublicFromJSON(json['current_question']),
         'currentAnswers': json['current_answers'] == null ? undefined : ((json['current_answers'] as Array<any>).map(AnswerFromJSON)),
+        'draftSummary': json['draft_summary'] == null ? undefined : SummaryResultFromJSON(json['draft_summary']),
     };
 }
 
@@ -137,6 +151,7 @@ export function SessionPublicToJSONTyped(value?: SessionPublic | null, ignoreDis
         'audience_count': value['audienceCount'],
         'current_question': QuestionPublicToJSON(value['currentQuestion']),
         'current_answers': value['currentAnswers'] == null ? undefined : ((value['currentAnswers'] as Array<any>).map(AnswerToJSON)),
+        'draft_summary': SummaryResultToJSON(value['draftSummary']),
     };
 }
 
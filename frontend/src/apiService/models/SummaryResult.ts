@@ -0,0 +1,83 @@
+/* tslint:disable */
+/* eslint-disable */
+/**
+ * FastAPI
+ * No description provided (generated by Openapi Generator https://github.com/openapitools/openapi-generator)
+ *
+ * The version of the OpenAPI document: 0.1.0
+ * 
+ *
+ * NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+ * https://openapi-generator.tech
+ * Do not edit the class manually.
+ */
+
+import { mapValues } from '../runtime';
+/**
+ * 
+ * @export
+ * @interface SummaryResult
+ */
+export interface SummaryResult {
+    /**
+     * 
+     * @type {string}
+     * @memberof SummaryResult
+     */
+    algorithm: string;
+    /**
+     * 
+     * @type {string}
+     * @memberof SummaryResult
+     */
+    summaryText: string;
+    /**
+     * 
+     * @type {string}
+     * @memberof SummaryResult
+     */
+    emoji?: string | null;
+}
+
+/**
+ * Check if a given object implements the SummaryResult interface.
+ */
+export function instanceOfSummaryResult(value: object): value is SummaryResult {
+    if (!('algorithm' in value) || value['algorithm'] === undefined) return false;
+    if (!('summaryText' in value) || value['summaryText'] === undefined) return false;
+    return true;
+}
+
+export function SummaryResultFromJSON(json: any): SummaryResult {
+    return SummaryResultFromJSONTyped(json, false);
+}
+
+export function SummaryResultFromJSONTyped(json: any, ignoreDiscriminator: boolean): SummaryResult {
+    if (json == null) {
+        return json;
+    }
+    return {
+        
+        'algorithm': json['algorithm'],
+        'summaryText': json['summary_text'],
+        'emoji': json['emoji'] == null ? undefined : json['emoji'],
+    };
+}
+
+export function SummaryResultToJSON(json: any): SummaryResult {
+    return SummaryResultToJSONTyped(json, false);
+}
+
+export function SummaryResultToJSONTyped(value?: SummaryResult | null, ignoreDiscriminator: boolean = false): any {
+    if (value == null) {
+        return value;
+    }
+
+    return {
+        
+        'algorithm': value['algorithm'],
+        'summary_text': value['summaryText'],
+        'emoji': value['emoji'],
+    };
+}
+
@@ -5,6 +5,8 @@ export * from './AnswerPublic';
 export * from './AnswerPublicExtended';
 export * from './DetailedAnalysis';
 export * from './HTTPValidationError';
+export * from './ImportJobPublic';
+export * from './ImportJobStage';
 export * from './OverallAnalysis';
 export * from './QuestionCreate';
 export * from './QuestionPublic';
@@ -21,6 +23,7 @@ export * from './SessionPublic';
 export * from './SessionStage';
 export * from './Summary';
 export * from './SummaryPublic';
+export * from './SummaryResult';
 export * from './TopicExtended';
 export * from './TopicPublic';
 export * from './ValidationError';
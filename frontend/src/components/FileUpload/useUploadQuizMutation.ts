@@ -1,6 +1,7 @@
-import { useMutation } from "@tanstack/react-query";
+import { useEffect, useState } from "react";
+import { useMutation, useQuery } from "@tanstack/react-query";
 import { api } from "@/api.ts";
-import { QuizPublic } from "@/apiService";
+import { ImportJobPublic, ImportJobStage } from "@/apiService";
 import { queryClient } from "@/App.tsx";
 import { toast } from "sonner";
 
@@ -9,23 +10,62 @@ interface ImportQuestionsVariables {
   files: string[];
 }
 
+const isFinished = (job?: ImportJobPublic) =>
+  job?.stage === ImportJobStage.Analysed ||
+  job?.stage === ImportJobStage.Failed;
+
 export const useUploadQuizMutation = () => {
-  const mutation = useMutation<QuizPublic, Error, ImportQuestionsVariables>({
+  // The import runs in the background, so its job is polled until it finishes
+  const [startedJob, setStartedJob] = useState<ImportJobPublic>();
+
+  const mutation = useMutation<
+    ImportJobPublic,
+    Error,
+    ImportQuestionsVariables
+  >({
     mutationFn: ({ quizId, files }) =>
       api.host.importQuestions({
         quizId,
         requestBody: files,
       }),
     mutationKey: ["uploadQuiz"],
-    onSuccess: (data, variables) => {
-      toast.success(`Answers uploaded and processed!`);
-      void queryClient.invalidateQueries({
-        queryKey: ["quiz", variables.quizId],
-      });
+    onSuccess: (data) => {
+      toast.info("Answers uploaded, analysing them...");
+      setStartedJob(data);
     },
     onError: () => {
       toast.error("Upload failed.");
     },
   });
-  return { mutation };
+
+  const { data: importJob } = useQuery({
+    queryKey: ["importJob", startedJob?.quizId, startedJob?.id],
+    queryFn: () =>
+      api.host.getImportJob({
+        quizId: startedJob!.quizId,
+        jobId: startedJob!.id,
+      }),
+    enabled: startedJob !== undefined,
+    refetchInterval: (query) => (isFinished(query.state.data) ? false : 1500),
+  });
+
+  useEffect(() => {
+    if (!startedJob || !importJob || !isFinished(importJob)) return;
+
+    if (importJob.stage === ImportJobStage.Analysed) {
+      toast.success("Answers uploaded and processed!");
+    } else {
+      toast.error(importJob.error ?? "Import failed.");
+    }
+    void queryClient.invalidateQueries({
+      queryKey: ["quiz", startedJob.quizId],
+    });
+    void queryClient.invalidateQueries({
+      queryKey: ["previousAnalysis", startedJob.quizId],
+    });
+    setStartedJob(undefined);
+  }, [importJob, startedJob]);
+
+  const isImporting = mutation.isPending || startedJob !== undefined;
+  return { mutation, importJob: startedJob && importJob, isImporting };
 };
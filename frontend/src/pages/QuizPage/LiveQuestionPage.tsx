@@ -449,6 +449,15 @@ export default function QuizTeacherPage() {
               <h1 className="text-5xl font-bold text-start">{question}</h1>
             </div>
 
+            {/* Draft summary, kept up to date while answers come in */}
+            {session.draftSummary && (
+              <div className="flex justify-center w-full pb-4">
+                <p className="text-lg text-muted-foreground italic max-w-4xl">
+                  {session.draftSummary.emoji} {session.draftSummary.summaryText}
+                </p>
+              </div>
+            )}
+
             {/* Answers */}
             <div className="flex flex-col space-y-4 h-[calc(50vh-2rem)] w-full">
               <AnswerGrid
@@ -92,7 +92,11 @@ export default function QuizDetailsPage(): JSX.Element {
     });
   };
 
-  const { mutation: uploadQuizMutation } = useUploadQuizMutation();
+  const {
+    mutation: uploadQuizMutation,
+    importJob,
+    isImporting,
+  } = useUploadQuizMutation();
   const { mutation: deleteQuizMutation } = useDeleteQuizMutation();
 
   const handleExportAnswers = async () => {
@@ -324,6 +328,13 @@ export default function QuizDetailsPage(): JSX.Element {
               {uploadQuizMutation.isPending && (
                 <div className="animate-pulse">Uploading...</div>
               )}
+              {!uploadQuizMutation.isPending && isImporting && (
+                <div className="animate-pulse">
+                  {importJob && importJob.questionCount > 0
+                    ? `Analysing questions ${importJob.analysedCount}/${importJob.questionCount}...`
+                    : "Processing..."}
+                </div>
+              )}
               <Button
                 type="submit"
                 onClick={() => {
@@ -332,7 +343,7 @@ export default function QuizDetailsPage(): JSX.Element {
                     files: importedFiles,
                   });
                 }}
-                disabled={uploadQuizMutation.isPending}
+                disabled={isImporting}
               >
                 Import
               </Button>